@@ -0,0 +1,44 @@
+import sys
+import pandas as pd
+from app.data.rebuild import rebuild_counts, report_drift
+from app.data.schema import COUNTED_COLUMNS, aggregate_rebuild_statements
+
+
+def read_counts(conn, table, dimension):
+    """
+    Read the trigger-maintained counts for one column of a table.
+    Returns a DataFrame with columns [dimension, 'count'], largest first.
+    """
+    return pd.read_sql_query(f"""
+        SELECT NULLIF(value, '') AS {dimension}, count
+        FROM aggregate_counts
+        WHERE table_name = ? AND dimension = ? AND count > 0
+        ORDER BY count DESC
+    """, conn, params=(table, dimension))
+
+
+def read_total(conn, table):
+    """Read the trigger-maintained row count of a table."""
+    row = conn.execute("""
+        SELECT count FROM aggregate_counts
+        WHERE table_name = ? AND dimension = '*' AND value = ''
+    """, (table,)).fetchone()
+    return row[0] if row else 0
+
+
+def rebuild_aggregate_counts(conn=None):
+    """
+    Recompute aggregate_counts from the base tables.
+    Returns the counters that were wrong before the rebuild as
+    {(table, dimension, value): (stored, actual)}; empty means they were correct.
+    """
+    return rebuild_counts("aggregate_counts", ["table_name", "dimension", "value"],
+                          aggregate_rebuild_statements(), conn=conn)
+
+
+def main():
+    return report_drift(rebuild_aggregate_counts(), "counter", "Aggregate counters", COUNTED_COLUMNS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
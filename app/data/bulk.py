@@ -0,0 +1,88 @@
+from app.data.schema import (COUNTED_COLUMNS, ROLLUP_COLUMNS,
+                             counter_batch_statements, rollup_batch_statements)
+from app.data.search import SEARCH_TABLES, search_batch_statements
+from app.data.sketches import SKETCH_COLUMNS, sketch_batch_statements, resolution_time_batch_statements
+from app.data.surges import SURGE_COLUMNS, surge_batch_statements
+from app.data.timestamps import TIMESTAMP_COLUMNS, insert_sql
+from app.data.transitions import TRANSITION_TABLES, transition_batch_statements
+
+# Bulk loads: the insert triggers of the derived tables (counters, rollups,
+# sketches, surges, search index, status log) each run a few statements per
+# row, which is most of the cost of a large insert; even one whose WHEN is
+# false (the timestamp fills) halves the insert rate. For a big batch they
+# are dropped for the length of the insert and their work is done afterwards
+# with one grouped statement each over the new rows. Everything happens in the
+# caller's transaction, so a failed batch rolls the triggers back in too and
+# other connections never see the table without them.
+
+# Smaller batches keep the triggers; dropping and re-creating them costs
+# about as much as a few hundred rows of trigger work
+BATCH_MIN_ROWS = 500
+
+# Page cache (KiB) while a big batch runs: the indexes of a table with
+# millions of rows don't fit the connection's usual 32 MB
+BATCH_CACHE_KIB = 262144
+
+
+def batch_statements(table):
+    """
+    {insert trigger name: SQL that does its work for every row with id > ?}
+    for the derived tables kept for a table.
+    """
+    # insert_sql computes the timestamps in the INSERT itself, and columns
+    # left out of it are NULL, so the fill triggers have nothing to do
+    statements = {f"trg_{table}_{ts_column}_insert": []
+                  for ts_column in TIMESTAMP_COLUMNS.get(table, {}).values()}
+    if table == "it_tickets":
+        statements["trg_it_tickets_resolved_insert"] = resolution_time_batch_statements()
+    if table in COUNTED_COLUMNS:
+        statements[f"trg_{table}_counts_insert"] = counter_batch_statements(table, COUNTED_COLUMNS[table])
+    if table in ROLLUP_COLUMNS:
+        statements[f"trg_{table}_rollups_insert"] = rollup_batch_statements(table, *ROLLUP_COLUMNS[table])
+    if table in SKETCH_COLUMNS:
+        statements[f"trg_{table}_sketches_insert"] = sketch_batch_statements(table, *SKETCH_COLUMNS[table])
+    if table in SURGE_COLUMNS:
+        statements[f"trg_{table}_surges_insert"] = surge_batch_statements(table, *SURGE_COLUMNS[table])
+    if table in SEARCH_TABLES:
+        statements[f"trg_{table}_fts_insert"] = search_batch_statements(table)
+    if table in TRANSITION_TABLES:
+        statements[f"trg_{table}_status_insert"] = transition_batch_statements(table)
+    return statements
+
+
+def insert_batch(conn, table, columns, rows):
+    """
+    Insert many parameter rows (in the order of columns) with set-based
+    upkeep of the derived tables. Joins the caller's transaction (or starts
+    one for the caller to commit, like executemany would). Returns the row count.
+    """
+    sql = insert_sql(table, columns)
+    rows = list(rows)
+    if len(rows) < BATCH_MIN_ROWS:
+        return conn.executemany(sql, rows).rowcount
+
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+
+    # AUTOINCREMENT ids only grow, so the new rows are the ones above this
+    since = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+
+    statements = batch_statements(table)
+    triggers = conn.execute(f"""
+        SELECT name, sql FROM sqlite_master
+        WHERE type = 'trigger' AND name IN ({', '.join('?' * len(statements))})
+    """, list(statements)).fetchall()
+
+    cache_size = conn.execute("PRAGMA cache_size").fetchone()[0]
+    conn.execute(f"PRAGMA cache_size = -{BATCH_CACHE_KIB}")
+    try:
+        for name, _ in triggers:
+            conn.execute(f"DROP TRIGGER {name}")
+        count = conn.executemany(sql, rows).rowcount
+        for name, create_sql in triggers:
+            for statement in statements[name]:
+                conn.execute(statement, (since,))
+            conn.execute(create_sql)
+    finally:
+        conn.execute(f"PRAGMA cache_size = {cache_size}")
+    return count
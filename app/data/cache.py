@@ -0,0 +1,120 @@
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from app.data.db import DB_PATH, apply_connection_profile, get_pool
+
+# Maximum number of cached results per database file (least recently used go first)
+CACHE_MAX_ENTRIES = 64
+
+
+class ResultCache:
+    """
+    Keeps query results and derived objects until the database changes.
+
+    The cache key is PRAGMA data_version read on a watcher connection that
+    never writes. SQLite changes that value whenever any other connection
+    commits, so a cached value stays valid until a write actually happens.
+    Values are shared between reruns; treat them as read-only.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_entries=CACHE_MAX_ENTRIES):
+        self.db_path = Path(db_path)
+        self.max_entries = max_entries
+
+        self._lock = threading.RLock()
+        self._entries = OrderedDict()   # key -> (data_version, value)
+        self._watcher = None
+
+        # Counters for stats()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def _watch(self):
+        """Open the watcher connection on first use."""
+        if self._watcher is None:
+            # Let a writer create the file and switch it to WAL first
+            get_pool(self.db_path).acquire().close()
+            self._watcher = sqlite3.connect(str(self.db_path), check_same_thread=False)
+            apply_connection_profile(self._watcher, read_only=True)
+        return self._watcher
+
+    def data_version(self):
+        """Current change state of the database file."""
+        with self._lock:
+            return self._watch().execute("PRAGMA data_version").fetchone()[0]
+
+    def get_or_compute(self, key, compute, update=None):
+        """
+        Return the cached value for key, or call compute() and cache its result.
+        The cached value is reused until the database changes. If update is
+        given, a stale value is brought up to date with update(old_value)
+        instead of being computed again from scratch.
+        """
+        version = self.data_version()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == version:
+                self._hits += 1
+                self._entries.move_to_end(key)
+                return entry[1]
+
+            self._misses += 1
+            if entry is not None:
+                self._invalidations += 1
+
+        # Compute outside the lock so other threads can still read the cache.
+        # If a write lands meanwhile the value is stored under the old version
+        # and simply recomputed on the next call.
+        if entry is not None and update is not None:
+            value = update(entry[1])
+        else:
+            value = compute()
+
+        with self._lock:
+            self._entries[key] = (version, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return value
+
+    def clear(self):
+        """Drop every cached value (counters are kept)."""
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        """Return hit/miss counters and the hit ratio."""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "hits": self._hits,
+                "misses": self._misses,
+                "invalidations": self._invalidations,
+                "hit_ratio": round(self._hits / lookups, 3) if lookups else 0.0,
+            }
+
+
+# One cache per database file
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(db_path=DB_PATH):
+    """Get (or create) the result cache for a database file."""
+    key = str(Path(db_path).resolve())
+    with _caches_lock:
+        cache = _caches.get(key)
+        if cache is None:
+            cache = ResultCache(db_path)
+            _caches[key] = cache
+        return cache
+
+
+def get_cache_stats(db_path=DB_PATH):
+    """Return the hit/miss stats of the cache for a database file."""
+    return get_cache(db_path).stats()
@@ -1,11 +1,18 @@
 import pandas as pd
 import sqlite3
 from pathlib import Path
-from app.data.db import connect_database
+from app.data.db import connect_database, session, iter_param_rows
+from app.data.pagination import fetch_page, PAGE_SIZE
+from app.data.bulk import insert_batch
+from app.data.delta import fetch_delta
+from app.data.aggregates import read_counts
 
 # Set up the data directory path where CSV files will be stored
 DATA_DIR = Path("DATA")
 
+# Columns accepted by insert_datasets_many
+DATASET_COLUMNS = ['dataset_name', 'category', 'source', 'last_updated', 'record_count', 'file_size_mb']
+
 # CSV file operations
 
 def load_datasets_csv():
@@ -24,11 +31,16 @@ def save_datasets_csv(df):
 
 
 # create operations
-def insert_dataset(dataset_name, category, source, last_updated, record_count, file_size_mb):
+def insert_dataset(dataset_name, category, source, last_updated, record_count, file_size_mb, conn=None):
     """
     INSERT: Add a new dataset.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute("""
@@ -39,27 +51,89 @@ def insert_dataset(dataset_name, category, source, last_updated, record_count, f
     
 
     # Save changes to database
-    conn.commit()
-    conn.close()
+    if owns_txn:
+        conn.commit()
+    if owns_conn:
+        conn.close()
+
+
+def insert_datasets_many(rows, conn=None):
+    """
+    INSERT: Add many datasets with one executemany in one transaction.
+    rows: DataFrame or iterable of dicts/tuples with DATASET_COLUMNS.
+    Returns the number of rows inserted.
+    """
+    # Without a caller's session, open one so the batch commits once
+    if conn is None:
+        with session() as s:
+            return insert_datasets_many(rows, conn=s)
+    
+    return insert_batch(conn, "datasets_metadata", DATASET_COLUMNS, iter_param_rows(rows, DATASET_COLUMNS))
 
 
 # Read operations
-def get_all_datasets():
+def get_all_datasets(conn=None):
     """
     READ: Get all datasets.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     # Use pandas to read SQL query directly into dataframe
     df = pd.read_sql_query("SELECT * FROM datasets_metadata", conn)
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
-def get_dataset_by_id(dataset_id):
+def get_datasets_page(cursor=None, page_size=PAGE_SIZE, conn=None):
+    """
+    READ: Get one page of datasets, newest first, using keyset pagination.
+    Pass the returned next_cursor to get the following page (None = no more pages).
+    Returns (DataFrame, next_cursor).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    columns = ['id'] + DATASET_COLUMNS + ['created_at']
+    rows, next_cursor = fetch_page(
+        conn, "datasets_metadata", columns,
+        cursor=cursor, page_size=page_size
+    )
+    
+    if owns_conn:
+        conn.close()
+    
+    return pd.DataFrame(rows, columns=columns), next_cursor
+
+
+def get_datasets_delta(since=None, conn=None):
+    """
+    READ: Get the datasets inserted, updated or deleted since a high-water mark.
+    since is the mark from the previous call (None = all datasets).
+    Returns (DataFrame of changed rows, deleted ids, new mark).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    columns = ['id'] + DATASET_COLUMNS + ['created_at', 'last_updated_ts']
+    rows, deleted_ids, mark = fetch_delta(conn, "datasets_metadata", columns, since=since)
+    
+    if owns_conn:
+        conn.close()
+    
+    return pd.DataFrame(rows, columns=columns), deleted_ids, mark
+
+
+def get_dataset_by_id(dataset_id, conn=None):
     """
     READ: Get dataset by ID.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     cursor = conn.cursor()
     
     cursor.execute(
@@ -67,126 +141,141 @@ def get_dataset_by_id(dataset_id):
         (dataset_id,)
     )
     dataset = cursor.fetchone()
-    conn.close()
+    if owns_conn:
+        conn.close()
     return dataset
 
 
-def get_datasets_by_category(category):
+def get_datasets_by_category(category, conn=None):
     """
     READ: Get datasets filtered by category.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     # Use pandas to filter and order results
     df = pd.read_sql_query(
         "SELECT * FROM datasets_metadata WHERE category = ? ORDER BY id DESC",
         conn,
         params=(category,)
     )
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
-def get_datasets_by_source(source):
+def get_datasets_by_source(source, conn=None):
     """
     READ: Get datasets filtered by source.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     df = pd.read_sql_query(
         "SELECT * FROM datasets_metadata WHERE source = ? ORDER BY id DESC",
         conn,
         params=(source,)
     )
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
-def get_total_data_size():
+def get_total_data_size(conn=None):
     """
     READ: Get total size of all datasets in GB.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     cursor = conn.cursor()
     
     cursor.execute("SELECT SUM(file_size_mb) FROM datasets_metadata")
     result = cursor.fetchone()
-    conn.close()
+    if owns_conn:
+        conn.close()
     
     total_mb = result[0] if result[0] is not None else 0
     return round(total_mb / 1024, 2)
 
 
-def count_datasets_by_category():
+def count_datasets_by_category(conn=None):
     """
     READ: Get count of datasets grouped by category for analytics.
     """
-    conn = connect_database()
-    df = pd.read_sql_query("""
-        SELECT category, COUNT(*) as count
-        FROM datasets_metadata
-        GROUP BY category
-        ORDER BY count DESC
-    """, conn)
-    conn.close()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    # Counts kept up to date by triggers, no GROUP BY scan
+    df = read_counts(conn, "datasets_metadata", "category")
+    if owns_conn:
+        conn.close()
     return df
 
 
-def get_largest_datasets(limit=5):
+def get_largest_datasets(limit=5, conn=None):
     """
     READ: Get the largest datasets by file size.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     df = pd.read_sql_query("""
         SELECT dataset_name, file_size_mb, category
         FROM datasets_metadata
         ORDER BY file_size_mb DESC
         LIMIT ?
     """, conn, params=(limit,))
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
-def get_dataset_summary():
+def get_dataset_summary(conn=None):
     """
-    READ: Get summary statistics for dashboard.
+    READ: Get summary statistics for dashboard in one aggregate pass.
+    The most common category comes from the category index, not a table scan.
     """
-    conn = connect_database()
-    cursor = conn.cursor()
-    
-    cursor.execute("SELECT COUNT(*) FROM datasets_metadata")
-    total = cursor.fetchone()[0]
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    cursor.execute("SELECT SUM(record_count) FROM datasets_metadata")
-    total_records = cursor.fetchone()[0] or 0
-    
-    cursor.execute("SELECT SUM(file_size_mb) FROM datasets_metadata")
-    total_size_mb = cursor.fetchone()[0] or 0
-    total_size_gb = round(total_size_mb / 1024, 2)
-    
-    cursor.execute("""
-        SELECT category FROM datasets_metadata 
-        GROUP BY category 
-        ORDER BY COUNT(*) DESC LIMIT 1
+    cursor = conn.execute("""
+        SELECT
+            COUNT(*) AS total_datasets,
+            COALESCE(SUM(record_count), 0) AS total_records,
+            COALESCE(SUM(file_size_mb), 0) AS total_size_mb,
+            COALESCE(AVG(file_size_mb), 0) AS avg_size_mb,
+            COUNT(DISTINCT category) AS category_count,
+            (SELECT category FROM datasets_metadata
+             GROUP BY category
+             ORDER BY COUNT(*) DESC LIMIT 1) AS most_common_category
+        FROM datasets_metadata
     """)
-    most_common = cursor.fetchone()
-    most_common_cat = most_common[0] if most_common else "N/A"
+    columns = [col[0] for col in cursor.description]
+    summary = dict(zip(columns, cursor.fetchone()))
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     
-    return {
-        'total_datasets': total,
-        'total_records': total_records,
-        'total_size_gb': total_size_gb,
-        'most_common_category': most_common_cat
-    }
+    summary['total_size_gb'] = round(summary['total_size_mb'] / 1024, 2)
+    if summary['most_common_category'] is None:
+        summary['most_common_category'] = "N/A"
+    return summary
 
 
 
 # UPDATE - Modify Dataset
-def update_dataset_category(dataset_id, new_category):
+def update_dataset_category(dataset_id, new_category, conn=None):
     """
     UPDATE: Change dataset category.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute(
@@ -194,17 +283,24 @@ def update_dataset_category(dataset_id, new_category):
         (new_category, dataset_id)
     )
     
-    conn.commit()
-    conn.close()
+    if owns_txn:
+        conn.commit()
+    if owns_conn:
+        conn.close()
 
 
 
 
-def update_dataset_size(dataset_id, new_size_mb):
+def update_dataset_size(dataset_id, new_size_mb, conn=None):
     """
     UPDATE: Change dataset file size.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute(
@@ -212,15 +308,22 @@ def update_dataset_size(dataset_id, new_size_mb):
         (new_size_mb, dataset_id)
     )
     
-    conn.commit()
-    conn.close()
+    if owns_txn:
+        conn.commit()
+    if owns_conn:
+        conn.close()
 
 
-def update_dataset_last_updated(dataset_id, new_date):
+def update_dataset_last_updated(dataset_id, new_date, conn=None):
     """
     UPDATE: Change dataset last updated date.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute(
@@ -228,17 +331,24 @@ def update_dataset_last_updated(dataset_id, new_date):
         (new_date, dataset_id)
     )
     
-    conn.commit()
-    conn.close()
+    if owns_txn:
+        conn.commit()
+    if owns_conn:
+        conn.close()
 
 
 
 # DELETE
-def delete_dataset(dataset_id):
+def delete_dataset(dataset_id, conn=None):
     """
     DELETE: Remove a dataset from database.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute(
@@ -248,5 +358,7 @@ def delete_dataset(dataset_id):
 
 
      # Commit the delet   
-    conn.commit()
-    conn.close()
+    if owns_txn:
+        conn.commit()
+    if owns_conn:
+        conn.close()
@@ -1,18 +1,313 @@
 import sqlite3
+import threading
+import time
+from contextlib import contextmanager
 from pathlib import Path
 
 DB_PATH = Path("DATA") / "intelligence_platform.db"
 
-def connect_database(db_path=DB_PATH):
-    """Connect to SQLite database."""
-    # Check if the DATA folder exists, if not create it
-    if not db_path.parent.exists():
-        db_path.parent.mkdir(parents=True, exist_ok=True)
-        print(f"Created DATA folder")
-    
-    # Connect to the database (creates file if it doesn't exist)
-    conn = sqlite3.connect(str(db_path))
-    
-    print(f"Connected to database at: {db_path}")
-    
-    return sqlite3.connect(str(db_path))
\ No newline at end of file
+# Maximum number of open connections per database file
+POOL_MAX_SIZE = 8
+
+# Seconds a caller waits for a free connection before giving up
+POOL_TIMEOUT = 30.0
+
+# PRAGMA settings applied to every new connection.
+# WAL lets dashboard readers keep reading while an insert is being written.
+CONNECTION_PROFILE = {
+    "busy_timeout": 5000,          # ms to wait on a locked database
+    "journal_mode": "WAL",
+    "synchronous": "NORMAL",       # safe with WAL, one fsync per checkpoint
+    "cache_size": -32000,          # negative = KiB, so ~32 MB page cache
+    "mmap_size": 268435456,        # 256 MB memory-mapped reads
+    "temp_store": "MEMORY",
+}
+
+# Extra settings for read-only connections (analytics/dashboard reads)
+READ_ONLY_PROFILE = {
+    "query_only": "ON",
+}
+
+
+def get_connection_profile(read_only=False, overrides=None):
+    """Build the PRAGMA profile for a read-only or read-write connection."""
+    profile = dict(CONNECTION_PROFILE)
+    if read_only:
+        # journal_mode is stored in the file and can only be changed by a writer
+        profile.pop("journal_mode", None)
+        profile.update(READ_ONLY_PROFILE)
+    if overrides:
+        profile.update(overrides)
+    return profile
+
+
+def apply_connection_profile(conn, read_only=False, overrides=None):
+    """Apply the PRAGMA profile to an open connection."""
+    profile = get_connection_profile(read_only, overrides)
+    for name, value in profile.items():
+        conn.execute(f"PRAGMA {name} = {value}")
+    return conn
+
+
+class PooledConnection(sqlite3.Connection):
+    """
+    SQLite connection owned by a ConnectionPool.
+    close() hands the connection back to the pool instead of closing the file.
+    """
+
+    def close(self):
+        """Return the connection to its pool."""
+        pool = getattr(self, "_pool", None)
+        if pool is None:
+            super().close()
+        else:
+            pool.release(self)
+
+
+class ConnectionPool:
+    """
+    Thread-safe pool of SQLite connections with a fixed maximum size.
+    Each thread checks out at most one connection; nested checkouts in the
+    same thread get the same connection back.
+    """
+
+    def __init__(self, db_path=DB_PATH, max_size=POOL_MAX_SIZE, timeout=POOL_TIMEOUT,
+                 read_only=False, profile=None):
+        self.db_path = Path(db_path)
+        self.max_size = max_size
+        self.timeout = timeout
+        self.read_only = read_only
+        self.profile = profile
+
+        self._lock = threading.Condition()
+        self._idle = []
+        self._open = 0
+        self._local = threading.local()
+
+        # Counters for stats()
+        self._checkouts = 0
+        self._waits = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _new_connection(self):
+        """Open a new connection to the database file."""
+        # Check if the DATA folder exists, if not create it
+        if not self.db_path.parent.exists():
+            self.db_path.parent.mkdir(parents=True, exist_ok=True)
+
+        if self.read_only:
+            # journal_mode is stored in the file and only a writer can switch it
+            # to WAL, so open (and return) a read-write connection first
+            get_pool(self.db_path).acquire().close()
+
+        conn = sqlite3.connect(
+            str(self.db_path),
+            factory=PooledConnection,
+            check_same_thread=False
+        )
+        apply_connection_profile(conn, self.read_only, self.profile)
+        conn._pool = self
+        conn._depth = 0
+        return conn
+
+    def acquire(self):
+        """Check out a connection for the current thread."""
+        # Same thread asking again: hand back the connection it already holds
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn._depth += 1
+            return conn
+
+        start = time.perf_counter()
+        waited = False
+        create = False
+
+        with self._lock:
+            while True:
+                if self._idle:
+                    conn = self._idle.pop()
+                    break
+                if self._open < self.max_size:
+                    # Reserve the slot now, open the file outside the lock
+                    self._open += 1
+                    create = True
+                    break
+
+                waited = True
+                remaining = self.timeout - (time.perf_counter() - start)
+                if remaining <= 0:
+                    raise sqlite3.OperationalError(
+                        f"Connection pool exhausted ({self.max_size} connections in use)"
+                    )
+                self._lock.wait(remaining)
+
+            wait_time = time.perf_counter() - start
+            self._checkouts += 1
+            if waited:
+                self._waits += 1
+            self._total_wait += wait_time
+            self._max_wait = max(self._max_wait, wait_time)
+
+        if create:
+            try:
+                conn = self._new_connection()
+            except Exception:
+                with self._lock:
+                    self._open -= 1
+                    self._lock.notify()
+                raise
+
+        conn._depth = 1
+        self._local.conn = conn
+        return conn
+
+    def release(self, conn):
+        """Give a connection back; it becomes idle when its last checkout ends."""
+        conn._depth -= 1
+        if conn._depth > 0:
+            return
+
+        # Never hand a half-finished transaction to the next caller
+        if conn.in_transaction:
+            conn.rollback()
+
+        if getattr(self._local, "conn", None) is conn:
+            self._local.conn = None
+
+        with self._lock:
+            self._idle.append(conn)
+            self._lock.notify()
+
+    def connection(self):
+        """Context manager: with pool.connection() as conn: ..."""
+        return _Checkout(self)
+
+    def stats(self):
+        """Return open/idle counts and how long callers waited for a connection."""
+        with self._lock:
+            return {
+                "read_only": self.read_only,
+                "max_size": self.max_size,
+                "open": self._open,
+                "idle": len(self._idle),
+                "in_use": self._open - len(self._idle),
+                "checkouts": self._checkouts,
+                "waits": self._waits,
+                "total_wait_ms": round(self._total_wait * 1000, 3),
+                "max_wait_ms": round(self._max_wait * 1000, 3),
+            }
+
+    def close_all(self):
+        """Close every idle connection in the pool."""
+        with self._lock:
+            while self._idle:
+                conn = self._idle.pop()
+                conn._pool = None
+                sqlite3.Connection.close(conn)
+                self._open -= 1
+
+
+class _Checkout:
+    """Borrow a connection for the length of a with-block."""
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._conn = None
+
+    def __enter__(self):
+        self._conn = self._pool.acquire()
+        return self._conn
+
+    def __exit__(self, exc_type, exc, tb):
+        self._pool.release(self._conn)
+        return False
+
+
+# One read-write and one read-only pool per database file
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path=DB_PATH, read_only=False):
+    """Get (or create) the connection pool for a database file."""
+    key = (str(Path(db_path).resolve()), read_only)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            pool = ConnectionPool(db_path, read_only=read_only)
+            _pools[key] = pool
+        return pool
+
+
+def get_pool_stats(db_path=DB_PATH, read_only=False):
+    """Return the stats of the pool for a database file."""
+    return get_pool(db_path, read_only).stats()
+
+
+def connect_database(db_path=DB_PATH, read_only=False):
+    """
+    Borrow a pooled connection to the SQLite database.
+    Calling conn.close() returns it to the pool.
+    read_only=True gives a query-only connection for dashboard reads.
+    """
+    return get_pool(db_path, read_only).acquire()
+
+
+@contextmanager
+def session(db_path=DB_PATH, read_only=False):
+    """
+    Unit of work: one connection and one transaction for a block of calls.
+    Pass the session to the data functions as conn=...; they leave it open
+    and don't commit, so:
+      - reads all see the same snapshot of the database
+      - writes are committed together when the block ends (rolled back on error)
+    Calls with conn=None inside the block get the same connection from the
+    pool and join the transaction too.
+
+    with session(read_only=True) as s:
+        by_severity = get_incidents_by_severity_count(conn=s)
+        by_status = get_incidents_by_status_count(conn=s)
+    """
+    conn = connect_database(db_path, read_only)
+
+    # A session already open in this thread: join its transaction
+    nested = conn.in_transaction
+
+    try:
+        if not nested:
+            # Deferred BEGIN pins the read snapshot at the first SELECT;
+            # IMMEDIATE takes the write lock up front so writes can't hit SQLITE_BUSY later
+            conn.execute("BEGIN" if read_only else "BEGIN IMMEDIATE")
+        yield conn
+        if not nested:
+            if read_only:
+                conn.rollback()
+            else:
+                conn.commit()
+    except BaseException:
+        if not nested and conn.in_transaction:
+            conn.rollback()
+        raise
+    finally:
+        conn.close()
+
+
+def iter_param_rows(rows, columns):
+    """
+    Turn a DataFrame or an iterable of dicts/tuples into parameter tuples
+    for executemany, in the order given by columns.
+    DataFrame columns are matched by name (missing ones become NULL, NaN becomes NULL).
+    """
+    # Imported here so the connection code doesn't need pandas
+    import pandas as pd
+
+    if isinstance(rows, pd.DataFrame):
+        df = rows.reindex(columns=columns)
+        df = df.astype(object).where(df.notna(), None)
+        return df.itertuples(index=False, name=None)
+
+    return (
+        tuple(row.get(col) for col in columns) if isinstance(row, dict) else tuple(row)
+        for row in rows
+    )
@@ -0,0 +1,57 @@
+def get_high_water_mark(conn, table):
+    """
+    Current high-water mark of a table: (highest id, change sequence).
+    New rows have a higher id; updated and deleted rows a higher change sequence.
+    """
+    max_id = conn.execute(f"SELECT COALESCE(MAX(id), 0) FROM {table}").fetchone()[0]
+    seq = conn.execute("SELECT seq FROM change_sequence WHERE id = 1").fetchone()[0]
+    return (max_id, seq)
+
+
+def fetch_delta(conn, table, columns, since=None):
+    """
+    Fetch the rows of a table inserted or updated after a high-water mark.
+
+    since is the mark returned by the previous call (None = every row).
+    Returns (rows, deleted_ids, mark); pass mark back in as since next time.
+
+    The mark and the rows are read in one read transaction, so they come
+    from the same snapshot: a write that lands in between is in neither and
+    is returned next time - never missed, never returned twice. Apply the
+    rows first, then the deletions.
+    """
+    # Inside a session the reads already share its transaction
+    owns_txn = not conn.in_transaction
+    if owns_txn:
+        conn.execute("BEGIN")
+    try:
+        return _read_delta(conn, table, columns, since)
+    finally:
+        if owns_txn:
+            # Nothing was written; this just ends the read
+            conn.rollback()
+
+
+def _read_delta(conn, table, columns, since):
+    """The reads of fetch_delta; the caller holds the read transaction."""
+    mark = get_high_water_mark(conn, table)
+    select = f"SELECT {', '.join(columns)} FROM {table}"
+
+    if since is None:
+        rows = conn.execute(f"{select} ORDER BY id").fetchall()
+        return rows, [], mark
+
+    since_id, since_seq = since
+    # Two index range reads; "id > ? OR change_seq > ?" would scan the table
+    rows = conn.execute(f"""
+        {select} WHERE id IN (
+            SELECT id FROM {table} WHERE id > ?
+            UNION ALL
+            SELECT id FROM {table} WHERE change_seq > ?
+        ) ORDER BY id
+    """, (since_id, since_seq)).fetchall()
+    deleted_ids = [row[0] for row in conn.execute(
+        "SELECT row_id FROM deleted_rows WHERE table_name = ? AND change_seq > ?",
+        (table, since_seq)
+    )]
+    return rows, deleted_ids, mark
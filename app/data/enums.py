@@ -0,0 +1,113 @@
+# Integer-coded enumerations for the fixed-value text columns.
+# Each domain is a lookup table (code INTEGER PRIMARY KEY, label TEXT).
+# Codes are the label's position + 1, so higher code = higher level / later
+# status, and 0 means "not a known label". Labels are matched case-insensitively.
+#
+# The code columns are generated from this list by migration 6; adding a label
+# later needs a new migration that recreates them.
+ENUMS = {
+    "severity_levels": ["Low", "Medium", "High", "Critical"],
+    "priority_levels": ["Low", "Medium", "High", "Critical"],
+    "incident_statuses": ["Open", "In Progress", "Resolved", "Closed"],
+    "ticket_statuses": ["Open", "In Progress", "On Hold", "Waiting for User", "Resolved", "Closed"],
+}
+
+# Coded columns: table -> {text column: domain}. Each gets a <column>_code column.
+ENUM_COLUMNS = {
+    "cyber_incidents": {"severity": "severity_levels", "status": "incident_statuses"},
+    "it_tickets": {"priority": "priority_levels", "status": "ticket_statuses"},
+}
+
+# lower-case label -> code, per domain
+CODES = {
+    domain: {label.lower(): code for code, label in enumerate(labels, start=1)}
+    for domain, labels in ENUMS.items()
+}
+
+
+def code_of(domain, value):
+    """Integer code of a label (any case), 0 if unknown."""
+    if value is None:
+        return 0
+    return CODES[domain].get(str(value).strip().lower(), 0)
+
+
+def normalize_label(domain, value):
+    """Canonical spelling of a label ('critical' -> 'Critical'); unknown values are kept."""
+    code = code_of(domain, value)
+    return ENUMS[domain][code - 1] if code else value
+
+
+def normalize_rows(rows, columns, table):
+    """
+    Normalize the enum values in parameter tuples (e.g. from iter_param_rows)
+    before they are written, so 'critical' and 'Critical' don't split counts.
+    """
+    positions = [(columns.index(col), domain)
+                 for col, domain in ENUM_COLUMNS[table].items() if col in columns]
+    for row in rows:
+        row = list(row)
+        for i, domain in positions:
+            row[i] = normalize_label(domain, row[i])
+        yield tuple(row)
+
+
+# Schema
+def lookup_table_statements():
+    """CREATE and fill the lookup tables."""
+    statements = []
+    for domain, labels in ENUMS.items():
+        statements.append(f"""
+            CREATE TABLE IF NOT EXISTS {domain} (
+                code INTEGER PRIMARY KEY,
+                label TEXT NOT NULL UNIQUE COLLATE NOCASE
+            )""")
+        values = ", ".join(f"({code}, '{label}')" for code, label in enumerate(labels, start=1))
+        statements.append(f"INSERT OR IGNORE INTO {domain} (code, label) VALUES {values}")
+    return statements
+
+
+def code_column_expression(column, domain):
+    """SQL expression mapping a text column to its code (0 if unknown)."""
+    cases = " ".join(f"WHEN '{label}' THEN {code}" for label, code in CODES[domain].items())
+    return f"CASE lower(trim({column})) {cases} ELSE 0 END"
+
+
+def enum_column_statements():
+    """
+    Rewrite existing values to the canonical label, then add the code columns.
+    The code columns are VIRTUAL generated columns: computed from the text on
+    read, so they can never disagree with it, and they take no space in the row.
+    Indexes on them store the small integers.
+    """
+    statements = []
+    for table, columns in ENUM_COLUMNS.items():
+        for column, domain in columns.items():
+            # label has NOCASE collation, so "label = column" ignores case
+            statements.append(f"""
+                UPDATE {table} SET {column} = (
+                    SELECT label FROM {domain} WHERE label = trim({table}.{column})
+                )
+                WHERE EXISTS (
+                    SELECT 1 FROM {domain}
+                    WHERE label = trim({table}.{column}) AND label <> {table}.{column} COLLATE BINARY
+                )""")
+            statements.append(f"""
+                ALTER TABLE {table} ADD COLUMN {column}_code INTEGER
+                GENERATED ALWAYS AS ({code_column_expression(column, domain)}) VIRTUAL""")
+    return statements
+
+
+# pandas
+def categorical_dtype(domain, values=None):
+    """
+    Ordered pandas categorical dtype for a domain (categories in code order).
+    Values that aren't known labels are added at the end instead of becoming NaN.
+    """
+    import pandas as pd
+
+    categories = list(ENUMS[domain])
+    if values is not None:
+        known = set(categories)
+        categories += sorted({v for v in values if isinstance(v, str)} - known)
+    return pd.CategoricalDtype(categories, ordered=True)
@@ -1,10 +1,19 @@
 import pandas as pd
 from pathlib import Path
-from app.data.db import connect_database
+from app.data.db import connect_database, session, iter_param_rows
+from app.data.pagination import fetch_page, PAGE_SIZE
+from app.data.bulk import insert_batch
+from app.data.delta import fetch_delta
+from app.data.aggregates import read_counts, read_total
+from app.data.enums import CODES, code_of, normalize_label, normalize_rows
+from app.data.timestamps import to_epoch
 
 
 DATA_DIR = Path("DATA")
 
+# Columns accepted by insert_incidents_many
+INCIDENT_COLUMNS = ['date', 'incident_type', 'severity', 'status', 'description', 'reported_by']
+
 def load_incidents_csv():
     """Load incidents from CSV file."""
     csv_file = DATA_DIR / "cyber_incidents.csv"
@@ -19,14 +28,23 @@ def save_incidents_csv(df):
     df.to_csv(DATA_DIR / "cyber_incidents.csv", index=False)
 
 # create 
-def insert_incident(date, incident_type, severity, status, description, reported_by=None):
+def insert_incident(date, incident_type, severity, status, description, reported_by=None, conn=None):
     """
     Insert a new cyber incident into the database.
     """
     # Connect to database
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
+    # Store the canonical spelling ('critical' -> 'Critical')
+    severity = normalize_label("severity_levels", severity)
+    status = normalize_label("incident_statuses", status)
+    
     # Insert incident using parameterized query
     cursor.execute("""
         INSERT INTO cyber_incidents 
@@ -35,11 +53,13 @@ def insert_incident(date, incident_type, severity, status, description, reported
     """, (date, incident_type, severity, status, description, reported_by))
     
     # Save changes
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     
     # Get the ID of inserted incident
     incident_id = cursor.lastrowid
-    conn.close()
+    if owns_conn:
+        conn.close()
     
     print(f"✅ Incident #{incident_id} created successfully!")
     return incident_id
@@ -47,12 +67,28 @@ def insert_incident(date, incident_type, severity, status, description, reported
 
 
 # Read
-def get_all_incidents():
+def insert_incidents_many(rows, conn=None):
+    """
+    Insert many incidents with one executemany in one transaction.
+    rows: DataFrame or iterable of dicts/tuples with INCIDENT_COLUMNS.
+    Returns the number of rows inserted.
+    """
+    # Without a caller's session, open one so the batch commits once
+    if conn is None:
+        with session() as s:
+            return insert_incidents_many(rows, conn=s)
+    
+    return insert_batch(conn, "cyber_incidents", INCIDENT_COLUMNS, normalize_rows(iter_param_rows(rows, INCIDENT_COLUMNS), INCIDENT_COLUMNS, "cyber_incidents"))
+
+
+def get_all_incidents(conn=None):
     """
     Get all incidents from the database.
     """
     # Connect to database
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
     # Read all incidents into DataFrame
     df = pd.read_sql_query(
@@ -60,23 +96,69 @@ def get_all_incidents():
         conn
     )
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     
     return df
 
 
-def get_incident_by_id(incident_id):
+def get_incidents_page(cursor=None, page_size=PAGE_SIZE, order_by_date=False, conn=None):
+    """
+    Get one page of incidents, newest first, using keyset pagination.
+    Pass the returned next_cursor to get the following page (None = no more pages).
+    Returns (DataFrame, next_cursor).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    columns = ['id'] + INCIDENT_COLUMNS + ['created_at']
+    rows, next_cursor = fetch_page(
+        conn, "cyber_incidents", columns,
+        sort_column="date" if order_by_date else None,
+        cursor=cursor, page_size=page_size
+    )
+    
+    if owns_conn:
+        conn.close()
+    
+    return pd.DataFrame(rows, columns=columns), next_cursor
+
+
+def get_incidents_delta(since=None, conn=None):
+    """
+    Get the incidents inserted, updated or deleted since a high-water mark.
+    since is the mark from the previous call (None = all incidents).
+    Returns (DataFrame of changed rows, deleted ids, new mark).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    columns = ['id'] + INCIDENT_COLUMNS + ['created_at', 'date_ts']
+    rows, deleted_ids, mark = fetch_delta(conn, "cyber_incidents", columns, since=since)
+    
+    if owns_conn:
+        conn.close()
+    
+    return pd.DataFrame(rows, columns=columns), deleted_ids, mark
+
+
+def get_incident_by_id(incident_id, conn=None):
     """
     Get a specific incident by ID.
     """
     # Connect to database
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     cursor = conn.cursor()
     
     # Find incident by ID
     cursor.execute("SELECT * FROM cyber_incidents WHERE id = ?", (incident_id,))
     incident = cursor.fetchone()
-    conn.close()
+    if owns_conn:
+        conn.close()
     
     if incident:
         print(f"✅ Found incident #{incident_id}")
@@ -86,81 +168,123 @@ def get_incident_by_id(incident_id):
         return None
 
 
-def get_incidents_by_severity(severity):
+def get_incidents_by_severity(severity, conn=None):
     """
-    Get all incidents with specific severity.
+    Get all incidents with specific severity (any case: 'high' finds 'High').
     """
     # Connect to database
-    conn = connect_database()
-    
-    # Read incidents with specific severity
-    df = pd.read_sql_query(
-        "SELECT * FROM cyber_incidents WHERE severity = ? ORDER BY date DESC",
-        conn,
-        params=(severity,)
-    )
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    # Known levels are matched on the integer code, anything else on the text
+    code = code_of("severity_levels", severity)
+    if code:
+        sql, params = "SELECT * FROM cyber_incidents WHERE severity_code = ? ORDER BY date DESC", (code,)
+    else:
+        sql, params = "SELECT * FROM cyber_incidents WHERE severity = ? ORDER BY date DESC", (severity,)
+    df = pd.read_sql_query(sql, conn, params=params)
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     
     print(f"✅ Found {len(df)} incidents with severity '{severity}'")
     return df
 
 
+def get_incidents_between(start, end, conn=None):
+    """
+    Get the incidents dated from start (inclusive) to end (exclusive), newest first.
+    start/end are dates, datetimes or ISO strings; compared on the indexed date_ts.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    df = pd.read_sql_query("""
+        SELECT * FROM cyber_incidents
+        WHERE date_ts >= ? AND date_ts < ?
+        ORDER BY date_ts DESC
+    """, conn, params=(to_epoch(start), to_epoch(end)))
+    
+    if owns_conn:
+        conn.close()
+    return df
+
+
 # Update
 
-def update_incident_status(incident_id, new_status):
+def update_incident_status(incident_id, new_status, conn=None):
     """
     Change the status of an incident.
+    The change is logged in status_transitions by a trigger.
     """
     # Connect to database
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
     # Update incident status
+    new_status = normalize_label("incident_statuses", new_status)
     cursor.execute(
         "UPDATE cyber_incidents SET status = ? WHERE id = ?",
         (new_status, incident_id)
     )
     
     # Save changes
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     
     # Check if incident was found and updated
     if cursor.rowcount > 0:
         print(f"✅ Incident #{incident_id} status updated to '{new_status}'")
-        conn.close()
+        if owns_conn:
+            conn.close()
         return True
     else:
         print(f"❌ Incident #{incident_id} not found")
-        conn.close()
+        if owns_conn:
+            conn.close()
         return False
 
 
 
 # Delete 
 
-def delete_incident(incident_id):
+def delete_incident(incident_id, conn=None):
     """
     DELETE: Remove an incident from the database.
     """
     # Connect to database
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
     # Delete incident by ID
     cursor.execute("DELETE FROM cyber_incidents WHERE id = ?", (incident_id,))
     
     # Save changes
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     
     # Check if incident was found and deleted
     if cursor.rowcount > 0:
         print(f"✅ Incident #{incident_id} deleted successfully!")
-        conn.close()
+        if owns_conn:
+            conn.close()
         return True
     else:
         print(f"❌ Incident #{incident_id} not found")
-        conn.close()
+        if owns_conn:
+            conn.close()
         return False
     
 
@@ -171,18 +295,16 @@ def get_incidents_by_severity_count(conn=None):
     
     Uses: SELECT, FROM, GROUP BY, ORDER BY
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    df = pd.read_sql_query("""
-        SELECT severity, COUNT(*) as count
-        FROM cyber_incidents
-        GROUP BY severity
-        ORDER BY count DESC
-    """, conn)
+    # Counts kept up to date by triggers, no GROUP BY scan
+    df = read_counts(conn, "cyber_incidents", "severity")
     
 
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -192,17 +314,15 @@ def get_incidents_by_status_count(conn=None):
     
     Uses: SELECT, FROM, GROUP BY, ORDER BY
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    df = pd.read_sql_query("""
-        SELECT status, COUNT(*) as count
-        FROM cyber_incidents
-        GROUP BY status
-        ORDER BY count DESC
-    """, conn)
+    # Counts kept up to date by triggers, no GROUP BY scan
+    df = read_counts(conn, "cyber_incidents", "status")
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -212,17 +332,15 @@ def get_incidents_by_type_count(conn=None):
     
     Uses: SELECT, FROM, GROUP BY, ORDER BY
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    df = pd.read_sql_query("""
-        SELECT incident_type, COUNT(*) as count
-        FROM cyber_incidents
-        GROUP BY incident_type
-        ORDER BY count DESC
-    """, conn)
+    # Counts kept up to date by triggers, no GROUP BY scan
+    df = read_counts(conn, "cyber_incidents", "incident_type")
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -232,17 +350,19 @@ def get_critical_incidents(conn=None):
     
     Uses: SELECT, FROM, WHERE, ORDER BY
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
     df = pd.read_sql_query("""
         SELECT * FROM cyber_incidents
-        WHERE severity = 'Critical'
+        WHERE severity_code = ?
         ORDER BY date DESC
-    """, conn)
+    """, conn, params=(CODES["severity_levels"]["critical"],))
     
 
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -252,16 +372,18 @@ def get_open_incidents(conn=None):
     
     Uses: SELECT, FROM, WHERE, ORDER BY
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
     df = pd.read_sql_query("""
         SELECT * FROM cyber_incidents
-        WHERE status = 'Open'
+        WHERE status_code = ?
         ORDER BY date DESC
-    """, conn)
+    """, conn, params=(CODES["incident_statuses"]["open"],))
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -271,18 +393,20 @@ def get_high_severity_by_status(conn=None):
     
     Uses: SELECT, FROM, WHERE, GROUP BY, ORDER BY
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
     df = pd.read_sql_query("""
         SELECT status, COUNT(*) as count
         FROM cyber_incidents
-        WHERE severity = 'High'
+        WHERE severity_code = ?
         GROUP BY status
         ORDER BY count DESC
-    """, conn)
+    """, conn, params=(CODES["severity_levels"]["high"],))
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -290,13 +414,47 @@ def get_incidents_count_total(conn=None):
     """
     Get total count of all incidents.
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    result = conn.execute("""
-        SELECT COUNT(*) FROM cyber_incidents
-    """).fetchone()
+    # Row total kept by triggers, no table scan
+    total = read_total(conn, "cyber_incidents")
     
 
-    conn.close()
-    return result[0]
\ No newline at end of file
+    if owns_conn:
+        conn.close()
+    return total
+
+
+def get_incident_summary(conn=None):
+    """
+    Get every headline KPI for the incidents dashboard in one pass.
+    Severity and status are compared by integer code (app/data/enums.py).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    cursor = conn.execute("""
+        SELECT
+            COUNT(*) AS total,
+            COALESCE(SUM(severity_code = 4), 0) AS critical,
+            COALESCE(SUM(severity_code = 3), 0) AS high,
+            COALESCE(SUM(severity_code = 2), 0) AS medium,
+            COALESCE(SUM(severity_code = 1), 0) AS low,
+            COALESCE(SUM(status_code = 1), 0) AS open,
+            COALESCE(SUM(status_code = 2), 0) AS in_progress,
+            COALESCE(SUM(status_code = 3), 0) AS resolved,
+            COALESCE(SUM(status_code = 4), 0) AS closed,
+            COALESCE(SUM(lower(incident_type) LIKE '%phishing%'), 0) AS phishing,
+            COALESCE(SUM(lower(incident_type) LIKE '%phishing%'
+                         AND status_code IN (1, 2)), 0) AS unresolved_phishing
+        FROM cyber_incidents
+    """)
+    columns = [col[0] for col in cursor.description]
+    summary = dict(zip(columns, cursor.fetchone()))
+    
+    if owns_conn:
+        conn.close()
+    return summary
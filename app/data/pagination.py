@@ -0,0 +1,43 @@
+# Default number of rows per page in the dashboard tables
+PAGE_SIZE = 50
+
+
+def fetch_page(conn, table, columns, sort_column=None, cursor=None, page_size=PAGE_SIZE):
+    """
+    Fetch one page of a table with keyset pagination, newest first.
+
+    Rows are ordered by (sort_column, id) descending, or by id alone, and the
+    next page starts right after the last key seen - so every page is an
+    index range read, however deep into the table it is.
+
+    cursor is the next_cursor returned for the previous page (None = first page).
+    Returns (rows, next_cursor); next_cursor is None on the last page.
+    Rows whose sort_column is NULL are not reachable in sort_column order.
+    """
+    key_columns = [sort_column, "id"] if sort_column else ["id"]
+
+    sql = f"SELECT {', '.join(list(columns) + key_columns)} FROM {table}"
+    params = []
+    if cursor is not None:
+        if sort_column:
+            sql += f" WHERE ({sort_column}, id) < (?, ?)"
+            params.extend(cursor)
+        else:
+            sql += " WHERE id < ?"
+            params.append(cursor)
+    sql += " ORDER BY " + ", ".join(f"{col} DESC" for col in key_columns) + " LIMIT ?"
+
+    # One extra row tells us whether there is another page
+    params.append(page_size + 1)
+    rows = conn.execute(sql, params).fetchall()
+
+    has_more = len(rows) > page_size
+    rows = rows[:page_size]
+
+    next_cursor = None
+    if has_more:
+        last_key = rows[-1][-len(key_columns):]
+        next_cursor = tuple(last_key) if sort_column else last_key[0]
+
+    # Drop the key columns that were only selected for the cursor
+    return [row[:-len(key_columns)] for row in rows], next_cursor
@@ -0,0 +1,373 @@
+import pandas as pd
+from app.data.db import connect_database
+from app.data.schema import SAMPLE_TABLES
+
+# Columns that may be used in a query, per table.
+# Table and column names can't be bound as parameters, so anything else is rejected.
+TABLE_COLUMNS = {
+    "cyber_incidents": {"id", "date", "incident_type", "severity", "status",
+                        "description", "reported_by", "created_at",
+                        "severity_code", "status_code", "date_ts"},
+    "it_tickets": {"id", "ticket_id", "priority", "status", "category", "subject",
+                   "description", "created_date", "resolved_date", "assigned_to", "created_at",
+                   "priority_code", "status_code", "created_ts", "resolved_ts",
+                   "resolution_time_hours"},
+    "datasets_metadata": {"id", "dataset_name", "category", "source", "last_updated",
+                          "record_count", "file_size_mb", "created_at", "last_updated_ts"},
+}
+
+# Filter operators -> SQL template ({col} is the column, ? the value)
+OPERATORS = {
+    "=": "{col} = ?",
+    "!=": "{col} != ?",
+    "<": "{col} < ?",
+    "<=": "{col} <= ?",
+    ">": "{col} > ?",
+    ">=": "{col} >= ?",
+    "contains": "{col} LIKE '%' || ? || '%' ESCAPE '\\'",   # LIKE is case-insensitive for ASCII
+    "startswith": "{col} LIKE ? || '%' ESCAPE '\\'",
+    "in": "{col} IN ({placeholders})",
+    "not in": "{col} NOT IN ({placeholders})",
+    "is null": "{col} IS NULL",
+    "not null": "{col} IS NOT NULL",
+}
+
+# Operators whose value is matched as text with LIKE
+LIKE_OPERATORS = {"contains", "startswith"}
+
+# Aggregate functions allowed in aggregate()
+AGGREGATES = {"count", "sum", "avg", "min", "max"}
+
+# Date buckets for group_by(..., bucket=...)
+BUCKETS = {
+    "day": "date({col})",
+    "month": "strftime('%Y-%m', {col})",
+    "year": "strftime('%Y', {col})",
+}
+
+# Length of the ISO date prefix for each bucket (used on Arrow snapshots)
+BUCKET_PREFIX = {"day": 10, "month": 7, "year": 4}
+
+
+def escape_like(text):
+    """Escape LIKE wildcards so text matches literally (with ESCAPE '\\')."""
+    return str(text).replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+class Query:
+    """
+    Builds a parameterized SELECT over one of the dashboard tables, so the
+    filtering, grouping, sorting and limiting happen inside SQLite.
+
+    Query("it_tickets")
+        .where("status", "in", ["Open", "In Progress"])
+        .group_by("assigned_to")
+        .aggregate("Total Tickets", "count")
+        .order_by("Total Tickets", descending=True)
+        .fetch_df()
+
+    The same query can also run on an Arrow snapshot of the table (fetch_arrow).
+    """
+
+    def __init__(self, table):
+        if table not in TABLE_COLUMNS:
+            raise ValueError(f"Unknown table: {table}")
+        self.table = table
+        self._columns = []        # output columns, see select/group_by/aggregate
+        self._filters = []        # (column, op, value)
+        self._groups = []         # (column, bucket, dropna)
+        self._orders = []         # (name, descending)
+        self._limit = None
+        self._sample = None       # sample_key limit, see sample()
+
+    # Helpers
+    def _column(self, column):
+        """Validate a column name for this table."""
+        if column not in TABLE_COLUMNS[self.table]:
+            raise ValueError(f"Unknown column '{column}' for table {self.table}")
+        return column
+
+    def _check_condition(self, column, op):
+        """Validate one filter condition."""
+        if op not in OPERATORS:
+            raise ValueError(f"Unknown operator: {op}")
+        self._column(column)
+
+    @staticmethod
+    def _condition_sql(column, op, value):
+        """Build (sql, params) for one filter condition."""
+        if op in ("in", "not in"):
+            values = list(value)
+            if not values:
+                # IN () matches nothing, NOT IN () matches everything
+                return ("0" if op == "in" else "1"), []
+            placeholders = ", ".join("?" for _ in values)
+            return OPERATORS[op].format(col=column, placeholders=placeholders), values
+        if op in ("is null", "not null"):
+            return OPERATORS[op].format(col=column), []
+        if op in LIKE_OPERATORS:
+            # % and _ in the text are literal, as on Arrow snapshots
+            return OPERATORS[op].format(col=column), [escape_like(value)]
+        return OPERATORS[op].format(col=column), [value]
+
+    @staticmethod
+    def _group_sql(column, bucket):
+        """SQL expression for a (possibly bucketed) group column."""
+        return BUCKETS[bucket].format(col=column) if bucket else column
+
+    def _aliases(self):
+        """Output column names, in select order."""
+        return [item[-1] for item in self._columns]
+
+    # Builder methods (each returns self so calls can be chained)
+    def select(self, *columns):
+        """Return these columns as they are."""
+        for column in columns:
+            self._columns.append(("column", self._column(column), column))
+        return self
+
+    def where(self, column, op, value=None):
+        """Keep only rows matching the condition. Several where() calls are ANDed."""
+        self._check_condition(column, op)
+        self._filters.append((column, op, value))
+        return self
+
+    def group_by(self, column, bucket=None, alias=None, dropna=True):
+        """
+        Group by a column, optionally bucketed by day/month/year.
+        Like pandas groupby, NULL keys are left out unless dropna=False.
+        """
+        self._column(column)
+        if bucket is not None and bucket not in BUCKETS:
+            raise ValueError(f"Unknown bucket: {bucket}")
+        self._groups.append((column, bucket, dropna))
+        self._columns.append(("group", column, bucket, alias or column))
+        return self
+
+    def aggregate(self, alias, func, column="*", where=None):
+        """
+        Add an aggregate column, e.g. aggregate("Total", "sum", "file_size_mb").
+        where=(column, op, value) counts/sums only the matching rows,
+        e.g. aggregate("Open", "count", where=("status", "in", ["Open", "In Progress"])).
+        """
+        if func not in AGGREGATES:
+            raise ValueError(f"Unknown aggregate: {func}")
+        if column != "*":
+            self._column(column)
+        if where is not None:
+            self._check_condition(where[0], where[1])
+        self._columns.append(("aggregate", func, column, where, alias))
+        return self
+
+    def order_by(self, name, descending=False):
+        """Sort by a column or by the alias of a selected/aggregate column."""
+        if name not in self._aliases():
+            self._column(name)
+        self._orders.append((name, descending))
+        return self
+
+    def limit(self, n):
+        """Return at most n rows."""
+        self._limit = int(n)
+        return self
+
+    def sample(self, key_limit):
+        """
+        Read only the rows with sample_key < key_limit, through the sample_key
+        index. Aggregates are over the sample; app.data.sampling scales them.
+        """
+        if self.table not in SAMPLE_TABLES:
+            raise ValueError(f"Table {self.table} has no sample keys")
+        self._sample = int(key_limit)
+        return self
+
+    def aggregate_columns(self):
+        """(alias, function) of every aggregate column, in select order."""
+        return [(item[4], item[1]) for item in self._columns if item[0] == "aggregate"]
+
+    def columns_used(self):
+        """Every table column the query reads, so a snapshot can load only those."""
+        used = {column for column, _, _ in self._filters}
+        for item in self._columns:
+            if item[0] in ("column", "group"):
+                used.add(item[1])
+            else:
+                _, _, column, where, _ = item
+                if column != "*":
+                    used.add(column)
+                if where is not None:
+                    used.add(where[0])
+        aliases = self._aliases()
+        used.update(name for name, _ in self._orders if name not in aliases)
+        return sorted(used)
+
+    # Output
+    def to_sql(self):
+        """Return (sql, params) for the query."""
+        select_parts = []
+        params = []
+        for item in self._columns:
+            if item[0] == "column":
+                expr, alias = item[1], item[2]
+            elif item[0] == "group":
+                expr, alias = self._group_sql(item[1], item[2]), item[3]
+            else:
+                _, func, column, where, alias = item
+                if where is None:
+                    expr = f"{func.upper()}({column})"
+                else:
+                    condition, where_params = self._condition_sql(*where)
+                    value = "1" if column == "*" else column
+                    if func == "count":
+                        expr = f"COALESCE(SUM(CASE WHEN {condition} THEN 1 ELSE 0 END), 0)"
+                    else:
+                        expr = f"{func.upper()}(CASE WHEN {condition} THEN {value} END)"
+                    params.extend(where_params)
+            select_parts.append(f'{expr} AS "{alias}"')
+
+        select = ", ".join(select_parts) if select_parts else "*"
+        sql = f"SELECT {select} FROM {self.table}"
+
+        filters = []
+        if self._sample is not None:
+            # Without INDEXED BY a GROUP BY index could win and scan every row
+            sql += f" INDEXED BY idx_{self.table}_sample_key"
+            filters.append("sample_key < ?")
+            params.append(self._sample)
+        for column, op, value in self._filters:
+            condition, where_params = self._condition_sql(column, op, value)
+            filters.append(condition)
+            params.extend(where_params)
+        for column, bucket, dropna in self._groups:
+            if dropna:
+                filters.append(f"{self._group_sql(column, bucket)} IS NOT NULL")
+        if filters:
+            sql += " WHERE " + " AND ".join(filters)
+
+        if self._groups:
+            sql += " GROUP BY " + ", ".join(self._group_sql(col, bucket) for col, bucket, _ in self._groups)
+
+        if self._orders:
+            aliases = self._aliases()
+            sql += " ORDER BY " + ", ".join(
+                (f'"{name}"' if name in aliases else name) + (" DESC" if descending else " ASC")
+                for name, descending in self._orders
+            )
+
+        if self._limit is not None:
+            sql += " LIMIT ?"
+            params.append(self._limit)
+        return sql, params
+
+    def fetch_df(self, conn=None):
+        """Run the query and return the result as a DataFrame."""
+        owns_conn = conn is None
+        if owns_conn:
+            conn = connect_database(read_only=True)
+
+        sql, params = self.to_sql()
+        df = pd.read_sql_query(sql, conn, params=params)
+
+        if owns_conn:
+            conn.close()
+        return df
+
+    # Arrow snapshots (pyarrow is imported here so SQLite-only use doesn't need it)
+    @staticmethod
+    def _arrow_condition(table, column, op, value):
+        """Boolean mask for one filter condition; NULL never matches, like in SQL."""
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        col = table[column]
+        if op == "contains":
+            mask = pc.match_substring(col, value, ignore_case=True)
+        elif op == "startswith":
+            mask = pc.starts_with(col, value, ignore_case=True)
+        elif op in ("in", "not in"):
+            mask = pc.is_in(col, value_set=pa.array(list(value), type=col.type))
+            if op == "not in":
+                mask = pc.and_(pc.is_valid(col), pc.invert(mask))
+        elif op == "is null":
+            mask = pc.is_null(col)
+        elif op == "not null":
+            mask = pc.is_valid(col)
+        else:
+            compare = {"=": pc.equal, "!=": pc.not_equal, "<": pc.less,
+                       "<=": pc.less_equal, ">": pc.greater, ">=": pc.greater_equal}[op]
+            mask = compare(col, value)
+        return pc.fill_null(mask, False)
+
+    def fetch_arrow(self, table):
+        """
+        Run the query on an Arrow table (e.g. a snapshot from app.data.snapshots)
+        and return the result as a DataFrame, without going through SQLite.
+        Date buckets use the ISO prefix of the value (YYYY-MM-DD...).
+        """
+        import pyarrow as pa
+        import pyarrow.compute as pc
+
+        if self._sample is not None:
+            raise ValueError("Sampled queries run on SQLite only (fetch_df)")
+
+        for column, op, value in self._filters:
+            table = table.filter(self._arrow_condition(table, column, op, value))
+
+        # Output columns and aggregate inputs: {name: array}
+        inputs = {}
+        aggregations = []         # (input name, arrow function, alias, is a count)
+        for i, item in enumerate(self._columns):
+            if item[0] == "column":
+                inputs[item[2]] = table[item[1]]
+            elif item[0] == "group":
+                _, column, bucket, alias = item
+                key = table[column]
+                if bucket:
+                    key = pc.utf8_slice_codeunits(key, 0, BUCKET_PREFIX[bucket])
+                inputs[alias] = key
+            else:
+                _, func, column, where, alias = item
+                is_count = func == "count" and (column == "*" or where is not None)
+                if where is not None:
+                    mask = self._arrow_condition(table, *where)
+                    if func == "count":
+                        values = pc.cast(mask, pa.int64())
+                    else:
+                        values = pc.if_else(mask, table[column], pa.scalar(None, table[column].type))
+                elif column == "*":
+                    values = pa.array([1] * len(table), pa.int64())
+                else:
+                    values = table[column]
+                func = "sum" if is_count else {"avg": "mean"}.get(func, func)
+                inputs[f"_agg{i}"] = values
+                aggregations.append((f"_agg{i}", func, alias, is_count))
+
+        if not inputs:
+            result = table
+        else:
+            work = pa.table(inputs)
+            groups = [item[3] for item in self._columns if item[0] == "group"]
+            for (_, _, dropna), alias in zip(self._groups, groups):
+                if dropna:
+                    work = work.filter(pc.is_valid(work[alias]))
+
+            if groups:
+                result = work.group_by(groups).aggregate([(name, func) for name, func, _, _ in aggregations])
+                renames = {f"{name}_{func}": alias for name, func, alias, _ in aggregations}
+                result = result.rename_columns([renames.get(col, col) for col in result.column_names])
+            elif aggregations:
+                row = {}
+                for name, func, alias, is_count in aggregations:
+                    value = getattr(pc, func)(work[name]).as_py()
+                    row[alias] = [0 if is_count and value is None else value]
+                result = pa.table(row)
+            else:
+                result = work
+            result = result.select(self._aliases())
+
+        if self._orders:
+            result = result.sort_by([(name, "descending" if descending else "ascending")
+                                     for name, descending in self._orders])
+        if self._limit is not None:
+            result = result.slice(0, self._limit)
+        return result.to_pandas()
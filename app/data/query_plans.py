@@ -0,0 +1,101 @@
+import sys
+from app.data.db import connect_database
+from app.data import incidents, tickets, dataset, users
+
+# Data-access functions to check, called with sample arguments.
+# get_all_* are left out on purpose: they return every row by design.
+CHECKED_FUNCTIONS = [
+    ("get_incident_by_id", lambda: incidents.get_incident_by_id(1)),
+    ("get_incidents_by_severity", lambda: incidents.get_incidents_by_severity("High")),
+    ("get_incidents_by_severity_count", incidents.get_incidents_by_severity_count),
+    ("get_incidents_by_status_count", incidents.get_incidents_by_status_count),
+    ("get_incidents_by_type_count", incidents.get_incidents_by_type_count),
+    ("get_critical_incidents", incidents.get_critical_incidents),
+    ("get_open_incidents", incidents.get_open_incidents),
+    ("get_high_severity_by_status", incidents.get_high_severity_by_status),
+    ("get_incidents_between", lambda: incidents.get_incidents_between("2024-03-01", "2024-04-01")),
+    ("get_incidents_count_total", incidents.get_incidents_count_total),
+    ("get_incidents_delta", lambda: incidents.get_incidents_delta((1, 0))),
+    ("get_tickets_by_priority_count", tickets.get_tickets_by_priority_count),
+    ("get_tickets_by_status_count", tickets.get_tickets_by_status_count),
+    ("get_critical_tickets", tickets.get_critical_tickets),
+    ("get_open_tickets", tickets.get_open_tickets),
+    ("get_tickets_assigned_to", lambda: tickets.get_tickets_assigned_to("IT_Support_A")),
+    ("get_tickets_created_between", lambda: tickets.get_tickets_created_between("2024-03-01", "2024-04-01")),
+    ("get_tickets_count_total", tickets.get_tickets_count_total),
+    ("get_tickets_delta", lambda: tickets.get_tickets_delta((1, 0))),
+    ("get_dataset_by_id", lambda: dataset.get_dataset_by_id(1)),
+    ("get_datasets_by_category", lambda: dataset.get_datasets_by_category("Training Data")),
+    ("get_datasets_by_source", lambda: dataset.get_datasets_by_source("data_scientist")),
+    ("get_total_data_size", dataset.get_total_data_size),
+    ("count_datasets_by_category", dataset.count_datasets_by_category),
+    ("get_largest_datasets", dataset.get_largest_datasets),
+    ("get_datasets_delta", lambda: dataset.get_datasets_delta((1, 0))),
+    ("get_user_by_username", lambda: users.get_user_by_username("admin")),
+]
+
+
+def capture_statements(conn, func):
+    """Call func and return the SELECT statements it ran on conn."""
+    statements = []
+
+    def trace(sql):
+        if sql.lstrip().upper().startswith("SELECT"):
+            statements.append(sql)
+
+    conn.set_trace_callback(trace)
+    try:
+        func()
+    finally:
+        conn.set_trace_callback(None)
+    return statements
+
+
+def find_table_scans(conn, sql):
+    """Return the plan steps that read a whole table instead of an index."""
+    plan = conn.execute("EXPLAIN QUERY PLAN " + sql).fetchall()
+    scans = []
+    for row in plan:
+        detail = row[3]
+        # "SCAN t USING COVERING INDEX ..." only reads the index, which is fine
+        if detail.startswith("SCAN ") and "INDEX" not in detail:
+            scans.append(detail)
+    return scans
+
+
+def check_query_plans():
+    """
+    Run every function in CHECKED_FUNCTIONS and EXPLAIN what it executed.
+    Returns a list of (function name, sql, plan step) for each full table scan.
+    """
+    failures = []
+
+    # Holding a checkout means the functions below get this same connection
+    conn = connect_database(read_only=True)
+    try:
+        for name, func in CHECKED_FUNCTIONS:
+            for sql in capture_statements(conn, func):
+                for detail in find_table_scans(conn, sql):
+                    failures.append((name, sql, detail))
+    finally:
+        conn.close()
+
+    return failures
+
+
+def main():
+    failures = check_query_plans()
+
+    if failures:
+        print(f"\n❌ {len(failures)} query plan(s) fall back to a table scan:")
+        for name, sql, detail in failures:
+            print(f"  - {name}: {detail}")
+            print(f"    {' '.join(sql.split())}")
+        return 1
+
+    print(f"\n✅ All {len(CHECKED_FUNCTIONS)} data-access functions use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
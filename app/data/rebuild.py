@@ -0,0 +1,56 @@
+from app.data.db import session
+
+# Shared verify-and-rebuild for the trigger-maintained count tables
+# (aggregate_counts, time_rollups, latency_sketches, surge_counts): recompute
+# the table from the base tables and report the rows the triggers had wrong.
+
+
+def _read_counts(conn, table, key_columns):
+    """Current rows of a count table as {key tuple: count}."""
+    rows = conn.execute(f"""
+        SELECT {', '.join(key_columns)}, count
+        FROM {table} WHERE count > 0
+    """).fetchall()
+    return {row[:-1]: row[-1] for row in rows}
+
+
+def rebuild_counts(table, key_columns, statements, conn=None):
+    """
+    Run the rebuild statements of a count table.
+    Returns the rows that were wrong before the rebuild as
+    {key tuple: (stored, actual)}; empty means they were correct.
+    """
+    if conn is None:
+        with session() as s:
+            return rebuild_counts(table, key_columns, statements, conn=s)
+
+    before = _read_counts(conn, table, key_columns)
+    for sql in statements:
+        conn.execute(sql)
+    after = _read_counts(conn, table, key_columns)
+
+    return {key: (before.get(key, 0), after.get(key, 0))
+            for key in before.keys() | after.keys()
+            if before.get(key, 0) != after.get(key, 0)}
+
+
+def describe_key(key):
+    """(table, dimension, value, *rest) -> "table.dimension = 'value' [rest]"."""
+    table, dimension, value, *rest = key
+    text = f"{table}.{dimension} = {value!r}"
+    return f"{text} [{' '.join(map(str, rest))}]" if rest else text
+
+
+def report_drift(mismatches, noun, label, tables, describe=describe_key):
+    """
+    Print the result of a rebuild for the command line.
+    Returns the exit code: 1 if anything had drifted, 0 if all was correct.
+    """
+    if mismatches:
+        print(f"⚠️  Fixed {len(mismatches)} {noun}(s) that had drifted:")
+        for key, (stored, actual) in sorted(mismatches.items()):
+            print(f"  - {describe(key)}: {stored} -> {actual}")
+        return 1
+
+    print(f"✅ {label} verified for {', '.join(tables)}")
+    return 0
@@ -0,0 +1,159 @@
+import math
+import sys
+import pandas as pd
+from datetime import date, timedelta
+from app.data.query_builder import escape_like
+from app.data.rebuild import rebuild_counts, report_drift
+from app.data.schema import ROLLUP_COLUMNS, ROLLUP_GRAINS, rollup_rebuild_statements
+
+# Most points a chart gets; the finest grain that fits the range is used
+MAX_POINTS = 120
+
+# Rough bucket length in days, to pick a grain for a date range
+GRAIN_DAYS = {"day": 1, "week": 7, "month": 30}
+
+
+def _iso(value):
+    """Date/datetime/ISO string -> 'YYYY-MM-DD' (None stays None)."""
+    if value is None:
+        return None
+    if isinstance(value, str):
+        return value[:10]
+    return value.isoformat()[:10]
+
+
+def bucket_start(grain, day):
+    """First day of the bucket holding a day, as 'YYYY-MM-DD' (same as ROLLUP_GRAINS)."""
+    day = date.fromisoformat(_iso(day))
+    if grain == "week":
+        day -= timedelta(days=day.weekday())
+    elif grain == "month":
+        day = day.replace(day=1)
+    return day.isoformat()
+
+
+def get_rollup_range(conn, table):
+    """First and last day with rows in the rollups of a table, or (None, None)."""
+    row = conn.execute("""
+        SELECT MIN(bucket), MAX(bucket) FROM time_rollups
+        WHERE table_name = ? AND dimension = '*' AND value = '' AND grain = 'day'
+    """, (table,)).fetchone()
+    return row[0], row[1]
+
+
+def choose_grain(start, end, max_points=MAX_POINTS):
+    """
+    The finest grain that shows start..end in at most max_points buckets,
+    or "month" if none does (see months_per_point).
+    """
+    if start is None or end is None:
+        return "day"
+    days = (date.fromisoformat(_iso(end)) - date.fromisoformat(_iso(start))).days + 1
+    for grain in ROLLUP_GRAINS:
+        if days / GRAIN_DAYS[grain] <= max_points:
+            return grain
+    return "month"
+
+
+def months_per_point(start, end, max_points=MAX_POINTS):
+    """
+    How many month buckets to merge into one point so that start..end fits
+    in max_points points. Runs are aligned on the calendar (a run of 12 is
+    a year), which can cost one extra point, so that is allowed for.
+    """
+    if start is None or end is None:
+        return 1
+    start, end = date.fromisoformat(_iso(start)), date.fromisoformat(_iso(end))
+    months = (end.year - start.year) * 12 + end.month - start.month + 1
+    if months <= max_points:
+        return 1
+    return math.ceil((months - 1) / max(max_points - 1, 1))
+
+
+def merge_months(df, months):
+    """
+    Sum a month series into runs of `months` months. Each run is labelled
+    with its first month; empty runs are left out like empty buckets.
+    """
+    if months <= 1 or len(df) == 0:
+        return df
+    first = pd.to_datetime(df["bucket"])
+    number = (first.dt.year * 12 + first.dt.month - 1) // months * months
+    bucket = [f"{n // 12:04d}-{n % 12 + 1:02d}-01" for n in number]
+    return df.assign(bucket=bucket).groupby("bucket", as_index=False, sort=True)["count"].sum()
+
+
+def read_time_series(conn, table, dimension="*", value=None, start=None, end=None,
+                     grain=None, max_points=MAX_POINTS, contains=None):
+    """
+    Read row counts per time bucket from the trigger-maintained rollups.
+
+    dimension/value pick one slice (e.g. "incident_type", "Phishing");
+    the default is every row. contains instead sums every value of the
+    dimension with that text in it, in any case - the same rows as a Query
+    "contains" filter (e.g. "phishing" also takes "Spear Phishing").
+    start/end (inclusive) limit the range and
+    default to the whole table. grain is "day", "week" or "month"; by
+    default the finest one that fits in max_points buckets is used; when
+    even months don't fit, runs of months are summed into one point each
+    (attrs["months_per_point"] says how many).
+    Returns a DataFrame with columns ['bucket', 'count'] in date order, where
+    bucket is the first day of the period. Empty buckets are left out.
+    """
+    if dimension != "*" and dimension not in ROLLUP_COLUMNS[table][1]:
+        raise ValueError(f"{table}.{dimension} is not rolled up")
+    if contains is not None and dimension == "*":
+        raise ValueError("contains needs a dimension")
+
+    months = 1
+    if grain is None:
+        first, last = get_rollup_range(conn, table)
+        grain = choose_grain(start or first, end or last, max_points)
+        if grain == "month":
+            months = months_per_point(start or first, end or last, max_points)
+    if grain not in ROLLUP_GRAINS:
+        raise ValueError(f"Unknown grain: {grain}")
+
+    # A bucket is kept if any of its days is in range, so widen start to its bucket
+    start = bucket_start(grain, start) if start is not None else None
+
+    if contains is None:
+        values_sql, values = "value = ?", ("" if value is None else value,)
+    else:
+        # The matching values come from the small aggregate_counts table, so
+        # each one is still a primary-key range read of time_rollups
+        values_sql = """value IN (
+            SELECT value FROM aggregate_counts
+            WHERE table_name = ? AND dimension = ? AND value LIKE '%' || ? || '%' ESCAPE '\\'
+        )"""
+        values = (table, dimension, escape_like(contains))
+
+    df = pd.read_sql_query(f"""
+        SELECT bucket, SUM(count) AS count FROM time_rollups
+        WHERE table_name = ? AND dimension = ? AND {values_sql} AND grain = ?
+          AND bucket >= COALESCE(?, '') AND bucket <= COALESCE(?, '9999-12-31')
+        GROUP BY bucket
+        ORDER BY bucket
+    """, conn, params=(table, dimension, *values, grain, start, _iso(end)))
+    df = merge_months(df, months)
+    df.attrs["grain"] = grain
+    df.attrs["months_per_point"] = months
+    return df
+
+
+def rebuild_time_rollups(conn=None):
+    """
+    Recompute time_rollups from the base tables.
+    Returns the buckets that were wrong before the rebuild as
+    {(table, dimension, value, grain, bucket): (stored, actual)}.
+    """
+    return rebuild_counts("time_rollups", ["table_name", "dimension", "value", "grain", "bucket"],
+                          rollup_rebuild_statements(), conn=conn)
+
+
+def main():
+    return report_drift(rebuild_time_rollups(), "rollup bucket", "Time-series rollups", ROLLUP_COLUMNS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
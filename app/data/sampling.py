@@ -0,0 +1,81 @@
+import copy
+import math
+from app.data.aggregates import read_total
+from app.data.schema import SAMPLE_KEY_RANGE
+
+# Approximate mode: run a query-builder Query on a uniform sample of the table
+# (the rows with the lowest sample keys) and scale the results up. Tables with
+# at most SAMPLE_TARGET_ROWS rows are always answered exactly.
+SAMPLE_TARGET_ROWS = 50_000
+
+# z for a 95% confidence interval
+CONFIDENCE_Z = 1.96
+
+
+def choose_sample(conn, table, target_rows=SAMPLE_TARGET_ROWS):
+    """
+    Pick the sample for a table: about target_rows rows, from the
+    trigger-maintained row count. Returns (sample_key limit, fraction of rows).
+    """
+    total = read_total(conn, table)
+    if total <= target_rows:
+        return SAMPLE_KEY_RANGE, 1.0
+    key_limit = max(1, math.ceil(target_rows * SAMPLE_KEY_RANGE / total))
+    return key_limit, key_limit / SAMPLE_KEY_RANGE
+
+
+def count_interval(sample_count, fraction, z=CONFIDENCE_Z):
+    """
+    Half-width of the confidence interval of a count estimated as
+    sample_count / fraction (each row is in the sample with probability fraction).
+    Works on numbers and pandas Series.
+    """
+    return z * (sample_count * (1 - fraction)) ** 0.5 / fraction
+
+
+def proportion_interval(part, whole, fraction, z=CONFIDENCE_Z):
+    """
+    Half-width, in percentage points, of the confidence interval of
+    part / whole * 100 when both are estimates from the same sample.
+    Works on numbers and pandas Series.
+    """
+    share = part / whole
+    return 100 * z * (share * (1 - share) * (1 - fraction) / (whole * fraction)) ** 0.5
+
+
+def sample_caption(df):
+    """Caption for a run_sampled result that was estimated: sample share and what ± means."""
+    return (f"≈ Estimated from a {df.attrs['sample_fraction']:.1%} sample; "
+            "± is the 95% confidence interval.")
+
+
+def run_sampled(query, conn, target_rows=SAMPLE_TARGET_ROWS):
+    """
+    Run a Query on a sample of its table and estimate the full-table result.
+
+    Counts are scaled up and get a "<alias> ±" column with the half-width of
+    their 95% confidence interval; sums are scaled up; averages, minimums and
+    maximums are those of the sample. Top-N queries (order_by + limit) rank
+    the estimated counts.
+    df.attrs["approximate"] says whether sampling was used and
+    df.attrs["sample_fraction"] is the share of rows read.
+    """
+    key_limit, fraction = choose_sample(conn, query.table, target_rows)
+    if fraction >= 1:
+        df = query.fetch_df(conn=conn)
+        df.attrs.update(approximate=False, sample_fraction=1.0)
+        return df
+
+    # Copy, so the caller's query (and its cache key) stays exact
+    df = copy.deepcopy(query).sample(key_limit).fetch_df(conn=conn)
+    for alias, func in query.aggregate_columns():
+        if func == "count":
+            counts = df[alias]
+            df[alias] = (counts / fraction).round().astype("int64")
+            margin = count_interval(counts, fraction).round().astype("int64")
+            df.insert(df.columns.get_loc(alias) + 1, f"{alias} ±", margin)
+        elif func == "sum":
+            df[alias] = df[alias] / fraction
+
+    df.attrs.update(approximate=True, sample_fraction=fraction)
+    return df
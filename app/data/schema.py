@@ -1,11 +1,19 @@
+import re
 import sqlite3
 from app.data.db import connect_database
+from app.data.enums import lookup_table_statements, enum_column_statements
+from app.data.timestamps import EPOCH_SQL, TIMESTAMP_COLUMNS, timestamp_statements
+from app.data.transitions import (STATUS_TRANSITIONS_TABLE_SQL, TRANSITION_INDEXES, TRANSITION_TABLES,
+                                  transition_statements, append_only_statements)
+from app.data.sketches import (LATENCY_SKETCH_BINS_TABLE_SQL, LATENCY_SKETCHES_TABLE_SQL, SKETCH_COLUMNS,
+                               sketch_bin_statements, resolution_time_statements,
+                               sketch_trigger_statements, sketch_rebuild_statements)
+from app.data.search import SEARCH_TABLES, search_statements
+from app.data.surges import (SURGE_COUNTS_TABLE_SQL, SURGE_ALERTS_TABLE_SQL, SURGE_DAY_INDEX_SQL, SURGE_COLUMNS,
+                             surge_trigger_statements, surge_rebuild_statements)
 
-def create_users_table(conn):
-    """Create the users table."""
-    cursor = conn.cursor()
-
-    create_table_sql ="""
+# Table definitions (shared by the create_* helpers and the migrations)
+USERS_TABLE_SQL = """
         CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
         username TEXT NOT NULL UNIQUE,
@@ -15,8 +23,55 @@ def create_users_table(conn):
         )
     """
 
+CYBER_INCIDENTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS cyber_incidents (
+       id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT NOT NULL,
+        incident_type TEXT NOT NULL,
+        severity TEXT NOT NULL,
+        status TEXT NOT NULL,
+        description TEXT,
+        reported_by TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """
+
+DATASETS_METADATA_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS datasets_metadata (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        dataset_name TEXT NOT NULL,
+        category TEXT,
+        source TEXT,
+        last_updated TEXT,
+        record_count INTEGER,
+        file_size_mb REAL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+
+IT_TICKETS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS it_tickets (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        ticket_id TEXT UNIQUE NOT NULL,
+        priority TEXT NOT NULL,
+        status TEXT NOT NULL,
+        category TEXT,
+        subject TEXT NOT NULL,
+        description TEXT,
+        created_date TEXT,
+        resolved_date TEXT,
+        assigned_to TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    """
+
+
+def create_users_table(conn):
+    """Create the users table."""
+    cursor = conn.cursor()
+
      # Execute the SQL statement
-    cursor.execute(create_table_sql)
+    cursor.execute(USERS_TABLE_SQL)
 
     # Save the changes to the database
     conn.commit()
@@ -31,22 +86,9 @@ def create_cyber_incidents_table(conn):
 
     # Get a cursor from the connection
     cursor = conn.cursor()
-
-    create_table_sql = """
-    CREATE TABLE IF NOT EXISTS cyber_incidents (
-       id INTEGER PRIMARY KEY AUTOINCREMENT,
-        date TEXT NOT NULL,
-        incident_type TEXT NOT NULL,
-        severity TEXT NOT NULL,
-        status TEXT NOT NULL,
-        description TEXT,
-        reported_by TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-        )
-        """
     
     # Execute the SQL statement
-    cursor.execute(create_table_sql)
+    cursor.execute(CYBER_INCIDENTS_TABLE_SQL)
 
     # Commit the changes
     conn.commit()
@@ -63,22 +105,8 @@ def create_datasets_metadata_table(conn):
     # Get a cursor to execute SQL commands
     cursor = conn.cursor()
 
-    # SQL statement to create datasets_metadata table
-    create_table_sql = """
-    CREATE TABLE IF NOT EXISTS datasets_metadata (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        dataset_name TEXT NOT NULL,
-        category TEXT,
-        source TEXT,
-        last_updated TEXT,
-        record_count INTEGER,
-        file_size_mb REAL,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """
-
     # Execute the SQL statement
-    cursor.execute(create_table_sql)
+    cursor.execute(DATASETS_METADATA_TABLE_SQL)
     
     # Save the changes to the database
     conn.commit()
@@ -94,26 +122,9 @@ def create_it_tickets_table(conn):
 
     # Get a cursor to execute SQL commands
     cursor = conn.cursor()
-    
-    # SQL statement to create it_tickets table
-    create_table_sql = """
-    CREATE TABLE IF NOT EXISTS it_tickets (
-        id INTEGER PRIMARY KEY AUTOINCREMENT,
-        ticket_id TEXT UNIQUE NOT NULL,
-        priority TEXT NOT NULL,
-        status TEXT NOT NULL,
-        category TEXT,
-        subject TEXT NOT NULL,
-        description TEXT,
-        created_date TEXT,
-        resolved_date TEXT,
-        assigned_to TEXT,
-        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-    )
-    """
 
     # Execute the SQL statement
-    cursor.execute(create_table_sql)
+    cursor.execute(IT_TICKETS_TABLE_SQL)
     
     # Save the changes to the database
     conn.commit()
@@ -121,9 +132,520 @@ def create_it_tickets_table(conn):
     # Print success message
     print("IT tickets table created successfully!")
 
+# Secondary indexes matched to the queries in app/data.
+# Each entry is (index name, table, columns).
+INDEXES = [
+    # get_incidents_by_severity, get_critical_incidents, severity counts
+    ("idx_incidents_severity_date", "cyber_incidents", "severity, date"),
+    # get_open_incidents, status counts
+    ("idx_incidents_status_date", "cyber_incidents", "status, date"),
+    # incident type counts
+    ("idx_incidents_type_date", "cyber_incidents", "incident_type, date"),
+    # get_critical_tickets, priority counts
+    ("idx_tickets_priority_created", "it_tickets", "priority, created_date"),
+    # get_open_tickets, status counts
+    ("idx_tickets_status_created", "it_tickets", "status, created_date"),
+    # get_tickets_assigned_to
+    ("idx_tickets_assigned_created", "it_tickets", "assigned_to, created_date"),
+    # get_datasets_by_category, category counts
+    ("idx_datasets_category", "datasets_metadata", "category"),
+    # get_datasets_by_source
+    ("idx_datasets_source", "datasets_metadata", "source"),
+    # get_largest_datasets, get_total_data_size
+    ("idx_datasets_file_size", "datasets_metadata", "file_size_mb"),
+]
+
+
+# Sort-key indexes for keyset pagination in date order
+DATE_INDEXES = [
+    ("idx_incidents_date", "cyber_incidents", "date"),
+    ("idx_tickets_created", "it_tickets", "created_date"),
+]
+
+
+def create_indexes(conn):
+    """
+    Create the secondary indexes.
+    Uses IF NOT EXISTS so existing databases get them without a rebuild.
+    """
+    cursor = conn.cursor()
+
+    for index_name, table, columns in INDEXES + DATE_INDEXES:
+        cursor.execute(f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})")
+
+    # Refresh planner statistics for the new indexes
+    cursor.execute("PRAGMA optimize")
+
+    conn.commit()
+
+    print("Indexes created successfully!")
+
+
+# Counter table kept up to date by triggers, so dashboard counts are a
+# primary-key lookup instead of a GROUP BY over the whole table.
+# dimension '*' holds the row total. NULL values are stored as ''.
+AGGREGATE_COUNTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS aggregate_counts (
+        table_name TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, dimension, value)
+    ) WITHOUT ROWID
+    """
+
+# Columns counted per table
+COUNTED_COLUMNS = {
+    "cyber_incidents": ["severity", "status", "incident_type"],
+    "it_tickets": ["priority", "status"],
+    "datasets_metadata": ["category"],
+}
+
+
+def counter_trigger_statements(table, columns):
+    """Build the INSERT/UPDATE/DELETE triggers that maintain aggregate_counts."""
+    def bump(row, delta):
+        # One upsert per counted column plus the '*' total
+        values = [f"('{table}', '{col}', COALESCE({row}.{col}, ''), {delta})" for col in columns]
+        values.append(f"('{table}', '*', '', {delta})")
+        return f"""
+            INSERT INTO aggregate_counts (table_name, dimension, value, count)
+            VALUES {', '.join(values)}
+            ON CONFLICT (table_name, dimension, value) DO UPDATE SET count = count + excluded.count;"""
+
+    def cleanup(row):
+        # Only the keys just decremented can have reached zero; one primary-key
+        # lookup each, so the cost doesn't grow with the table's counters
+        keys = [(f"'{col}'", f"COALESCE({row}.{col}, '')") for col in columns] + [("'*'", "''")]
+        return "".join(f"""
+            DELETE FROM aggregate_counts
+            WHERE table_name = '{table}' AND dimension = {dim} AND value = {value} AND count <= 0;"""
+                       for dim, value in keys)
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_counts_insert
+            AFTER INSERT ON {table}
+            BEGIN{bump('NEW', 1)}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_counts_update
+            AFTER UPDATE OF {', '.join(columns)} ON {table}
+            BEGIN{bump('OLD', -1)}{bump('NEW', 1)}{cleanup('OLD')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_counts_delete
+            AFTER DELETE ON {table}
+            BEGIN{bump('OLD', -1)}{cleanup('OLD')}
+            END""",
+    ]
+
+
+def aggregate_rebuild_statements():
+    """SQL that recomputes aggregate_counts from scratch."""
+    statements = ["DELETE FROM aggregate_counts"]
+    for table, columns in COUNTED_COLUMNS.items():
+        for col in columns:
+            statements.append(f"""
+                INSERT INTO aggregate_counts (table_name, dimension, value, count)
+                SELECT '{table}', '{col}', COALESCE({col}, ''), COUNT(*)
+                FROM {table} GROUP BY COALESCE({col}, '')""")
+        statements.append(f"""
+            INSERT INTO aggregate_counts (table_name, dimension, value, count)
+            SELECT '{table}', '*', '', COUNT(*) FROM {table}""")
+    return statements
+
+
+def counter_batch_statements(table, columns):
+    """
+    SQL that does the counter insert trigger's work for every row with
+    id > ? at once: one grouped upsert per counted column and the total.
+    """
+    return [f"""
+        INSERT INTO aggregate_counts (table_name, dimension, value, count)
+        SELECT '{table}', '{col}', {value}, COUNT(*)
+        FROM {table} WHERE id > ? GROUP BY {value}
+        ON CONFLICT (table_name, dimension, value) DO UPDATE SET count = count + excluded.count"""
+            for col, value in [(col, f"COALESCE({col}, '')") for col in columns] + [("*", "''")]]
+
+
+
+# Change tracking for delta loads.
+# Inserts need no stamp: AUTOINCREMENT ids only grow, so "id > highest id seen"
+# finds them. Updates stamp the row with the next value of a global change
+# sequence, and deletes leave a tombstone carrying that value.
+DELTA_TABLES = ["cyber_incidents", "it_tickets", "datasets_metadata"]
+
+CHANGE_SEQUENCE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS change_sequence (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        seq INTEGER NOT NULL
+    )
+    """
+
+DELETED_ROWS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS deleted_rows (
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        change_seq INTEGER NOT NULL,
+        PRIMARY KEY (table_name, change_seq, row_id)
+    ) WITHOUT ROWID
+    """
+
+
+def change_tracking_statements(table):
+    """Build the change_seq column, index and triggers for one table."""
+    next_seq = """
+            UPDATE change_sequence SET seq = seq + 1 WHERE id = 1;"""
+    current_seq = "(SELECT seq FROM change_sequence WHERE id = 1)"
+
+    return [
+        f"ALTER TABLE {table} ADD COLUMN change_seq INTEGER",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_change_seq ON {table} (change_seq)",
+        # The WHEN clause skips the trigger's own change_seq update
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_touch_update
+            AFTER UPDATE ON {table}
+            WHEN NEW.change_seq IS OLD.change_seq
+            BEGIN{next_seq}
+            UPDATE {table} SET change_seq = {current_seq} WHERE id = NEW.id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_touch_delete
+            AFTER DELETE ON {table}
+            BEGIN{next_seq}
+            INSERT INTO deleted_rows (table_name, row_id, change_seq)
+            VALUES ('{table}', OLD.id, {current_seq});
+            END""",
+    ]
+
+# A random id stamped into each database when it is created, so files derived
+# from it (Arrow snapshots) can tell a recreated or swapped database at the
+# same path from the one they were built from.
+DATABASE_INSTANCE_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS database_instance (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        instance TEXT NOT NULL
+    )
+    """
+
+# Time-series rollups: row counts per day/week/month bucket, per value of a
+# few columns, kept up to date by triggers like aggregate_counts. Charts read
+# one row per bucket instead of grouping the whole table.
+# bucket is the first day of the period ('YYYY-MM-DD'; weeks start on Monday).
+# dimension '*' holds the totals. NULL values are stored as ''.
+TIME_ROLLUPS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS time_rollups (
+        table_name TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        grain TEXT NOT NULL,
+        bucket TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, dimension, value, grain, bucket)
+    ) WITHOUT ROWID
+    """
+
+# Grain -> SQL for the first day of the bucket holding epoch seconds {ts}
+ROLLUP_GRAINS = {
+    "day": "date({ts}, 'unixepoch')",
+    "week": "date({ts}, 'unixepoch', '-6 days', 'weekday 1')",
+    "month": "date({ts}, 'unixepoch', 'start of month')",
+}
+
+# Rolled-up tables: (timestamp column, columns broken down)
+ROLLUP_COLUMNS = {
+    "cyber_incidents": ("date_ts", ["incident_type", "severity", "status"]),
+    "it_tickets": ("created_ts", ["priority", "status"]),
+    "datasets_metadata": ("last_updated_ts", ["category"]),
+}
+
+
+def rollup_trigger_statements(table, ts_column, columns):
+    """
+    Build the triggers that maintain time_rollups.
+    Rows without a timestamp aren't counted. The timestamp is usually filled
+    in by its own trigger right after the INSERT, which arrives here as an
+    UPDATE OF the timestamp column.
+    """
+    def bump(row, delta):
+        values = []
+        for grain, bucket_sql in ROLLUP_GRAINS.items():
+            bucket = bucket_sql.format(ts=f"{row}.{ts_column}")
+            values += [f"('{table}', '{col}', COALESCE({row}.{col}, ''), '{grain}', {bucket}, {delta})"
+                       for col in columns]
+            values.append(f"('{table}', '*', '', '{grain}', {bucket}, {delta})")
+        return f"""
+            INSERT INTO time_rollups (table_name, dimension, value, grain, bucket, count)
+            SELECT * FROM (VALUES {', '.join(values)}) WHERE {row}.{ts_column} IS NOT NULL
+            ON CONFLICT (table_name, dimension, value, grain, bucket) DO UPDATE SET count = count + excluded.count;"""
+
+    def cleanup(row):
+        # Only the buckets just decremented can have reached zero. Keyed on
+        # them, so the timestamp fill after every INSERT (an UPDATE with a NULL
+        # OLD timestamp) matches nothing instead of reading the table's rollups
+        statements = ""
+        for grain, bucket_sql in ROLLUP_GRAINS.items():
+            bucket = bucket_sql.format(ts=f"{row}.{ts_column}")
+            keys = [(f"'{col}'", f"COALESCE({row}.{col}, '')") for col in columns] + [("'*'", "''")]
+            statements += "".join(f"""
+            DELETE FROM time_rollups
+            WHERE table_name = '{table}' AND dimension = {dim} AND value = {value}
+              AND grain = '{grain}' AND bucket = {bucket} AND count <= 0;"""
+                                  for dim, value in keys)
+        return statements
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_rollups_insert
+            AFTER INSERT ON {table}
+            WHEN NEW.{ts_column} IS NOT NULL
+            BEGIN{bump('NEW', 1)}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_rollups_update
+            AFTER UPDATE OF {ts_column}, {', '.join(columns)} ON {table}
+            BEGIN{bump('OLD', -1)}{bump('NEW', 1)}{cleanup('OLD')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_rollups_delete
+            AFTER DELETE ON {table}
+            WHEN OLD.{ts_column} IS NOT NULL
+            BEGIN{bump('OLD', -1)}{cleanup('OLD')}
+            END""",
+    ]
+
+
+def rollup_rebuild_statements():
+    """SQL that recomputes time_rollups from scratch."""
+    statements = ["DELETE FROM time_rollups"]
+    for table, (ts_column, columns) in ROLLUP_COLUMNS.items():
+        for grain, bucket_sql in ROLLUP_GRAINS.items():
+            bucket = bucket_sql.format(ts=ts_column)
+            for col, value in [(col, f"COALESCE({col}, '')") for col in columns] + [("*", "''")]:
+                statements.append(f"""
+                    INSERT INTO time_rollups (table_name, dimension, value, grain, bucket, count)
+                    SELECT '{table}', '{col}', {value}, '{grain}', {bucket}, COUNT(*)
+                    FROM {table} WHERE {ts_column} IS NOT NULL
+                    GROUP BY {value}, {bucket}""")
+    return statements
+
+
+def rollup_batch_statements(table, ts_column, columns):
+    """
+    SQL that does the rollup insert trigger's work for every row with
+    id > ? at once. Per column, the new rows are first counted per day;
+    the other grains are then summed from those day counts, so each row's
+    timestamp is converted once instead of once per grain.
+    """
+    statements = []
+    for col, value in [(col, f"COALESCE({col}, '')") for col in columns] + [("*", "''")]:
+        grains = " UNION ALL ".join(
+            f"SELECT value, '{grain}' AS grain, {bucket_sql.format(ts=EPOCH_SQL.format(col='day'))} AS bucket, n FROM days"
+            for grain, bucket_sql in ROLLUP_GRAINS.items())
+        statements.append(f"""
+            WITH days AS (
+                SELECT {value} AS value, {ROLLUP_GRAINS['day'].format(ts=ts_column)} AS day, COUNT(*) AS n
+                FROM {table} WHERE id > ? AND {ts_column} IS NOT NULL
+                GROUP BY 1, 2
+            )
+            INSERT INTO time_rollups (table_name, dimension, value, grain, bucket, count)
+            SELECT '{table}', '{col}', value, grain, bucket, SUM(n)
+            FROM ({grains})
+            GROUP BY value, grain, bucket
+            ON CONFLICT (table_name, dimension, value, grain, bucket) DO UPDATE SET count = count + excluded.count""")
+    return statements
+
+
+# Indexes on the integer code columns (app/data/enums.py)
+ENUM_INDEXES = [
+    # get_critical_incidents, get_incidents_by_severity, level ordering
+    ("idx_incidents_severity_code_date", "cyber_incidents", "severity_code, date"),
+    # get_open_incidents
+    ("idx_incidents_status_code_date", "cyber_incidents", "status_code, date"),
+    # get_critical_tickets
+    ("idx_tickets_priority_code_created", "it_tickets", "priority_code, created_date"),
+    # get_open_tickets
+    ("idx_tickets_status_code_created", "it_tickets", "status_code, created_date"),
+]
+
+# Sample keys for approximate queries (app/data/sampling.py).
+# sample_key is a hash of the row id spread evenly over 0..SAMPLE_KEY_RANGE-1
+# (the top 16 bits of a 32-bit Fibonacci hash), so "sample_key < k" picks a
+# uniform k / SAMPLE_KEY_RANGE share of the rows. It is a VIRTUAL generated
+# column: inserts, updates and deletes keep the sample right with no extra writes.
+SAMPLE_TABLES = ["cyber_incidents", "it_tickets"]
+
+SAMPLE_KEY_RANGE = 65536
+
+SAMPLE_KEY_SQL = "((id * 2654435761) % 4294967296) / 65536"
+
+
+def sample_key_statements(table):
+    """Build the sample_key column and its index for one table."""
+    return [
+        f"""ALTER TABLE {table} ADD COLUMN sample_key INTEGER
+            GENERATED ALWAYS AS ({SAMPLE_KEY_SQL}) VIRTUAL""",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_sample_key ON {table} (sample_key)",
+    ]
+
+
+def replace_trigger_statements(statements):
+    """
+    Drop and re-create the triggers in a list of CREATE TRIGGER IF NOT EXISTS
+    statements, so a migration can ship a changed trigger body.
+    """
+    replaced = []
+    for sql in statements:
+        name = re.search(r"CREATE TRIGGER IF NOT EXISTS (\w+)", sql).group(1)
+        replaced += [f"DROP TRIGGER IF EXISTS {name}", sql]
+    return replaced
+
+
+# Versioned migrations.
+# The schema version is kept in PRAGMA user_version (stored in the file header),
+# so checking it costs one read no matter how big the tables are.
+# Each entry is (version, description, list of SQL statements).
+# Never edit an applied migration - append a new one instead.
+MIGRATIONS = [
+    (1, "create base tables", [
+        USERS_TABLE_SQL,
+        CYBER_INCIDENTS_TABLE_SQL,
+        DATASETS_METADATA_TABLE_SQL,
+        IT_TICKETS_TABLE_SQL,
+    ]),
+    (2, "add secondary indexes", [
+        f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+        for index_name, table, columns in INDEXES
+    ]),
+    (3, "add trigger-maintained aggregate counters", [
+        AGGREGATE_COUNTS_TABLE_SQL,
+        *[sql for table, columns in COUNTED_COLUMNS.items()
+          for sql in counter_trigger_statements(table, columns)],
+        *aggregate_rebuild_statements(),
+    ]),
+    (4, "add date indexes for keyset pagination", [
+        f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+        for index_name, table, columns in DATE_INDEXES
+    ]),
+    (5, "add change tracking for delta loads", [
+        CHANGE_SEQUENCE_TABLE_SQL,
+        "INSERT OR IGNORE INTO change_sequence (id, seq) VALUES (1, 0)",
+        DELETED_ROWS_TABLE_SQL,
+        *[sql for table in DELTA_TABLES for sql in change_tracking_statements(table)],
+    ]),
+    (6, "add integer-coded enumerations", [
+        *lookup_table_statements(),
+        *enum_column_statements(),
+        *[f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+          for index_name, table, columns in ENUM_INDEXES],
+    ]),
+    (7, "add epoch timestamp columns", [
+        sql for table, columns in TIMESTAMP_COLUMNS.items()
+        for column, ts_column in columns.items()
+        for sql in timestamp_statements(table, column, ts_column)
+    ]),
+    (8, "add trigger-maintained time-series rollups", [
+        TIME_ROLLUPS_TABLE_SQL,
+        *[sql for table, (ts_column, columns) in ROLLUP_COLUMNS.items()
+          for sql in rollup_trigger_statements(table, ts_column, columns)],
+        *rollup_rebuild_statements(),
+    ]),
+    (9, "add status-transition log", [
+        STATUS_TRANSITIONS_TABLE_SQL,
+        *[f"CREATE INDEX IF NOT EXISTS {index_name} ON {table} ({columns})"
+          for index_name, table, columns in TRANSITION_INDEXES],
+        *append_only_statements(),
+        *[sql for table in TRANSITION_TABLES for sql in transition_statements(table)],
+    ]),
+    (10, "keep ticket resolution times and add latency sketches", [
+        *resolution_time_statements(),
+        LATENCY_SKETCH_BINS_TABLE_SQL,
+        *sketch_bin_statements(),
+        LATENCY_SKETCHES_TABLE_SQL,
+        *[sql for table, (metric, columns) in SKETCH_COLUMNS.items()
+          for sql in sketch_trigger_statements(table, metric, columns)],
+        *sketch_rebuild_statements(),
+    ]),
+    (11, "add sample keys for approximate queries", [
+        sql for table in SAMPLE_TABLES for sql in sample_key_statements(table)
+    ]),
+    (12, "add full-text search indexes", [
+        sql for table in SEARCH_TABLES for sql in search_statements(table)
+    ]),
+    (13, "add trigger-maintained surge detection", [
+        SURGE_COUNTS_TABLE_SQL,
+        SURGE_ALERTS_TABLE_SQL,
+        *[sql for table, (ts_column, columns) in SURGE_COLUMNS.items()
+          for sql in surge_trigger_statements(table, ts_column, columns)],
+        *surge_rebuild_statements(),
+    ]),
+    (14, "key the counter trigger cleanup on the decremented rows", replace_trigger_statements([
+        sql for table, columns in COUNTED_COLUMNS.items()
+        for sql in counter_trigger_statements(table, columns)
+    ])),
+    (15, "key the rollup trigger cleanup on the decremented buckets", replace_trigger_statements([
+        sql for table, (ts_column, columns) in ROLLUP_COLUMNS.items()
+        for sql in rollup_trigger_statements(table, ts_column, columns)
+    ])),
+    (16, "key the latency sketch trigger cleanup on the decremented bins", replace_trigger_statements([
+        sql for table, (metric, columns) in SKETCH_COLUMNS.items()
+        for sql in sketch_trigger_statements(table, metric, columns)
+    ])),
+    (17, "key the surge trigger cleanup on the decremented days", [
+        SURGE_DAY_INDEX_SQL,
+        *replace_trigger_statements([
+            sql for table, (ts_column, columns) in SURGE_COLUMNS.items()
+            for sql in surge_trigger_statements(table, ts_column, columns)
+        ]),
+    ]),
+    (18, "stamp the database with an instance id", [
+        DATABASE_INSTANCE_TABLE_SQL,
+        "INSERT OR IGNORE INTO database_instance (id, instance) VALUES (1, lower(hex(randomblob(16))))",
+    ]),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+
+def get_schema_version(conn):
+    """Read the schema version recorded in the database."""
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn):
+    """
+    Bring the database up to SCHEMA_VERSION.
+    Fast path: a single version read and no DDL when already current.
+    Each pending migration runs once, inside its own transaction.
+    """
+    version = get_schema_version(conn)
+    if version >= SCHEMA_VERSION:
+        return version
+
+    # Finish anything the caller left open so BEGIN below is ours
+    if conn.in_transaction:
+        conn.commit()
+
+    for target, description, statements in MIGRATIONS:
+        if target <= version:
+            continue
+
+        # IMMEDIATE takes the write lock now, so two processes can't both apply it
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Another process may have applied it while we waited for the lock
+            if get_schema_version(conn) >= target:
+                conn.rollback()
+                version = get_schema_version(conn)
+                continue
+
+            for sql in statements:
+                conn.execute(sql)
+            conn.execute(f"PRAGMA user_version = {int(target)}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+        version = target
+        print(f"Applied migration {target}: {description}")
+
+    return version
+
+
 def create_all_tables(conn):
-    """Create all tables."""
-    create_users_table(conn)
-    create_cyber_incidents_table(conn)
-    create_datasets_metadata_table(conn)
-    create_it_tickets_table(conn)
\ No newline at end of file
+    """Create all tables (runs any pending migrations)."""
+    return migrate(conn)
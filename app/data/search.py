@@ -0,0 +1,156 @@
+import re
+import sqlite3
+import sys
+import pandas as pd
+from app.data.db import connect_database, session
+
+# Full-text search: an FTS5 index per table over its free-text columns.
+# The indexes are external-content tables (they store only the index, the
+# text stays in the base table) kept in sync by triggers, so every writer is
+# covered. A search reads the index instead of scanning every row.
+# table -> (FTS table, indexed columns, result columns, bm25 column weights)
+SEARCH_TABLES = {
+    "cyber_incidents": (
+        "incidents_fts", ["description"],
+        ["id", "date", "incident_type", "severity", "status", "description"],
+        [1.0],
+    ),
+    "it_tickets": (
+        "tickets_fts", ["subject", "description"],
+        ["id", "ticket_id", "priority", "status", "category", "subject", "assigned_to", "created_date"],
+        # A hit in the subject counts double
+        [2.0, 1.0],
+    ),
+}
+
+# Rows returned by a search unless the caller asks for more
+SEARCH_LIMIT = 50
+
+# Porter stemming, so "phishing" also finds "phished"
+SEARCH_TOKENIZER = "porter unicode61 remove_diacritics 2"
+
+
+def search_statements(table):
+    """Build the FTS table, its sync triggers, the bm25 weights and the initial fill."""
+    fts, columns, _, weights = SEARCH_TABLES[table]
+    cols = ", ".join(columns)
+    new = ", ".join(f"NEW.{col}" for col in columns)
+    old = ", ".join(f"OLD.{col}" for col in columns)
+    return [
+        f"""CREATE VIRTUAL TABLE IF NOT EXISTS {fts} USING fts5(
+            {cols}, content='{table}', content_rowid='id', tokenize='{SEARCH_TOKENIZER}'
+        )""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_insert
+            AFTER INSERT ON {table}
+            BEGIN
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_update
+            AFTER UPDATE OF {cols} ON {table}
+            BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old});
+            INSERT INTO {fts} (rowid, {cols}) VALUES (NEW.id, {new});
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_fts_delete
+            AFTER DELETE ON {table}
+            BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {cols}) VALUES ('delete', OLD.id, {old});
+            END""",
+        f"INSERT INTO {fts} ({fts}, rank) VALUES ('rank', 'bm25({', '.join(map(str, weights))})')",
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+def search_batch_statements(table):
+    """SQL that indexes every row with id > ? at once, as the insert trigger would."""
+    fts, columns, _, _ = SEARCH_TABLES[table]
+    cols = ", ".join(columns)
+    return [f"INSERT INTO {fts} (rowid, {cols}) SELECT id, {cols} FROM {table} WHERE id > ?"]
+
+
+def match_query(text):
+    """
+    Turn what a user typed into an FTS5 query: every word must match, and the
+    last one may be a prefix (so results show up while typing).
+    Returns None if there is nothing to search for.
+    """
+    # Only word characters, so quotes and FTS5 operators in the input can't break the query
+    words = re.findall(r"\w+", text or "")
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+def search(table, text, limit=SEARCH_LIMIT, conn=None):
+    """
+    Full-text search of a table, best matches first.
+    Returns the table's result columns plus 'match' (the matching text with
+    the hits in [brackets]) and 'score' (bm25, higher is better).
+    """
+    if table not in SEARCH_TABLES:
+        raise ValueError(f"No full-text index for {table}")
+    fts, _, columns, _ = SEARCH_TABLES[table]
+
+    query = match_query(text)
+    if query is None:
+        return pd.DataFrame(columns=columns + ["match", "score"])
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+
+    # The index is searched and ranked on its own first, so ORDER BY rank
+    # LIMIT is done inside FTS5 before any base rows are read
+    df = pd.read_sql_query(f"""
+        SELECT {', '.join(f't.{col}' for col in columns)}, m.match, ROUND(-m.rank, 3) AS score
+        FROM (
+            SELECT rowid, rank, snippet({fts}, -1, '[', ']', '…', 12) AS match
+            FROM {fts}
+            WHERE {fts} MATCH ?
+            ORDER BY rank
+            LIMIT ?
+        ) m
+        JOIN {table} t ON t.id = m.rowid
+        ORDER BY m.rank
+    """, conn, params=(query, limit))
+
+    if owns_conn:
+        conn.close()
+    return df
+
+
+def rebuild_search_indexes(conn=None):
+    """
+    Check every full-text index against its table (FTS5 integrity-check) and
+    rebuild the ones that are out of sync. Returns the tables that were rebuilt.
+    """
+    if conn is None:
+        with session() as s:
+            return rebuild_search_indexes(conn=s)
+
+    rebuilt = []
+    for table, (fts, _, _, _) in SEARCH_TABLES.items():
+        try:
+            conn.execute(f"INSERT INTO {fts} ({fts}, rank) VALUES ('integrity-check', 1)")
+        except sqlite3.DatabaseError:
+            conn.execute(f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')")
+            rebuilt.append(table)
+    return rebuilt
+
+
+def main():
+    rebuilt = rebuild_search_indexes()
+
+    if rebuilt:
+        print(f"⚠️  Rebuilt {len(rebuilt)} full-text index(es) that had drifted: {', '.join(rebuilt)}")
+        return 1
+
+    tables = ", ".join(SEARCH_TABLES)
+    print(f"✅ Full-text indexes verified for {tables}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
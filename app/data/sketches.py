@@ -0,0 +1,283 @@
+import math
+import sys
+import pandas as pd
+from app.data.db import connect_database
+from app.data.enums import code_of
+from app.data.rebuild import rebuild_counts, report_drift
+from app.data.timestamps import EPOCH_SQL
+from app.data.transitions import TRANSITION_TABLES
+
+# Latency sketches: for each value of a few columns, a histogram of resolution
+# times over log-spaced bins (the DDSketch layout). Triggers keep it up to date
+# like aggregate_counts, so percentiles read a few hundred small rows instead of
+# every ticket. Any quantile read from a bin is within SKETCH_ALPHA (1%) of the
+# true value, and sketches merge by adding counts per bin - e.g. one p90 for a
+# whole team is a SUM over its members' rows.
+SKETCH_ALPHA = 0.01
+SKETCH_GAMMA = (1 + SKETCH_ALPHA) / (1 - SKETCH_ALPHA)
+
+# Range of the bins in hours (36 seconds to ~11 years); values outside are
+# clamped to the first/last bin. Bin 0 holds zero and negative values.
+SKETCH_MIN_HOURS = 0.01
+SKETCH_MAX_HOURS = 100_000
+SKETCH_BIN_COUNT = math.ceil(math.log(SKETCH_MAX_HOURS / SKETCH_MIN_HOURS, SKETCH_GAMMA)) + 1
+
+# Sketched tables: the metric column, and the columns it is broken down by.
+# dimension '*' holds the whole table. NULL values are stored as ''.
+SKETCH_COLUMNS = {
+    "it_tickets": ("resolution_time_hours", ["assigned_to", "priority", "category"]),
+}
+
+# Only resolved tickets have a resolution time worth counting
+RESOLVED_CODES = ", ".join(str(code_of("ticket_statuses", status))
+                           for status in TRANSITION_TABLES["it_tickets"]["resolved"])
+
+# Bin i >= 1 covers (upper / gamma, upper]; value_hours is the point in it
+# with the smallest relative error to both ends.
+LATENCY_SKETCH_BINS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS latency_sketch_bins (
+        bin INTEGER PRIMARY KEY,
+        upper_hours REAL NOT NULL UNIQUE,
+        value_hours REAL NOT NULL
+    )
+    """
+
+LATENCY_SKETCHES_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS latency_sketches (
+        table_name TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        bin INTEGER NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, dimension, value, bin)
+    ) WITHOUT ROWID
+    """
+
+
+def sketch_bin_statements():
+    """Fill latency_sketch_bins (no math functions needed in SQLite)."""
+    return [f"""
+        INSERT OR IGNORE INTO latency_sketch_bins (bin, upper_hours, value_hours)
+        WITH RECURSIVE bins (bin, upper_hours) AS (
+            SELECT 1, {SKETCH_MIN_HOURS}
+            UNION ALL
+            SELECT bin + 1, upper_hours * {SKETCH_GAMMA!r} FROM bins WHERE bin < {SKETCH_BIN_COUNT}
+        )
+        SELECT 0, 0, 0
+        UNION ALL
+        SELECT bin, upper_hours, 2 * upper_hours / ({SKETCH_GAMMA!r} + 1) FROM bins"""]
+
+
+def bin_expression(value):
+    """SQL for the bin holding an hours value."""
+    return f"""COALESCE(
+                (SELECT bin FROM latency_sketch_bins WHERE upper_hours >= {value}
+                 ORDER BY upper_hours LIMIT 1), {SKETCH_BIN_COUNT})"""
+
+
+def resolution_time_statements():
+    """
+    Keep resolution_time_hours and resolved_date filled in on it_tickets.
+
+    Rows written with a resolved status and a resolution time (the seed CSV)
+    get resolved_date = created_date + that many hours. A ticket moved into a
+    resolved status is stamped with the current time, unless the same write
+    brings its own resolution time; moving it back out clears both. The
+    resolved_ts trigger (migration 7) follows resolved_date.
+    """
+    created = EPOCH_SQL.format(col="NEW.created_date")
+    from_hours = f"datetime({created} + CAST(ROUND(NEW.resolution_time_hours * 3600) AS INTEGER), 'unixepoch')"
+    now = "CAST(strftime('%s', 'now') AS INTEGER)"
+    # Already resolved (time being recorded late), or this write set the time
+    supplied = (f"(OLD.status_code IN ({RESOLVED_CODES}) "
+                f"OR NEW.resolution_time_hours IS NOT OLD.resolution_time_hours)")
+    return [
+        "ALTER TABLE it_tickets ADD COLUMN resolution_time_hours REAL",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_it_tickets_resolved_insert
+            AFTER INSERT ON it_tickets
+            WHEN NEW.status_code IN ({RESOLVED_CODES}) AND NEW.resolved_date IS NULL
+                 AND NEW.resolution_time_hours IS NOT NULL
+            BEGIN
+            UPDATE it_tickets SET resolved_date = {from_hours} WHERE id = NEW.id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_it_tickets_resolved_update
+            AFTER UPDATE OF status, resolution_time_hours ON it_tickets
+            WHEN NEW.status_code IN ({RESOLVED_CODES}) AND NEW.resolved_date IS NULL
+            BEGIN
+            UPDATE it_tickets SET
+                resolution_time_hours = CASE WHEN {supplied} THEN NEW.resolution_time_hours
+                                             ELSE ROUND(({now} - {created}) / 3600.0, 2) END,
+                resolved_date = CASE WHEN {supplied} THEN {from_hours}
+                                     ELSE datetime('now') END
+            WHERE id = NEW.id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_it_tickets_reopened
+            AFTER UPDATE OF status ON it_tickets
+            WHEN OLD.status_code IN ({RESOLVED_CODES}) AND NEW.status_code NOT IN ({RESOLVED_CODES})
+            BEGIN
+            UPDATE it_tickets SET resolved_date = NULL, resolution_time_hours = NULL WHERE id = NEW.id;
+            END""",
+    ]
+
+
+def resolution_time_batch_statements():
+    """
+    SQL that fills resolved_date for every ticket with id > ? at once, as
+    trg_it_tickets_resolved_insert would. It is still an UPDATE, so the
+    resolved_ts trigger follows it as before.
+    """
+    created = EPOCH_SQL.format(col="created_date")
+    return [f"""
+        UPDATE it_tickets
+        SET resolved_date = datetime({created} + CAST(ROUND(resolution_time_hours * 3600) AS INTEGER), 'unixepoch')
+        WHERE id > ? AND status_code IN ({RESOLVED_CODES}) AND resolved_date IS NULL
+          AND resolution_time_hours IS NOT NULL"""]
+
+
+def sketch_trigger_statements(table, metric, columns):
+    """Build the INSERT/UPDATE/DELETE triggers that maintain latency_sketches."""
+    def counted(row):
+        return f"{row}.status_code IN ({RESOLVED_CODES}) AND {row}.{metric} IS NOT NULL"
+
+    def bump(row, delta):
+        values = [f"('{col}', COALESCE({row}.{col}, ''))" for col in columns]
+        values.append("('*', '')")
+        return f"""
+            INSERT INTO latency_sketches (table_name, dimension, value, bin, count)
+            SELECT '{table}', column1, column2, {bin_expression(f'{row}.{metric}')}, {delta}
+            FROM (VALUES {', '.join(values)}) WHERE {counted(row)}
+            ON CONFLICT (table_name, dimension, value, bin) DO UPDATE SET count = count + excluded.count;"""
+
+    def cleanup(row):
+        # Only the bins just decremented can have reached zero
+        bin_ = bin_expression(f"{row}.{metric}")
+        keys = [(f"'{col}'", f"COALESCE({row}.{col}, '')") for col in columns] + [("'*'", "''")]
+        return "".join(f"""
+            DELETE FROM latency_sketches
+            WHERE table_name = '{table}' AND dimension = {dim} AND value = {value}
+              AND bin = {bin_} AND count <= 0;"""
+                       for dim, value in keys)
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sketches_insert
+            AFTER INSERT ON {table}
+            WHEN {counted('NEW')}
+            BEGIN{bump('NEW', 1)}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sketches_update
+            AFTER UPDATE OF status, {metric}, {', '.join(columns)} ON {table}
+            BEGIN{bump('OLD', -1)}{bump('NEW', 1)}{cleanup('OLD')}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_sketches_delete
+            AFTER DELETE ON {table}
+            WHEN {counted('OLD')}
+            BEGIN{bump('OLD', -1)}{cleanup('OLD')}
+            END""",
+    ]
+
+
+def sketch_rebuild_statements():
+    """SQL that recomputes latency_sketches from scratch."""
+    statements = ["DELETE FROM latency_sketches"]
+    for table, (metric, columns) in SKETCH_COLUMNS.items():
+        for col, value in [(col, f"COALESCE({col}, '')") for col in columns] + [("*", "''")]:
+            statements.append(f"""
+                INSERT INTO latency_sketches (table_name, dimension, value, bin, count)
+                SELECT '{table}', '{col}', value, bin, COUNT(*)
+                FROM (SELECT {value} AS value, {bin_expression(metric)} AS bin
+                      FROM {table}
+                      WHERE status_code IN ({RESOLVED_CODES}) AND {metric} IS NOT NULL)
+                GROUP BY value, bin""")
+    return statements
+
+
+def sketch_batch_statements(table, metric, columns):
+    """
+    SQL that does the sketch insert trigger's work for every row with
+    id > ? at once: one grouped upsert per column.
+    """
+    return [f"""
+        INSERT INTO latency_sketches (table_name, dimension, value, bin, count)
+        SELECT '{table}', '{col}', value, bin, COUNT(*)
+        FROM (SELECT {value} AS value, {bin_expression(metric)} AS bin
+              FROM {table}
+              WHERE id > ? AND status_code IN ({RESOLVED_CODES}) AND {metric} IS NOT NULL)
+        GROUP BY value, bin
+        ON CONFLICT (table_name, dimension, value, bin) DO UPDATE SET count = count + excluded.count"""
+            for col, value in [(col, f"COALESCE({col}, '')") for col in columns] + [("*", "''")]]
+
+
+def get_latency_quantiles(table="it_tickets", dimension=None, values=None, merge=False,
+                          quantiles=(0.5, 0.9, 0.99), conn=None):
+    """
+    Resolution-time percentiles in hours from the sketches.
+
+    dimension None gives one row for the whole table; otherwise one row per
+    value of dimension, optionally only for the given values. merge=True
+    combines the selected values into a single row (e.g. one team).
+    Returns [dimension or "scope", resolved, p50_hours, p90_hours, p99_hours]
+    (one column per quantile), slowest first by the last quantile.
+    """
+    if table not in SKETCH_COLUMNS:
+        raise ValueError(f"No latency sketches for {table}")
+    if dimension is not None and dimension not in SKETCH_COLUMNS[table][1]:
+        raise ValueError(f"Unknown dimension '{dimension}' for table {table}")
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+
+    where = "table_name = ? AND dimension = ?"
+    params = [table, dimension or "*"]
+    if dimension and values is not None:
+        where += f" AND value IN ({', '.join('?' for _ in values)})"
+        params += list(values)
+    group = "value" if dimension and not merge else "'All'"
+    label = dimension if dimension and not merge else "scope"
+
+    # Nearest rank: the first bin where the running count reaches q * n
+    columns = ", ".join(
+        f'ROUND(MIN(CASE WHEN cumulative >= {q!r} * n THEN value_hours END), 1) AS "p{q * 100:g}_hours"'
+        for q in quantiles
+    )
+    df = pd.read_sql_query(f"""
+        WITH merged AS (
+            SELECT {group} AS grp, bin, SUM(count) AS count
+            FROM latency_sketches
+            WHERE {where}
+            GROUP BY grp, bin
+        ),
+        ranked AS (
+            SELECT grp, b.value_hours,
+                   SUM(m.count) OVER (PARTITION BY grp ORDER BY m.bin) AS cumulative,
+                   SUM(m.count) OVER (PARTITION BY grp) AS n
+            FROM merged m JOIN latency_sketch_bins b ON b.bin = m.bin
+        )
+        SELECT grp AS "{label}", MAX(n) AS resolved, {columns}
+        FROM ranked
+        GROUP BY grp
+        ORDER BY {len(quantiles) + 2} DESC
+    """, conn, params=params)
+
+    if owns_conn:
+        conn.close()
+    return df
+
+
+def rebuild_latency_sketches(conn=None):
+    """
+    Recompute latency_sketches from the base tables.
+    Returns the bins that were wrong before the rebuild as
+    {(table, dimension, value, bin): (stored, actual)}.
+    """
+    return rebuild_counts("latency_sketches", ["table_name", "dimension", "value", "bin"],
+                          sketch_rebuild_statements(), conn=conn)
+
+
+def main():
+    return report_drift(rebuild_latency_sketches(), "sketch bin", "Latency sketches", SKETCH_COLUMNS,
+                        describe=lambda key: f"{key[0]}.{key[1]} = {key[2]!r} [bin {key[3]}]")
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,255 @@
+import json
+import os
+import sqlite3
+import sys
+import threading
+import uuid
+from pathlib import Path
+from app.data.db import DB_PATH, connect_database
+from app.data.delta import fetch_delta, get_high_water_mark
+
+# pyarrow ships with streamlit; without it the dashboards fall back to SQLite
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.ipc
+except ImportError:
+    pa = None
+
+
+
+def snapshot_dir_for(db_path):
+    """Snapshot folder of a database file: DATA/snapshots/<file name without suffix>."""
+    db_path = Path(db_path)
+    return db_path.parent / "snapshots" / db_path.stem
+
+
+SNAPSHOT_DIR = snapshot_dir_for(DB_PATH)
+
+# Appended segments are merged back into one file past this many
+MAX_SEGMENTS = 8
+
+# Snapshot columns and their Arrow types, per table
+SNAPSHOT_COLUMNS = {
+    "cyber_incidents": [
+        ("id", "int64"), ("date", "string"), ("incident_type", "string"),
+        ("severity", "string"), ("status", "string"), ("description", "string"),
+        ("reported_by", "string"), ("created_at", "string"),
+        ("severity_code", "int64"), ("status_code", "int64"), ("date_ts", "int64"),
+    ],
+    "it_tickets": [
+        ("id", "int64"), ("ticket_id", "string"), ("priority", "string"),
+        ("status", "string"), ("category", "string"), ("subject", "string"),
+        ("description", "string"), ("created_date", "string"), ("resolved_date", "string"),
+        ("assigned_to", "string"), ("created_at", "string"),
+        ("priority_code", "int64"), ("status_code", "int64"),
+        ("created_ts", "int64"), ("resolved_ts", "int64"),
+        ("resolution_time_hours", "float64"),
+    ],
+    "datasets_metadata": [
+        ("id", "int64"), ("dataset_name", "string"), ("category", "string"),
+        ("source", "string"), ("last_updated", "string"), ("record_count", "int64"),
+        ("file_size_mb", "float64"), ("created_at", "string"), ("last_updated_ts", "int64"),
+    ],
+}
+
+# One refresh at a time per process
+_refresh_lock = threading.Lock()
+
+
+def snapshots_available():
+    """True when pyarrow is installed."""
+    return pa is not None
+
+
+def _schema(table):
+    return pa.schema([(name, getattr(pa, kind)()) for name, kind in SNAPSHOT_COLUMNS[table]])
+
+
+def database_identity(conn):
+    """
+    Which database a connection is on: its file path and the instance id
+    stamped into it by migration 18 (None on a database that predates it).
+    """
+    path = conn.execute("PRAGMA database_list").fetchone()[2]
+    try:
+        row = conn.execute("SELECT instance FROM database_instance WHERE id = 1").fetchone()
+    except sqlite3.OperationalError:
+        row = None
+    return {"database": str(Path(path).resolve()) if path else "", "instance": row[0] if row else None}
+
+
+def _manifest_path(table, snapshot_dir):
+    return Path(snapshot_dir) / f"{table}.json"
+
+
+def _read_manifest(table, snapshot_dir):
+    """The manifest lists the segment files and the high-water mark they cover."""
+    path = _manifest_path(table, snapshot_dir)
+    if not path.exists():
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def _write_manifest(table, snapshot_dir, manifest):
+    """Write the manifest atomically, so readers see the old or the new one."""
+    path = _manifest_path(table, snapshot_dir)
+    tmp = path.with_suffix(".json.tmp")
+    with open(tmp, "w") as f:
+        json.dump(manifest, f)
+    os.replace(tmp, path)
+
+
+def _write_segment(table, snapshot_dir, arrow_table):
+    """Write an uncompressed Arrow IPC file (memory-mappable) and return its name."""
+    name = f"{table}-{uuid.uuid4().hex[:12]}.arrow"
+    with pa.OSFile(str(Path(snapshot_dir) / name), "wb") as sink:
+        with pa.ipc.new_file(sink, arrow_table.schema) as writer:
+            writer.write_table(arrow_table)
+    return name
+
+
+def _load_segments(snapshot_dir, segments):
+    """Memory-map the segment files as one table (no copy until columns are used)."""
+    tables = []
+    for name in segments:
+        source = pa.memory_map(str(Path(snapshot_dir) / name), "r")
+        tables.append(pa.ipc.open_file(source).read_all())
+    return pa.concat_tables(tables) if tables else None
+
+
+def _rows_to_arrow(table, rows):
+    """Turn row tuples from SQLite into an Arrow table column by column."""
+    schema = _schema(table)
+    columns = list(zip(*rows)) if rows else [[] for _ in schema]
+    return pa.table([pa.array(values, type=field.type) for values, field in zip(columns, schema)],
+                    schema=schema)
+
+
+def _remove_unused_segments(table, snapshot_dir, keep):
+    """Delete old segment files; ones still mapped by a reader are left for next time."""
+    for path in Path(snapshot_dir).glob(f"{table}-*.arrow"):
+        if path.name not in keep:
+            try:
+                path.unlink()
+            except OSError:
+                pass
+
+
+def refresh_snapshot(table, conn=None, snapshot_dir=SNAPSHOT_DIR):
+    """
+    Bring the snapshot of one table up to date with the database.
+
+    Only the rows changed since the last refresh are read from SQLite
+    (app.data.delta). New rows are appended as a new segment; updates and
+    deletes rewrite the snapshot from the mapped segments.
+    Returns {"table", "mode", "rows", "segments"}; mode is one of
+    "full", "append", "rewrite", "unchanged".
+    """
+    if pa is None:
+        raise RuntimeError("pyarrow is not installed; snapshots are unavailable")
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+
+    try:
+        with _refresh_lock:
+            Path(snapshot_dir).mkdir(parents=True, exist_ok=True)
+            manifest = _read_manifest(table, snapshot_dir)
+            columns = [name for name, _ in SNAPSHOT_COLUMNS[table]]
+            identity = database_identity(conn)
+            # Snapshots written with other columns, or from another database
+            # (recreated or swapped at the same path), are rebuilt from scratch
+            if manifest is not None and (manifest.get("columns") != columns
+                                         or manifest.get("identity") != identity):
+                manifest = None
+            # So is one whose mark is ahead of the database (e.g. a restored backup)
+            if manifest is not None and any(
+                    seen > now for seen, now in zip(manifest["mark"], get_high_water_mark(conn, table))):
+                manifest = None
+            since = tuple(manifest["mark"]) if manifest else None
+
+            rows, deleted_ids, mark = fetch_delta(conn, table, columns, since=since)
+
+            if manifest is None:
+                mode = "full"
+                segments = [_write_segment(table, snapshot_dir, _rows_to_arrow(table, rows))]
+            elif not rows and not deleted_ids:
+                mode = "unchanged"
+                segments = manifest["segments"]
+            else:
+                delta = _rows_to_arrow(table, rows)
+                inserts_only = not deleted_ids and all(row[0] > since[0] for row in rows)
+
+                if inserts_only and len(manifest["segments"]) < MAX_SEGMENTS:
+                    mode = "append"
+                    segments = manifest["segments"] + [_write_segment(table, snapshot_dir, delta)]
+                else:
+                    # Drop the old versions of changed rows and the deleted ones
+                    current = _load_segments(snapshot_dir, manifest["segments"])
+                    stale = pa.array([row[0] for row in rows] + list(deleted_ids), pa.int64())
+                    kept = current.filter(pc.invert(pc.is_in(current["id"], value_set=stale)))
+                    merged = pa.concat_tables([kept, delta]).sort_by("id")
+                    mode = "rewrite"
+                    segments = [_write_segment(table, snapshot_dir, merged.combine_chunks())]
+
+            if mode != "unchanged":
+                _write_manifest(table, snapshot_dir, {"mark": list(mark), "columns": columns,
+                                                      "identity": identity, "segments": segments})
+                _remove_unused_segments(table, snapshot_dir, set(segments))
+    finally:
+        if owns_conn:
+            conn.close()
+
+    return {"table": table, "mode": mode, "rows": len(rows), "segments": len(segments)}
+
+
+def refresh_all_snapshots(conn=None, snapshot_dir=SNAPSHOT_DIR):
+    """Refresh the snapshots of every dashboard table."""
+    return [refresh_snapshot(table, conn=conn, snapshot_dir=snapshot_dir)
+            for table in SNAPSHOT_COLUMNS]
+
+
+def read_snapshot(table, columns=None, snapshot_dir=SNAPSHOT_DIR, conn=None):
+    """
+    Read a table snapshot as a memory-mapped Arrow table.
+    Only the pages of the requested columns are ever read from disk.
+    Returns None if pyarrow is missing or the snapshot hasn't been written yet,
+    or - when conn is given - if it was written from a different database.
+    """
+    if pa is None:
+        return None
+    identity = database_identity(conn) if conn is not None else None
+
+    # Retry once if a refresh removed a segment between reading the manifest and opening it
+    for attempt in range(2):
+        manifest = _read_manifest(table, snapshot_dir)
+        if manifest is None:
+            return None
+        if identity is not None and manifest.get("identity") != identity:
+            return None
+        try:
+            snapshot = _load_segments(snapshot_dir, manifest["segments"])
+            break
+        except FileNotFoundError:
+            if attempt == 1:
+                raise
+
+    return snapshot.select(columns) if columns else snapshot
+
+
+def main():
+    if pa is None:
+        print("❌ pyarrow is not installed (pip install pyarrow)")
+        return 1
+
+    for result in refresh_all_snapshots():
+        print(f"✅ {result['table']}: {result['mode']} "
+              f"({result['rows']} rows read, {result['segments']} segment(s))")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
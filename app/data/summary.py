@@ -0,0 +1,20 @@
+from app.data.db import session
+from app.data.incidents import get_incident_summary
+from app.data.tickets import get_ticket_summary
+from app.data.dataset import get_dataset_summary
+
+
+def get_platform_summary(conn=None):
+    """
+    Get the headline KPIs for all three domains.
+    Runs three single-pass queries against one read snapshot.
+    """
+    if conn is not None:
+        return {
+            'incidents': get_incident_summary(conn=conn),
+            'tickets': get_ticket_summary(conn=conn),
+            'datasets': get_dataset_summary(conn=conn),
+        }
+
+    with session(read_only=True) as s:
+        return get_platform_summary(conn=s)
@@ -0,0 +1,240 @@
+import sys
+import pandas as pd
+from app.data.db import connect_database
+from app.data.rebuild import rebuild_counts, report_drift
+
+# Surge detection: daily event counts per value of a column (by the row's own
+# date), kept by triggers like time_rollups. Every write re-checks the day it
+# touched against that value's previous SURGE_WINDOW_DAYS days, so a surge is
+# flagged by the insert that causes it. The check reads at most
+# SURGE_WINDOW_DAYS rows of one primary-key range, and the cleanup of emptied
+# days deletes by full primary key: constant time per event.
+#
+# A day is a surge when it has at least SURGE_MIN_COUNT events and
+#   z = (count - mean) / sqrt(max(variance, mean, 1)) >= SURGE_Z
+# over the window (days without events count as 0). The variance is floored at
+# the mean (Poisson noise) and at 1, so a quiet value needs a real jump.
+# Flagged days are kept in surge_alerts; the comparison is done on squares so
+# SQLite needs no math functions.
+SURGE_WINDOW_DAYS = 28
+SURGE_Z = 3.0
+SURGE_MIN_COUNT = 3
+
+# Alerts on the newest SURGE_ACTIVE_DAYS days of a table are "active"
+SURGE_ACTIVE_DAYS = 2
+
+# Watched tables: (timestamp column, columns to watch).
+# Rows with no value (NULL or '') aren't watched.
+SURGE_COLUMNS = {
+    "cyber_incidents": ("date_ts", ["incident_type"]),
+    "it_tickets": ("created_ts", ["category"]),
+}
+
+SURGE_COUNTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS surge_counts (
+        table_name TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL DEFAULT 0,
+        PRIMARY KEY (table_name, dimension, value, day)
+    ) WITHOUT ROWID
+    """
+
+# Newest day of a table, for get_active_alerts
+SURGE_DAY_INDEX_SQL = "CREATE INDEX IF NOT EXISTS idx_surge_counts_day ON surge_counts (table_name, day)"
+
+# baseline_mean / baseline_var describe the window before day
+SURGE_ALERTS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS surge_alerts (
+        table_name TEXT NOT NULL,
+        dimension TEXT NOT NULL,
+        value TEXT NOT NULL,
+        day TEXT NOT NULL,
+        count INTEGER NOT NULL,
+        baseline_mean REAL NOT NULL,
+        baseline_var REAL NOT NULL,
+        flagged_ts INTEGER NOT NULL,
+        PRIMARY KEY (table_name, dimension, value, day)
+    ) WITHOUT ROWID
+    """
+
+NOW_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def _alert_insert(table, col, value, day, days_from=""):
+    """
+    SQL that stores the alert for (value, day) if that day is a surge.
+    value and day are SQL expressions for the surge_counts row c; days_from
+    adds a FROM item they can refer to (the rebuild checks every day).
+    """
+    def window(expr):
+        return f"""(SELECT TOTAL({expr}) FROM surge_counts b
+                          WHERE b.table_name = c.table_name AND b.dimension = c.dimension AND b.value = c.value
+                            AND b.day >= date(c.day, '-{SURGE_WINDOW_DAYS} days') AND b.day < c.day)"""
+
+    mean = f"(s.total / {SURGE_WINDOW_DAYS})"
+    var = f"(s.squares / {SURGE_WINDOW_DAYS} - {mean} * {mean})"
+    return f"""
+            INSERT INTO surge_alerts (table_name, dimension, value, day, count, baseline_mean, baseline_var, flagged_ts)
+            SELECT '{table}', '{col}', s.value, s.day, s.count, {mean}, {var}, {NOW_SQL}
+            FROM (
+                SELECT c.value, c.day, c.count, {window('count')} AS total, {window('count * count')} AS squares
+                FROM {days_from}surge_counts c
+                WHERE c.table_name = '{table}' AND c.dimension = '{col}' AND c.value = {value} AND c.day = {day}
+            ) s
+            WHERE s.count >= {SURGE_MIN_COUNT} AND s.count > {mean}
+              AND (s.count - {mean}) * (s.count - {mean}) >= {SURGE_Z * SURGE_Z} * MAX({var}, {mean}, 1)"""
+
+
+def surge_trigger_statements(table, ts_column, columns):
+    """
+    Build the triggers that keep surge_counts and surge_alerts up to date.
+    Like the rollups, rows get their timestamp from its own trigger right
+    after the INSERT, which arrives here as an UPDATE OF the timestamp column.
+    """
+    def bump(row, delta):
+        day = f"date({row}.{ts_column}, 'unixepoch')"
+        statements = ""
+        for col in columns:
+            value = f"{row}.{col}"
+            statements += f"""
+            INSERT INTO surge_counts (table_name, dimension, value, day, count)
+            SELECT '{table}', '{col}', {value}, {day}, {delta} WHERE {row}.{ts_column} IS NOT NULL AND {value} <> ''
+            ON CONFLICT (table_name, dimension, value, day) DO UPDATE SET count = count + excluded.count;"""
+            # Re-check the day: clear its alert, then store it again if it still holds
+            statements += f"""
+            DELETE FROM surge_alerts
+            WHERE table_name = '{table}' AND dimension = '{col}' AND value = {value} AND day = {day};"""
+            statements += _alert_insert(table, col, value, day) + ";"
+        return statements
+
+    def cleanup(row):
+        # Only the days just decremented can have reached zero
+        day = f"date({row}.{ts_column}, 'unixepoch')"
+        return "".join(f"""
+            DELETE FROM surge_counts
+            WHERE table_name = '{table}' AND dimension = '{col}' AND value = {row}.{col}
+              AND day = {day} AND count <= 0;"""
+                       for col in columns)
+
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_surges_insert
+            AFTER INSERT ON {table}
+            WHEN NEW.{ts_column} IS NOT NULL
+            BEGIN{bump('NEW', 1)}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_surges_update
+            AFTER UPDATE OF {ts_column}, {', '.join(columns)} ON {table}
+            BEGIN{bump('OLD', -1)}{cleanup('OLD')}{bump('NEW', 1)}
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_surges_delete
+            AFTER DELETE ON {table}
+            WHEN OLD.{ts_column} IS NOT NULL
+            BEGIN{bump('OLD', -1)}{cleanup('OLD')}
+            END""",
+    ]
+
+
+def surge_rebuild_statements():
+    """
+    SQL that recomputes surge_counts from scratch and re-checks every day.
+    Rows loaded out of date order are checked against the window as it was
+    when they arrived; the rebuild checks them against the full history.
+    """
+    statements = ["DELETE FROM surge_counts"]
+    for table, (ts_column, columns) in SURGE_COLUMNS.items():
+        for col in columns:
+            statements.append(f"""
+                INSERT INTO surge_counts (table_name, dimension, value, day, count)
+                SELECT '{table}', '{col}', {col}, date({ts_column}, 'unixepoch'), COUNT(*)
+                FROM {table} WHERE {ts_column} IS NOT NULL AND {col} <> ''
+                GROUP BY {col}, date({ts_column}, 'unixepoch')""")
+
+    statements.append("DELETE FROM surge_alerts")
+    for table, (_, columns) in SURGE_COLUMNS.items():
+        for col in columns:
+            # The per-event check, run for every counted day
+            days = f"(SELECT value, day FROM surge_counts WHERE table_name = '{table}' AND dimension = '{col}') d, "
+            statements.append(_alert_insert(table, col, "d.value", "d.day", days_from=days))
+    return statements
+
+
+def surge_batch_statements(table, ts_column, columns):
+    """
+    SQL that does the surge insert trigger's work for every row with id > ?
+    at once: add the new rows to surge_counts, then re-check each (value, day)
+    they touched. Each day is checked once, with the batch's final counts.
+    """
+    statements = []
+    for col in columns:
+        day = f"date({ts_column}, 'unixepoch')"
+        new_rows = f"FROM {table} WHERE id > ? AND {ts_column} IS NOT NULL AND {col} <> ''"
+        statements.append(f"""
+            INSERT INTO surge_counts (table_name, dimension, value, day, count)
+            SELECT '{table}', '{col}', {col}, {day}, COUNT(*)
+            {new_rows}
+            GROUP BY {col}, {day}
+            ON CONFLICT (table_name, dimension, value, day) DO UPDATE SET count = count + excluded.count""")
+        statements.append(f"""
+            DELETE FROM surge_alerts
+            WHERE table_name = '{table}' AND dimension = '{col}'
+              AND (value, day) IN (SELECT {col}, {day} {new_rows})""")
+        days = f"(SELECT DISTINCT {col} AS value, {day} AS day {new_rows}) d, "
+        statements.append(_alert_insert(table, col, "d.value", "d.day", days_from=days))
+    return statements
+
+
+def get_active_alerts(table=None, active_days=SURGE_ACTIVE_DAYS, conn=None):
+    """
+    Surges on the newest active_days days of each watched table (by event
+    date, so a table of old data still shows its latest surges).
+    Returns [table_name, dimension, value, day, count, baseline_mean, z_score,
+    flagged_at], strongest first.
+    """
+    if table is not None and table not in SURGE_COLUMNS:
+        raise ValueError(f"No surge detection for {table}")
+
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+
+    # surge_alerts holds only flagged days, so this reads a handful of rows;
+    # each table's newest day is one step down idx_surge_counts_day
+    df = pd.read_sql_query(f"""
+        SELECT a.table_name, a.dimension, a.value, a.day, a.count,
+               a.baseline_mean, a.baseline_var, datetime(a.flagged_ts, 'unixepoch') AS flagged_at
+        FROM surge_alerts a
+        WHERE (? IS NULL OR a.table_name = ?)
+          AND a.day > date((SELECT n.day FROM surge_counts n WHERE n.table_name = a.table_name
+                            ORDER BY n.day DESC LIMIT 1), '-{int(active_days)} days')
+    """, conn, params=(table, table))
+
+    # Same z as the trigger check, done here so SQLite needs no sqrt()
+    spread = df[["baseline_var", "baseline_mean"]].clip(lower=1).max(axis=1) ** 0.5
+    df["z_score"] = ((df["count"] - df["baseline_mean"]) / spread).round(1)
+    df["baseline_mean"] = df["baseline_mean"].round(2)
+    df = df.drop(columns="baseline_var").sort_values("z_score", ascending=False, ignore_index=True)
+    df = df[["table_name", "dimension", "value", "day", "count", "baseline_mean", "z_score", "flagged_at"]]
+
+    if owns_conn:
+        conn.close()
+    return df
+
+
+def rebuild_surge_counts(conn=None):
+    """
+    Recompute surge_counts and surge_alerts from the base tables.
+    Returns the counts that were wrong before the rebuild as
+    {(table, dimension, value, day): (stored, actual)}.
+    """
+    return rebuild_counts("surge_counts", ["table_name", "dimension", "value", "day"],
+                          surge_rebuild_statements(), conn=conn)
+
+
+def main():
+    return report_drift(rebuild_surge_counts(), "surge count", "Surge counts", SURGE_COLUMNS)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,9 +1,19 @@
 import pandas as pd
 from pathlib import Path
-from app.data.db import connect_database
+from app.data.db import connect_database, session, iter_param_rows
+from app.data.pagination import fetch_page, PAGE_SIZE
+from app.data.bulk import insert_batch
+from app.data.delta import fetch_delta
+from app.data.aggregates import read_counts, read_total
+from app.data.enums import CODES, normalize_label, normalize_rows
+from app.data.timestamps import to_epoch
 
 DATA_DIR = Path("DATA")
 
+# Columns accepted by insert_tickets_many
+TICKET_COLUMNS = ['ticket_id', 'priority', 'status', 'category', 'subject',
+                  'description', 'created_date', 'assigned_to']
+
 def load_tickets_csv():
     """Load tickets from CSV file."""
     csv_file = DATA_DIR / "it_tickets.csv"
@@ -16,48 +26,141 @@ def save_tickets_csv(df):
     DATA_DIR.mkdir(exist_ok=True)
     df.to_csv(DATA_DIR / "it_tickets.csv", index=False)
 
-def insert_ticket(ticket_id, priority, status, category, subject, description, created_date, assigned_to):
+def insert_ticket(ticket_id, priority, status, category, subject, description, created_date, assigned_to, conn=None):
     """
     INSERT: Add a new ticket.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
     cursor = conn.cursor()
     
+    # Store the canonical spelling ('critical' -> 'Critical')
+    priority = normalize_label("priority_levels", priority)
+    status = normalize_label("ticket_statuses", status)
+    
     cursor.execute("""
         INSERT INTO it_tickets 
         (ticket_id, priority, status, category, subject, description, created_date, assigned_to)
         VALUES (?, ?, ?, ?, ?, ?, ?, ?)
     """, (ticket_id, priority, status, category, subject, description, created_date, assigned_to))
     
-    conn.commit()
-    conn.close()
+    if owns_txn:
+        conn.commit()
+    if owns_conn:
+        conn.close()
+
+
+def insert_tickets_many(rows, conn=None):
+    """
+    INSERT: Add many tickets with one executemany in one transaction.
+    rows: DataFrame or iterable of dicts/tuples with TICKET_COLUMNS.
+    Returns the number of rows inserted.
+    """
+    # Without a caller's session, open one so the batch commits once
+    if conn is None:
+        with session() as s:
+            return insert_tickets_many(rows, conn=s)
+    
+    return insert_batch(conn, "it_tickets", TICKET_COLUMNS, normalize_rows(iter_param_rows(rows, TICKET_COLUMNS), TICKET_COLUMNS, "it_tickets"))
 
 
-def get_all_tickets():
+def get_all_tickets(conn=None):
     """
     READ: Get all tickets.
     """
-    conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     df = pd.read_sql_query("SELECT * FROM it_tickets", conn)
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
+def get_tickets_page(cursor=None, page_size=PAGE_SIZE, order_by_date=False, conn=None):
+    """
+    READ: Get one page of tickets, newest first, using keyset pagination.
+    Pass the returned next_cursor to get the following page (None = no more pages).
+    Returns (DataFrame, next_cursor).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    columns = ['id'] + TICKET_COLUMNS + ['resolved_date', 'created_at']
+    rows, next_cursor = fetch_page(
+        conn, "it_tickets", columns,
+        sort_column="created_date" if order_by_date else None,
+        cursor=cursor, page_size=page_size
+    )
+    
+    if owns_conn:
+        conn.close()
+    
+    return pd.DataFrame(rows, columns=columns), next_cursor
+
+
+def get_tickets_delta(since=None, conn=None):
+    """
+    READ: Get the tickets inserted, updated or deleted since a high-water mark.
+    since is the mark from the previous call (None = all tickets).
+    Returns (DataFrame of changed rows, deleted ids, new mark).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    columns = ['id'] + TICKET_COLUMNS + ['resolved_date', 'created_at', 'created_ts', 'resolved_ts',
+                                         'resolution_time_hours']
+    rows, deleted_ids, mark = fetch_delta(conn, "it_tickets", columns, since=since)
+    
+    if owns_conn:
+        conn.close()
+    
+    return pd.DataFrame(rows, columns=columns), deleted_ids, mark
+
+
+def update_ticket_status(ticket_id, new_status, conn=None):
+    """
+    UPDATE: Change the status of a ticket (by ticket_id, e.g. 'TICKET-1A2B3C4D').
+    The change is logged in status_transitions by a trigger.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database()
+    # Inside a session() this is the session's connection, already in its
+    # transaction: the session commits, not this call
+    owns_txn = owns_conn and not conn.in_transaction
+    
+    new_status = normalize_label("ticket_statuses", new_status)
+    cursor = conn.execute(
+        "UPDATE it_tickets SET status = ? WHERE ticket_id = ?",
+        (new_status, ticket_id)
+    )
+    
+    if owns_txn:
+        conn.commit()
+    if owns_conn:
+        conn.close()
+    return cursor.rowcount > 0
+
 # ANALYTICAL QUERIES
 def get_tickets_by_priority_count(conn=None):
     """
     Count tickets by priority level.
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    df = pd.read_sql_query("""
-        SELECT priority, COUNT(*) as count
-        FROM it_tickets
-        GROUP BY priority
-        ORDER BY count DESC
-    """, conn)
+    # Counts kept up to date by triggers, no GROUP BY scan
+    df = read_counts(conn, "it_tickets", "priority")
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -65,17 +168,15 @@ def get_tickets_by_status_count(conn=None):
     """
     Count tickets by status.
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    df = pd.read_sql_query("""
-        SELECT status, COUNT(*) as count
-        FROM it_tickets
-        GROUP BY status
-        ORDER BY count DESC
-    """, conn)
+    # Counts kept up to date by triggers, no GROUP BY scan
+    df = read_counts(conn, "it_tickets", "status")
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -83,16 +184,18 @@ def get_critical_tickets(conn=None):
     """
     Get all CRITICAL priority tickets.
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
     df = pd.read_sql_query("""
         SELECT * FROM it_tickets
-        WHERE priority = 'Critical'
+        WHERE priority_code = ?
         ORDER BY created_date DESC
-    """, conn)
+    """, conn, params=(CODES["priority_levels"]["critical"],))
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -100,16 +203,18 @@ def get_open_tickets(conn=None):
     """
     Get all OPEN status tickets.
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
     df = pd.read_sql_query("""
         SELECT * FROM it_tickets
-        WHERE status = 'Open'
+        WHERE status_code = ?
         ORDER BY created_date DESC
-    """, conn)
+    """, conn, params=(CODES["ticket_statuses"]["open"],))
     
-    conn.close()
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -117,8 +222,9 @@ def get_tickets_assigned_to(assigned_to, conn=None):
     """
     Get all tickets assigned to a specific person.
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
     df = pd.read_sql_query("""
         SELECT * FROM it_tickets
@@ -126,7 +232,28 @@ def get_tickets_assigned_to(assigned_to, conn=None):
         ORDER BY created_date DESC
     """, conn, params=(assigned_to,))
     
-    conn.close()
+    if owns_conn:
+        conn.close()
+    return df
+
+
+def get_tickets_created_between(start, end, conn=None):
+    """
+    Get the tickets created from start (inclusive) to end (exclusive), newest first.
+    start/end are dates, datetimes or ISO strings; compared on the indexed created_ts.
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    df = pd.read_sql_query("""
+        SELECT * FROM it_tickets
+        WHERE created_ts >= ? AND created_ts < ?
+        ORDER BY created_ts DESC
+    """, conn, params=(to_epoch(start), to_epoch(end)))
+    
+    if owns_conn:
+        conn.close()
     return df
 
 
@@ -134,12 +261,45 @@ def get_tickets_count_total(conn=None):
     """
     Get total count of all tickets.
     """
-    if conn is None:
-        conn = connect_database()
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
     
-    result = conn.execute("""
-        SELECT COUNT(*) FROM it_tickets
-    """).fetchone()
+    # Row total kept by triggers, no table scan
+    total = read_total(conn, "it_tickets")
+    
+    if owns_conn:
+        conn.close()
+    return total
+
+
+def get_ticket_summary(conn=None):
+    """
+    Get every headline KPI for the IT operations dashboard in one pass.
+    Priority and status are compared by integer code (app/data/enums.py).
+    """
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+    
+    cursor = conn.execute("""
+        SELECT
+            COUNT(*) AS total,
+            COALESCE(SUM(priority_code = 4), 0) AS critical,
+            COALESCE(SUM(priority_code = 3), 0) AS high,
+            COALESCE(SUM(priority_code = 2), 0) AS medium,
+            COALESCE(SUM(priority_code = 1), 0) AS low,
+            COALESCE(SUM(status_code = 1), 0) AS open,
+            COALESCE(SUM(status_code = 2), 0) AS in_progress,
+            COALESCE(SUM(status_code = 3), 0) AS on_hold,
+            COALESCE(SUM(status_code = 5), 0) AS resolved,
+            COALESCE(SUM(status_code = 6), 0) AS closed,
+            COALESCE(SUM(assigned_to IS NULL OR assigned_to = ''), 0) AS unassigned
+        FROM it_tickets
+    """)
+    columns = [col[0] for col in cursor.description]
+    summary = dict(zip(columns, cursor.fetchone()))
     
-    conn.close()
-    return result[0]
\ No newline at end of file
+    if owns_conn:
+        conn.close()
+    return summary
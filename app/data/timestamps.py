@@ -0,0 +1,75 @@
+from datetime import date, datetime, timezone
+
+# Epoch-second columns kept next to the free-text date columns:
+# table -> {text column: timestamp column}.
+# Triggers fill them on every write (schema migration 7), so reads compare
+# integers on an index instead of parsing text.
+TIMESTAMP_COLUMNS = {
+    "cyber_incidents": {"date": "date_ts"},
+    "it_tickets": {"created_date": "created_ts", "resolved_date": "resolved_ts"},
+    "datasets_metadata": {"last_updated": "last_updated_ts"},
+}
+
+# Text -> epoch seconds in SQLite. Accepts 'YYYY-MM-DD', 'YYYY-MM-DD HH:MM:SS'
+# with any fraction of a second, and the ISO 'T' form; times without a zone are
+# taken as UTC. Anything else gives NULL.
+EPOCH_SQL = "CAST(strftime('%s', {col}) AS INTEGER)"
+
+
+def to_epoch(value):
+    """
+    Convert a date/datetime/ISO string to epoch seconds (the same rules as EPOCH_SQL).
+    Returns None if the value can't be parsed.
+    """
+    if value is None:
+        return None
+    if isinstance(value, (int, float)):
+        return int(value)
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.strip())
+        except ValueError:
+            return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime(value.year, value.month, value.day)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return int(value.timestamp())
+
+
+def insert_sql(table, columns):
+    """
+    INSERT statement for columns (one positional parameter each) that also
+    fills the table's timestamp columns from the same parameters, with the
+    same EPOCH_SQL the triggers use. The insert triggers then see the finished
+    row, so there is no follow-up UPDATE (and no UPDATE triggers) per row.
+    """
+    names = list(columns)
+    values = [f"?{i}" for i in range(1, len(columns) + 1)]
+    for column, ts_column in TIMESTAMP_COLUMNS.get(table, {}).items():
+        if column in columns:
+            names.append(ts_column)
+            values.append(EPOCH_SQL.format(col=f"?{columns.index(column) + 1}"))
+    return f"INSERT INTO {table} ({', '.join(names)}) VALUES ({', '.join(values)})"
+
+
+def timestamp_statements(table, column, ts_column):
+    """Build the timestamp column, its index and the triggers that keep it in step."""
+    epoch = EPOCH_SQL.format(col=f"NEW.{column}")
+    return [
+        f"ALTER TABLE {table} ADD COLUMN {ts_column} INTEGER",
+        f"UPDATE {table} SET {ts_column} = {EPOCH_SQL.format(col=column)}",
+        f"CREATE INDEX IF NOT EXISTS idx_{table}_{ts_column} ON {table} ({ts_column})",
+        # A writer that already parsed the value can pass the timestamp itself
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{ts_column}_insert
+            AFTER INSERT ON {table}
+            WHEN NEW.{ts_column} IS NULL AND NEW.{column} IS NOT NULL
+            BEGIN
+            UPDATE {table} SET {ts_column} = {epoch} WHERE id = NEW.id;
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_{ts_column}_update
+            AFTER UPDATE OF {column} ON {table}
+            BEGIN
+            UPDATE {table} SET {ts_column} = {epoch} WHERE id = NEW.id;
+            END""",
+    ]
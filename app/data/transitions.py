@@ -0,0 +1,204 @@
+import pandas as pd
+from app.data.db import connect_database
+from app.data.timestamps import EPOCH_SQL
+
+# Append-only log of status changes. Triggers on the tracked tables write one
+# row when a row is created (from_status NULL) and one per status change, so
+# every writer is covered, not just update_incident_status/update_ticket_status.
+# changed_ts is epoch seconds: the row's own date for the first entry, the
+# time of the change for the others.
+STATUS_TRANSITIONS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS status_transitions (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        from_status TEXT,
+        to_status TEXT NOT NULL,
+        changed_ts INTEGER NOT NULL
+    )
+    """
+
+# One row's history in time order (PARTITION BY row ORDER BY time),
+# and "when did rows reach this status" range reads
+TRANSITION_INDEXES = [
+    ("idx_transitions_row_time", "status_transitions", "table_name, row_id, changed_ts, to_status, from_status"),
+    ("idx_transitions_status_time", "status_transitions", "table_name, to_status, changed_ts"),
+]
+
+# Tracked tables: the column holding the creation date, the statuses that
+# count as resolved, and the columns resolution stats can be grouped by
+TRANSITION_TABLES = {
+    "cyber_incidents": {
+        "created": "date",
+        "resolved": ["Resolved", "Closed"],
+        "dimensions": ["incident_type", "severity", "reported_by"],
+    },
+    "it_tickets": {
+        "created": "created_date",
+        "resolved": ["Resolved", "Closed"],
+        "dimensions": ["priority", "category", "assigned_to"],
+    },
+}
+
+NOW_SQL = "CAST(strftime('%s', 'now') AS INTEGER)"
+
+
+def transition_statements(table):
+    """Build the triggers that log a table's status changes, and the backfill."""
+    created = EPOCH_SQL.format(col=f"NEW.{TRANSITION_TABLES[table]['created']}")
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_status_insert
+            AFTER INSERT ON {table}
+            BEGIN
+            INSERT INTO status_transitions (table_name, row_id, from_status, to_status, changed_ts)
+            VALUES ('{table}', NEW.id, NULL, NEW.status, COALESCE({created}, {NOW_SQL}));
+            END""",
+        f"""CREATE TRIGGER IF NOT EXISTS trg_{table}_status_update
+            AFTER UPDATE OF status ON {table}
+            WHEN NEW.status IS NOT OLD.status
+            BEGIN
+            INSERT INTO status_transitions (table_name, row_id, from_status, to_status, changed_ts)
+            VALUES ('{table}', NEW.id, OLD.status, NEW.status, {NOW_SQL});
+            END""",
+        # Existing rows: history starts with their current status at their creation date
+        f"""INSERT INTO status_transitions (table_name, row_id, from_status, to_status, changed_ts)
+            SELECT '{table}', id, NULL, status,
+                   COALESCE({EPOCH_SQL.format(col=TRANSITION_TABLES[table]['created'])}, {NOW_SQL})
+            FROM {table} ORDER BY id""",
+    ]
+
+
+def transition_batch_statements(table):
+    """SQL that logs the first status of every row with id > ? at once, as the insert trigger would."""
+    created = EPOCH_SQL.format(col=TRANSITION_TABLES[table]['created'])
+    return [f"""
+        INSERT INTO status_transitions (table_name, row_id, from_status, to_status, changed_ts)
+        SELECT '{table}', id, NULL, status, COALESCE({created}, {NOW_SQL})
+        FROM {table} WHERE id > ? ORDER BY id"""]
+
+
+def append_only_statements():
+    """Triggers that reject changes to logged transitions."""
+    return [
+        f"""CREATE TRIGGER IF NOT EXISTS trg_status_transitions_no_{action.lower()}
+            BEFORE {action} ON status_transitions
+            BEGIN
+            SELECT RAISE(ABORT, 'status_transitions is append-only');
+            END"""
+        for action in ("UPDATE", "DELETE")
+    ]
+
+
+def _check(table, dimension=None):
+    if table not in TRANSITION_TABLES:
+        raise ValueError(f"Status history isn't kept for {table}")
+    if dimension is not None and dimension not in TRANSITION_TABLES[table]["dimensions"]:
+        raise ValueError(f"Unknown dimension '{dimension}' for table {table}")
+
+
+def get_status_history(table, row_id, conn=None):
+    """Every status change of one row, oldest first, with the hours spent in each status."""
+    _check(table)
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+
+    df = pd.read_sql_query(f"""
+        SELECT from_status, to_status, datetime(changed_ts, 'unixepoch') AS changed_at,
+               ROUND((COALESCE(LEAD(changed_ts) OVER w, {NOW_SQL}) - changed_ts) / 3600.0, 1) AS hours_in_status
+        FROM status_transitions
+        WHERE table_name = ? AND row_id = ?
+        WINDOW w AS (ORDER BY changed_ts, id)
+        ORDER BY changed_ts, id
+    """, conn, params=(table, row_id))
+
+    if owns_conn:
+        conn.close()
+    return df
+
+
+def get_time_in_status(table, conn=None):
+    """
+    Average and total hours spent in each status, over every row's history.
+    The current status of a row counts up to now.
+    Returns [status, entries, avg_hours, total_hours].
+    """
+    _check(table)
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+
+    df = pd.read_sql_query(f"""
+        WITH spans AS (
+            SELECT to_status,
+                   COALESCE(LEAD(changed_ts) OVER (PARTITION BY row_id ORDER BY changed_ts, id),
+                            {NOW_SQL}) - changed_ts AS seconds
+            FROM status_transitions
+            WHERE table_name = ?
+        )
+        SELECT to_status AS status, COUNT(*) AS entries,
+               ROUND(AVG(seconds) / 3600.0, 1) AS avg_hours,
+               ROUND(SUM(seconds) / 3600.0, 1) AS total_hours
+        FROM spans
+        GROUP BY to_status
+        ORDER BY total_hours DESC
+    """, conn, params=(table,))
+
+    if owns_conn:
+        conn.close()
+    return df
+
+
+def get_resolution_stats(table, dimension=None, conn=None):
+    """
+    Mean time to resolve (MTTR) and median / 90th percentile resolution time
+    in hours, per value of dimension (or overall), in one query.
+
+    A row's resolution time runs from its first logged status to the first
+    change into a resolved status. Rows that were already resolved when their
+    history started (e.g. imported as Resolved) have no resolution time and
+    are left out. Percentiles are nearest-rank.
+    Returns [dimension, resolved, mttr_hours, p50_hours, p90_hours].
+    """
+    _check(table, dimension)
+    owns_conn = conn is None
+    if owns_conn:
+        conn = connect_database(read_only=True)
+
+    resolved = TRANSITION_TABLES[table]["resolved"]
+    group = f"COALESCE(t.{dimension}, '')" if dimension else "'All'"
+    label = dimension or "scope"
+
+    df = pd.read_sql_query(f"""
+        WITH per_row AS (
+            SELECT row_id,
+                   MIN(changed_ts) AS opened_ts,
+                   MIN(CASE WHEN to_status IN ({', '.join('?' for _ in resolved)})
+                             AND from_status IS NOT NULL THEN changed_ts END) AS resolved_ts
+            FROM status_transitions
+            WHERE table_name = ?
+            GROUP BY row_id
+        ),
+        durations AS (
+            SELECT {group} AS grp, (p.resolved_ts - p.opened_ts) / 3600.0 AS hours
+            FROM per_row p JOIN {table} t ON t.id = p.row_id
+            WHERE p.resolved_ts IS NOT NULL
+        ),
+        ranked AS (
+            SELECT grp, hours,
+                   ROW_NUMBER() OVER (PARTITION BY grp ORDER BY hours) AS rn,
+                   COUNT(*) OVER (PARTITION BY grp) AS n
+            FROM durations
+        )
+        SELECT grp AS "{label}", COUNT(*) AS resolved,
+               ROUND(AVG(hours), 1) AS mttr_hours,
+               ROUND(MIN(CASE WHEN rn >= 0.5 * n THEN hours END), 1) AS p50_hours,
+               ROUND(MIN(CASE WHEN rn >= 0.9 * n THEN hours END), 1) AS p90_hours
+        FROM ranked
+        GROUP BY grp
+        ORDER BY mttr_hours DESC
+    """, conn, params=(*resolved, table))
+
+    if owns_conn:
+        conn.close()
+    return df
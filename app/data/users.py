@@ -6,7 +6,7 @@ def get_user_by_username(username):
     """Get a user by username."""
 
     # Connect to the database
-    conn = connect_database()
+    conn = connect_database(read_only=True)
     cursor = conn.cursor()
 
     # Execute parameterized query to find user by username
@@ -49,6 +49,8 @@ def verify_user(username, password):
 def update_user_password(username, new_password_hash):
    
     conn = connect_database()
+    # Inside a session() the session commits, not this call
+    owns_txn = not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute(
@@ -60,7 +62,8 @@ def update_user_password(username, new_password_hash):
         (new_password_hash, username)
     )
     
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     rows_updated = cursor.rowcount
     conn.close()
     
@@ -74,17 +77,22 @@ def update_user_password(username, new_password_hash):
 def insert_user(username, password_hash):
     """Insert a new user."""
     conn = connect_database()
+    # Inside a session() the session commits, not this call
+    owns_txn = not conn.in_transaction
     cursor = conn.cursor()
     cursor.execute(
         "INSERT INTO users (username, password_hash) VALUES (?, ?)",
         (username, password_hash)
     )
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     conn.close()
 
 def update_user_password(username, new_password_hash):
    
     conn = connect_database()
+    # Inside a session() the session commits, not this call
+    owns_txn = not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute(
@@ -96,7 +104,8 @@ def update_user_password(username, new_password_hash):
         (new_password_hash, username)
     )
     
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     rows_updated = cursor.rowcount
     conn.close()
     
@@ -112,6 +121,8 @@ def update_user_password(username, new_password_hash):
 def delete_user(username):
     
     conn = connect_database()
+    # Inside a session() the session commits, not this call
+    owns_txn = not conn.in_transaction
     cursor = conn.cursor()
     
     cursor.execute(
@@ -122,7 +133,8 @@ def delete_user(username):
         (username,)
     )
     
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     rows_deleted = cursor.rowcount
     
     conn.close()
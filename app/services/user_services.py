@@ -17,6 +17,8 @@ def migrate_users_from_file(filepath='DATA/users.txt'):
     
     # Connect to database
     conn = connect_database()
+    # Inside a session() the session commits, not this call
+    owns_txn = not conn.in_transaction
     cursor = conn.cursor()
     
     # Counter for migrated users
@@ -56,7 +58,8 @@ def migrate_users_from_file(filepath='DATA/users.txt'):
                     print(f"  ❌ Error migrating user {username}: {e}")
     
     # Save all changes to database
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     conn.close()
     
     # Print final summary
@@ -70,6 +73,8 @@ def register_user(username, password, role='user'):
     """
     # Connect to database
     conn = connect_database()
+    # Inside a session() the session commits, not this call
+    owns_txn = not conn.in_transaction
     cursor = conn.cursor()
     
     # Check if user already exists
@@ -91,7 +96,8 @@ def register_user(username, password, role='user'):
     )
     
     # Save changes
-    conn.commit()
+    if owns_txn:
+        conn.commit()
     conn.close()
     
     return True, f"User '{username}' registered successfully!"
@@ -102,7 +108,7 @@ def login_user(username, password):
     Authenticate a user.
     """
     # Connect to database
-    conn = connect_database()
+    conn = connect_database(read_only=True)
     cursor = conn.cursor()
     
     # Find user by username
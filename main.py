@@ -1,16 +1,100 @@
+import itertools
 import sqlite3
 import pandas as pd
+from concurrent.futures import ProcessPoolExecutor
 from pathlib import Path
-from app.data.db import connect_database
-from app.data.schema import create_all_tables
+from app.data.db import connect_database, session
+from app.data.schema import COUNTED_COLUMNS, create_all_tables, get_schema_version
+from app.data.aggregates import read_total
 from app.services.user_services import migrate_users_from_file
 from app.data.incidents import get_all_incidents, get_incidents_count_total
 from app.data.dataset import get_all_datasets
 from app.data.tickets import get_all_tickets
 
+# Seed files: table -> (csv path, column renames, columns to keep, natural key)
+SEED_FILES = {
+    "cyber_incidents": (
+        "DATA/cyber_incidents.csv",
+        {'incident_id': 'id', 'timestamp': 'date', 'category': 'incident_type'},
+        ['id', 'date', 'incident_type', 'severity', 'status', 'description'],
+        "id",
+    ),
+    "datasets_metadata": (
+        "DATA/datasets_metadata.csv",
+        {'dataset_id': 'id', 'name': 'dataset_name', 'rows': 'record_count',
+         'columns': 'file_size_mb', 'uploaded_by': 'source'},
+        ['id', 'dataset_name', 'record_count', 'file_size_mb', 'source'],
+        "id",
+    ),
+    "it_tickets": (
+        "DATA/it_tickets.csv",
+        {'description': 'subject', 'created_at': 'created_date'},
+        ['ticket_id', 'priority', 'status', 'assigned_to', 'subject', 'created_date',
+         'resolution_time_hours'],
+        "ticket_id",
+    ),
+}
+
+# Rows per executemany call while loading
+LOAD_CHUNK_SIZE = 10_000
+
+
+def parse_seed_csv(table_name):
+    """
+    Read a seed CSV and rename its columns to match the database schema.
+    Runs in a worker process, so it only parses - it never touches the database.
+    """
+    csv_path, renames, columns, _ = SEED_FILES[table_name]
+    csv_path = Path(csv_path)
+    
+    if not csv_path.exists():
+        return None
+    
+    df = pd.read_csv(csv_path)
+    df = df.rename(columns=renames)[columns]
+    
+    # NaN -> None so sqlite stores NULL
+    return df.astype(object).where(df.notna(), None)
+
+
+def upsert_rows(conn, table_name, df, key):
+    """
+    Insert rows, or update them when the natural key already exists.
+    Rows that are already identical are skipped, so re-running is cheap.
+    Returns the number of rows inserted or changed.
+    """
+    columns = list(df.columns)
+    updates = [col for col in columns if col != key]
+    
+    sql = f"""
+        INSERT INTO {table_name} ({', '.join(columns)})
+        VALUES ({', '.join('?' for _ in columns)})
+        ON CONFLICT ({key}) DO UPDATE SET
+            {', '.join(f'{col} = excluded.{col}' for col in updates)}
+        WHERE {' OR '.join(f'{col} IS NOT excluded.{col}' for col in updates)}
+    """
+    
+    changed = 0
+    rows = df.itertuples(index=False, name=None)
+    while True:
+        chunk = list(itertools.islice(rows, LOAD_CHUNK_SIZE))
+        if not chunk:
+            break
+        changed += conn.executemany(sql, chunk).rowcount
+    return changed
+
+
+def write_seed_table(table_name, df):
+    """Upsert a parsed seed file in one transaction. Returns rows changed."""
+    key = SEED_FILES[table_name][3]
+    with session() as conn:
+        return upsert_rows(conn, table_name, df, key)
+
+
 def load_csv_to_table(csv_path, table_name):
     """
     Load a CSV file into a database table.
+    Safe to re-run: rows are matched on their natural id.
     """
     csv_path = Path(csv_path)
     
@@ -19,51 +103,44 @@ def load_csv_to_table(csv_path, table_name):
         return 0
     
     try:
-        # Read CSV file using pandas
-        df = pd.read_csv(csv_path)
-        
-        # Rename columns to match database schema
-        if table_name == "cyber_incidents":
-            df = df.rename(columns={
-                'incident_id': 'id',
-                'timestamp': 'date',
-                'category': 'incident_type'
-            })
-            df = df[['id', 'date', 'incident_type', 'severity', 'status', 'description']]
-        
-        elif table_name == "datasets_metadata":
-            df = df.rename(columns={
-                'dataset_id': 'id',
-                'name': 'dataset_name',
-                'rows': 'record_count',
-                'columns': 'file_size_mb',
-                'uploaded_by': 'source'
-            })
-            df = df[['id', 'dataset_name', 'record_count', 'file_size_mb', 'source']]
-        
-        elif table_name == "it_tickets":
-            df = df.rename(columns={
-                'description': 'subject',
-                'created_at': 'created_date'
-            })
-            df = df[['ticket_id', 'priority', 'status', 'assigned_to', 'subject', 'created_date']]
-        
-        # Connect to database
-        conn = connect_database()
-        
-        # Insert data into table
-        df.to_sql(table_name, conn, if_exists='append', index=False)
-        conn.close()
-        
-        row_count = len(df)
-        print(f"  ✅ Loaded {row_count} rows into {table_name}")
-        return row_count
+        df = parse_seed_csv(table_name)
+        changed = write_seed_table(table_name, df)
+        print(f"  ✅ {table_name}: {len(df)} rows read, {changed} inserted/updated")
+        return changed
         
     except Exception as e:
         print(f"  ❌ Error: {e}")
         return 0
 
 
+def load_seed_files():
+    """
+    Load every seed file.
+    The CSVs are parsed in parallel worker processes; the writes stay in this
+    process, one transaction per table, so there is only ever one writer.
+    """
+    total_rows = 0
+    tables = list(SEED_FILES)
+    
+    with ProcessPoolExecutor(max_workers=len(tables)) as pool:
+        futures = {table: pool.submit(parse_seed_csv, table) for table in tables}
+        
+        # Write each table as soon as its parse is done
+        for table in tables:
+            try:
+                df = futures[table].result()
+                if df is None:
+                    print(f"⚠️  File not found: {SEED_FILES[table][0]}")
+                    continue
+                changed = write_seed_table(table, df)
+                print(f"  ✅ {table}: {len(df)} rows read, {changed} inserted/updated")
+                total_rows += changed
+            except Exception as e:
+                print(f"  ❌ Error loading {table}: {e}")
+    
+    return total_rows
+
+
 def setup_database_complete():
     """
     Complete database setup:
@@ -82,9 +159,9 @@ def setup_database_complete():
     print("-" * 80)
     try:
         conn = connect_database()
-        create_all_tables(conn)
+        version = create_all_tables(conn)
         conn.close()
-        print("✅ All tables created successfully!")
+        print(f"✅ Schema is up to date (version {version})")
     except Exception as e:
         print(f"❌ Error creating tables: {e}")
         return
@@ -101,54 +178,35 @@ def setup_database_complete():
     # ========== STEP 3: Load CSV Data ==========
     print("\n[STEP 3] Loading CSV Data...")
     print("-" * 80)
-    total_rows = 0
-    
-    print("Loading cyber_incidents.csv...")
-    rows = load_csv_to_table("DATA/cyber_incidents.csv", "cyber_incidents")
-    total_rows += rows
-    
-    print("Loading datasets_metadata.csv...")
-    rows = load_csv_to_table("DATA/datasets_metadata.csv", "datasets_metadata")
-    total_rows += rows
-    
-    print("Loading it_tickets.csv...")
-    rows = load_csv_to_table("DATA/it_tickets.csv", "it_tickets")
-    total_rows += rows
+    total_rows = load_seed_files()
     
     # ========== STEP 4: Verify Data ==========
     print("\n[STEP 4] Verifying Data...")
     print("-" * 80)
     
     conn = connect_database()
-    cursor = conn.cursor()
-    
-    # Count users
-    cursor.execute("SELECT COUNT(*) FROM users")
-    user_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM cyber_incidents")
-    incident_count = cursor.fetchone()[0]
-    
-    cursor.execute("SELECT COUNT(*) FROM datasets_metadata")
-    dataset_count = cursor.fetchone()[0]
     
-    cursor.execute("SELECT COUNT(*) FROM it_tickets")
-    ticket_count = cursor.fetchone()[0]
+    # Row counts from the trigger-maintained totals instead of COUNT(*) on every
+    # table, so the check costs the same however many rows are loaded
+    # (users isn't counted by the triggers, and only holds a few rows)
+    counts = {table: read_total(conn, table) for table in COUNTED_COLUMNS}
+    counts["users"] = conn.execute("SELECT COUNT(*) FROM users").fetchone()[0]
+    schema_version = get_schema_version(conn)
     
     conn.close()
     
     # Print summary
-    print(f"\nDatabase Summary:")
-    print(f"  👥 Users: {user_count}")
-    print(f"  🚨 Cyber Incidents: {incident_count}")
-    print(f"  📊 Datasets: {dataset_count}")
-    print(f"  🎫 IT Tickets: {ticket_count}")
+    print(f"\nDatabase Summary (schema v{schema_version}, rows):")
+    print(f"  👥 Users: {counts['users']}")
+    print(f"  🚨 Cyber Incidents: {counts['cyber_incidents']}")
+    print(f"  📊 Datasets: {counts['datasets_metadata']}")
+    print(f"  🎫 IT Tickets: {counts['it_tickets']}")
     
     # ========== FINAL SUMMARY ==========
     print("\n" + "=" * 80)
     print("✅ DATABASE SETUP COMPLETE!")
     print("=" * 80)
-    print(f"\nTotal Data Loaded: {total_rows} rows")
+    print(f"\nTotal Data Loaded: {total_rows} rows inserted/updated")
     print(f"Database Location: DATA/intelligence_platform.db")
     print("\nYou can now use the database with:")
     print("  - app/data/incidents.py")
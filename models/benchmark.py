@@ -0,0 +1,103 @@
+# Benchmark of model object memory and construction time
+#
+#   python -m models.benchmark            (1,000,000 rows)
+#   python -m models.benchmark 200000
+import sqlite3
+import sys
+import time
+import tracemalloc
+from models.security_incident import SecurityIncident
+
+BENCHMARK_ROWS = 1_000_000
+
+
+class DictIncident:
+    """The old SecurityIncident layout: private attributes in a per-object __dict__."""
+
+    def __init__(self, incident_id, date, incident_type, severity, status, description):
+        self.__id = incident_id
+        self.__date = date
+        self.__incident_type = incident_type
+        self.__severity = severity
+        self.__status = status
+        self.__description = description
+
+
+def _sample_connection(rows):
+    """In-memory database with `rows` incidents (a few distinct values, like the real data)."""
+    conn = sqlite3.connect(":memory:")
+    conn.execute("""
+        CREATE TABLE cyber_incidents (
+            id INTEGER PRIMARY KEY, date TEXT, incident_type TEXT,
+            severity TEXT, status TEXT, description TEXT
+        )
+    """)
+    severities = ["Low", "Medium", "High", "Critical"]
+    statuses = ["Open", "In Progress", "Resolved", "Closed"]
+    conn.executemany(
+        "INSERT INTO cyber_incidents VALUES (?, ?, ?, ?, ?, ?)",
+        ((i, f"2024-{i % 12 + 1:02d}-{i % 28 + 1:02d}", "Phishing",
+          severities[i % 4], statuses[i % 4], f"Incident {i}")
+         for i in range(1, rows + 1))
+    )
+    return conn
+
+
+def _measure(label, build):
+    """Report the time build() takes and the memory its result holds."""
+    # Timed without tracemalloc, which slows allocation down a lot
+    start = time.perf_counter()
+    objects = build()
+    elapsed = time.perf_counter() - start
+    del objects
+
+    tracemalloc.start()
+    objects = build()
+    held, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del objects
+    return {"label": label, "seconds": elapsed, "bytes": held}
+
+
+def run_benchmark(rows=BENCHMARK_ROWS):
+    """
+    Load the same rows as plain tuples, as __dict__ objects built by index
+    (the old page code) and as slotted objects built by the row factory.
+    The memory figures include the row values themselves.
+    """
+    conn = _sample_connection(rows)
+    sql = "SELECT id, date, incident_type, severity, status, description FROM cyber_incidents"
+
+    def tuples():
+        return conn.execute(sql).fetchall()
+
+    def dict_objects():
+        return [DictIncident(row[0], row[1], row[2], row[3], row[4], row[5])
+                for row in conn.execute(sql).fetchall()]
+
+    def slotted_objects():
+        cur = conn.cursor()
+        cur.row_factory = SecurityIncident.from_row
+        return cur.execute(sql).fetchall()
+
+    results = [
+        _measure("tuples", tuples),
+        _measure("__dict__ objects (by index)", dict_objects),
+        _measure("__slots__ objects (row_factory)", slotted_objects),
+    ]
+    conn.close()
+    return results
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else BENCHMARK_ROWS
+    print(f"Loading {rows:,} incident rows\n")
+    print(f"{'':34} {'time (s)':>9} {'total MB':>9} {'bytes/row':>10}")
+    for result in run_benchmark(rows):
+        print(f"{result['label']:34} {result['seconds']:9.2f} "
+              f"{result['bytes'] / 1024 / 1024:9.1f} {result['bytes'] / rows:10.0f}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
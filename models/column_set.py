@@ -0,0 +1,95 @@
+# ColumnSet base class - a collection of records stored column by column
+import pandas as pd
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from app.data.enums import ENUMS, categorical_dtype
+
+
+class ColumnSet:
+    """
+    Collection of records backed by one array per column (a DataFrame),
+    instead of one model object per row.
+    Subclasses set COLUMNS (the model's to_dict() keys) and ITEM_CLASS.
+    Columns listed in ENUM_COLUMNS (column -> domain in app/data/enums.py) and
+    CATEGORY_COLUMNS are loaded as pandas categoricals: one small integer per
+    row instead of a string object, and 'critical'/'Critical' become one value.
+    TIMESTAMP_COLUMNS are epoch-second columns stored after COLUMNS; they are
+    loaded as datetimes and are not passed to ITEM_CLASS.
+    """
+
+    COLUMNS: List[str] = []
+    ITEM_CLASS: Any = None
+    ENUM_COLUMNS: Dict[str, str] = {}
+    CATEGORY_COLUMNS: List[str] = []
+    TIMESTAMP_COLUMNS: List[str] = []
+
+    def __init__(self, frame: Optional[pd.DataFrame] = None):
+        self.__frame = frame if frame is not None else pd.DataFrame(columns=self.COLUMNS + self.TIMESTAMP_COLUMNS)
+
+    @classmethod
+    def from_rows(cls, rows: Sequence[tuple], index: Optional[Sequence[Any]] = None) -> "ColumnSet":
+        """Build the set straight from database row tuples (COLUMNS, then TIMESTAMP_COLUMNS)."""
+        frame = pd.DataFrame.from_records(rows, columns=cls.COLUMNS + cls.TIMESTAMP_COLUMNS, index=index)
+        return cls.from_frame(frame)
+
+    @classmethod
+    def from_frame(cls, frame: pd.DataFrame) -> "ColumnSet":
+        """Build the set from a DataFrame with COLUMNS (defaults and dtypes are applied)."""
+        return cls(cls._apply_dtypes(cls._prepare(frame)))
+
+    @classmethod
+    def _prepare(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """Fill in defaults for newly loaded rows (override in subclasses)."""
+        return frame
+
+    @classmethod
+    def _apply_dtypes(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """Convert the enum and category columns to categoricals and timestamps to datetimes."""
+        for column, domain in cls.ENUM_COLUMNS.items():
+            values = frame[column]
+            if not isinstance(values.dtype, pd.CategoricalDtype):
+                # Canonical spelling for known labels, anything else is kept as is
+                canonical = {label.lower(): label for label in ENUMS[domain]}
+                values = values.str.strip().str.lower().map(canonical).fillna(values)
+            frame[column] = values.astype(categorical_dtype(domain, values.unique()))
+        for column in cls.CATEGORY_COLUMNS:
+            frame[column] = frame[column].astype("category").cat.remove_unused_categories()
+        # Parsed once by SQLite on write; here it's only an integer -> datetime cast
+        for column in cls.TIMESTAMP_COLUMNS:
+            if not pd.api.types.is_datetime64_any_dtype(frame[column]):
+                frame[column] = pd.to_datetime(frame[column], unit="s")
+        return frame
+
+    def __len__(self) -> int:
+        return len(self.__frame)
+
+    def __iter__(self) -> Iterator[Any]:
+        """Yield model objects one at a time, for code that still needs them."""
+        fields = len(self.COLUMNS)
+        for values in self.__frame.itertuples(index=False, name=None):
+            yield self.ITEM_CLASS(*values[:fields])
+
+    def __getitem__(self, position: int) -> Any:
+        """Model object for the record at a position."""
+        return self.ITEM_CLASS(*self.__frame.iloc[position].tolist()[:len(self.COLUMNS)])
+
+    def column(self, name: str) -> pd.Series:
+        """One column of the set (no copy)."""
+        return self.__frame[name]
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """The set as a DataFrame; this is the backing storage, so no copy is made."""
+        return self.__frame
+
+    def levels(self, name: str) -> pd.Series:
+        """Integer code of an enum column (app/data/enums.py), 0 if unknown."""
+        known = len(ENUMS[self.ENUM_COLUMNS[name]])
+        codes = self.__frame[name].cat.codes
+        return (codes.where(codes < known, -1) + 1).astype(int)
+
+    def value_counts(self, name: str) -> Dict[Any, int]:
+        """
+        Count the records per value of a column. Enum columns are in level
+        order, other columns in order of first appearance.
+        """
+        counts = self.__frame[name].value_counts(sort=False, dropna=False)
+        return counts[counts > 0].to_dict()
@@ -2,6 +2,10 @@
 class Dataset:
     """Represents a data science dataset in the platform."""
 
+    # Fixed attribute slots instead of a per-object __dict__ (much smaller objects)
+    __slots__ = ("__id", "__name", "__category", "__source", "__last_updated", "__record_count",
+                 "__file_size_mb")
+
     def __init__(self, dataset_id: int, name: str, category: str, 
                  source: str, last_updated: str, record_count: int, file_size_mb: float):
         self.__id = dataset_id
@@ -12,6 +16,14 @@ class Dataset:
         self.__record_count = record_count
         self.__file_size_mb = file_size_mb
 
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> "Dataset":
+        """
+        sqlite3 row_factory: build the object straight from a cursor row.
+        The row must be (id, dataset_name, category, source, last_updated, record_count, file_size_mb).
+        """
+        return cls(*row)
+
 
     # These methods allow external code to read the private attributes safely
 
@@ -0,0 +1,28 @@
+# DatasetSet collection class - many datasets stored by column
+import pandas as pd
+from models.column_set import ColumnSet
+from models.dataset import Dataset
+
+
+class DatasetSet(ColumnSet):
+    """Column-backed collection of datasets."""
+
+    COLUMNS = ["id", "dataset_name", "category", "source", "last_updated", "record_count", "file_size_mb"]
+    ITEM_CLASS = Dataset
+    CATEGORY_COLUMNS = ["category", "source"]
+    TIMESTAMP_COLUMNS = ["last_updated_ts"]
+
+    @classmethod
+    def _prepare(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """Missing counts and sizes become 0, like the Dataset objects did."""
+        frame["record_count"] = frame["record_count"].fillna(0).astype(int)
+        frame["file_size_mb"] = frame["file_size_mb"].fillna(0.0).astype(float)
+        return frame
+
+    def size_bytes(self) -> pd.Series:
+        """File size of every dataset in bytes (Dataset.calculate_size_bytes)."""
+        return (self.column("file_size_mb") * 1024 * 1024).astype("int64")
+
+    def total_size_bytes(self) -> int:
+        """Combined size of all datasets in bytes."""
+        return int(self.size_bytes().sum())
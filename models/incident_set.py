@@ -0,0 +1,18 @@
+# IncidentSet collection class - many security incidents stored by column
+import pandas as pd
+from models.column_set import ColumnSet
+from models.security_incident import SecurityIncident
+
+
+class IncidentSet(ColumnSet):
+    """Column-backed collection of security incidents."""
+
+    COLUMNS = ["id", "date", "incident_type", "severity", "status", "description"]
+    ITEM_CLASS = SecurityIncident
+    ENUM_COLUMNS = {"severity": "severity_levels", "status": "incident_statuses"}
+    CATEGORY_COLUMNS = ["incident_type"]
+    TIMESTAMP_COLUMNS = ["date_ts"]
+
+    def severity_levels(self) -> pd.Series:
+        """Integer severity level of every incident (0 if unknown)."""
+        return self.levels("severity")
@@ -1,8 +1,13 @@
 # ITTicket entity class - represents a single IT support ticket
+from app.data.enums import CODES
 
 class ITTicket:
     """Represents an IT support ticket in the platform."""
 
+    # Fixed attribute slots instead of a per-object __dict__ (much smaller objects)
+    __slots__ = ("__id", "__date", "__category", "__priority", "__status", "__description",
+                 "__assigned_to")
+
     def __init__(self, ticket_id: int, date: str, category: str, 
                  priority: str, status: str, description: str, assigned_to: str):
         self.__id = ticket_id
@@ -13,6 +18,14 @@ class ITTicket:
         self.__description = description
         self.__assigned_to = assigned_to
 
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> "ITTicket":
+        """
+        sqlite3 row_factory: build the object straight from a cursor row.
+        The row must be (ticket_id, date, category, priority, status, description, assigned_to).
+        """
+        return cls(*row)
+
 
     # These methods allow safe read-only access to private attributes
 
@@ -60,13 +73,7 @@ class ITTicket:
 
     def get_priority_level(self) -> int:
         """Return an integer priority level."""
-        mapping = {
-            "low": 1,
-            "medium": 2,
-            "high": 3,
-            "critical": 4,
-        }
-        return mapping.get(self.__priority.lower(), 0)
+        return CODES["priority_levels"].get(self.__priority.lower(), 0)
 
     def to_dict(self) -> dict:
         """
@@ -1,8 +1,12 @@
 # SecurityIncident entity class - represents a single cybersecurity incident
+from app.data.enums import CODES
 
 class SecurityIncident:
     """Represents a cybersecurity incident in the platform."""
 
+    # Fixed attribute slots instead of a per-object __dict__ (much smaller objects)
+    __slots__ = ("__id", "__date", "__incident_type", "__severity", "__status", "__description")
+
     def __init__(self, incident_id: int, date: str, incident_type: str, 
                  severity: str, status: str, description: str):
         self.__id = incident_id
@@ -12,6 +16,15 @@ class SecurityIncident:
         self.__status = status
         self.__description = description
 
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> "SecurityIncident":
+        """
+        sqlite3 row_factory: build the object straight from a cursor row.
+        The row must be (id, date, incident_type, severity, status, description).
+        """
+        return cls(*row)
+
+
     # These methods provide safe read-only access to private incident data
     def get_id(self) -> int:
         """Return the incident's unique identifier."""
@@ -44,13 +57,7 @@ class SecurityIncident:
 
     def get_severity_level(self) -> int:
         """Return an integer severity level."""
-        mapping = {
-            "low": 1,
-            "medium": 2,
-            "high": 3,
-            "critical": 4,
-        }
-        return mapping.get(self.__severity.lower(), 0)
+        return CODES["severity_levels"].get(self.__severity.lower(), 0)
 
     def to_dict(self) -> dict:
         """
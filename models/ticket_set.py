@@ -0,0 +1,24 @@
+# TicketSet collection class - many IT tickets stored by column
+import pandas as pd
+from models.column_set import ColumnSet
+from models.it_ticket import ITTicket
+
+
+class TicketSet(ColumnSet):
+    """Column-backed collection of IT tickets."""
+
+    COLUMNS = ["id", "date", "category", "priority", "status", "description", "assigned_to"]
+    ITEM_CLASS = ITTicket
+    ENUM_COLUMNS = {"priority": "priority_levels", "status": "ticket_statuses"}
+    CATEGORY_COLUMNS = ["category"]
+    TIMESTAMP_COLUMNS = ["created_ts"]
+
+    @classmethod
+    def _prepare(cls, frame: pd.DataFrame) -> pd.DataFrame:
+        """Unassigned tickets get an empty assignee, like the ITTicket objects did."""
+        frame["assigned_to"] = frame["assigned_to"].fillna("")
+        return frame
+
+    def priority_levels(self) -> pd.Series:
+        """Integer priority level of every ticket (0 if unknown)."""
+        return self.levels("priority")
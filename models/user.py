@@ -2,11 +2,22 @@
 class User:
     """Represents a user in the Multi-Domain Intelligence Platform."""
 
+    # Fixed attribute slots instead of a per-object __dict__ (much smaller objects)
+    __slots__ = ("__username", "__password_hash", "__role")
+
     def __init__(self, username: str, password_hash: str, role: str = "user"):
         self.__username = username
         self.__password_hash = password_hash
         self.__role = role
 
+    @classmethod
+    def from_row(cls, cursor, row: tuple) -> "User":
+        """
+        sqlite3 row_factory: build the object straight from a cursor row.
+        The row must be (username, password_hash, role).
+        """
+        return cls(*row)
+
     def get_username(self) -> str:
         return self.__username
 
@@ -8,7 +8,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from services.database_manager import DatabaseManager
 from services.ai_assistant import AIAssistant
-from models.security_incident import SecurityIncident
+from services.csv_importer import CSVImporter
+from services.paged_table import PagedTable
+from app.data.query_builder import Query
+from app.data.sampling import sample_caption
 
 # Page setup
 st.set_page_config(
@@ -72,28 +75,12 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
 st.title("🔒 Cybersecurity Command Centre")
 st.caption("Real-time threat monitoring and incident management")
 
-# Load incidents using DatabaseManager and convert to SecurityIncident objects
-rows = db.get_all_incidents()
-incidents = []
-for row in rows:
-    incident = SecurityIncident(
-        incident_id=row[0],
-        date=row[1],
-        incident_type=row[2],
-        severity=row[3],
-        status=row[4],
-        description=row[5]
-    )
-    incidents.append(incident)
-
-
-# Convert to DataFrame for display
-df_incidents = pd.DataFrame([inc.to_dict() for inc in incidents]) if incidents else pd.DataFrame()
-
-# Calculate metrics using objects
-critical_count = sum(1 for inc in incidents if inc.get_severity().lower() == "critical")
-high_count = sum(1 for inc in incidents if inc.get_severity().lower() == "high")
-open_count = sum(1 for inc in incidents if inc.get_status().lower() == "open")
+# Headline metrics from one aggregate query. The page never loads the whole
+# table: charts read the trigger-maintained counters, the table is paged
+summary = db.cached("incident_summary", db.get_incident_summary)
+critical_count = summary["critical"]
+high_count = summary["high"]
+open_count = summary["open"]
 
 # Display metrics in columns
 col1, col2, col3, col4 = st.columns(4)
@@ -108,29 +95,22 @@ with col3:
     st.metric("📂 Open Cases", open_count)
 
 with col4:
-    st.metric("📊 Total Incidents", len(incidents))
+    st.metric("📊 Total Incidents", summary["total"])
 
 # Create tabs for different sections
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["📋 View Data", "➕ Add Incident", "📤 Upload CSV", "📊 Analytics & Insights", "🤖 AI Assistant"])
 
 # Tab 1: View Data
 with tab1:
-    if len(df_incidents) > 0:
+    if summary["total"] > 0:
         # Time-series chart: Incidents over time
         st.subheader("📈 Incidents Over Time")
         
-        # Prepare time-series data
-        df_incidents_copy = df_incidents.copy()
-        df_incidents_copy['date'] = pd.to_datetime(df_incidents_copy['date'], errors='coerce')
-        df_incidents_copy = df_incidents_copy.dropna(subset=['date'])
+        # Counts per day/week/month from the trigger-maintained rollups
+        time_series = db.get_time_series("cyber_incidents")
         
-        if len(df_incidents_copy) > 0:
-            # Group by date and count incidents
-            df_incidents_copy['date_only'] = df_incidents_copy['date'].dt.date
-            time_series = df_incidents_copy.groupby('date_only').size().reset_index(name='count')
-            time_series.columns = ['Date', 'Incidents']
-            time_series = time_series.sort_values('Date')
-            time_series = time_series.set_index('Date')
+        if len(time_series) > 0:
+            time_series = time_series.rename(columns={'bucket': 'Date', 'count': 'Incidents'}).set_index('Date')
             
             # Display line chart
             st.line_chart(time_series, color="#ef4444", height=300)
@@ -141,15 +121,25 @@ with tab1:
         
         # Bar chart: Incidents by Severity
         st.subheader("📊 Incidents by Severity")
-        severity_counts = df_incidents["severity"].value_counts().reset_index()
-        severity_counts.columns = ["severity", "count"]
+        # From aggregate_counts, in Low -> Critical order
+        severity_counts = db.get_counts("cyber_incidents", "severity")
         st.bar_chart(severity_counts.set_index("severity"), color="#ef4444")
         
         st.markdown("---")
         
-        # Data table
+        # Data table, or full-text search results (best matches first)
         st.subheader("📋 All Incidents")
-        st.dataframe(df_incidents, width='stretch', height=350)
+        search_text = st.text_input("🔎 Search descriptions", key="incident_search",
+                                    placeholder="e.g. credential phishing")
+        if search_text:
+            results = db.search("cyber_incidents", search_text)
+            st.caption(f"{len(results)} best matches for '{search_text}'")
+            st.dataframe(results, width='stretch', hide_index=True, height=350)
+        else:
+            PagedTable(
+                "incidents_table", db.get_incidents_page,
+                ["id", "date", "incident_type", "severity", "status", "description"]
+            ).render(height=350)
     else:
         st.info("🔍 No incidents recorded yet. Add one to get started!")
 
@@ -186,34 +176,41 @@ with tab3:
     
     uploaded_file = st.file_uploader("Choose CSV file", type="csv", key="incident_upload")
     if uploaded_file:
-        new_df = pd.read_csv(uploaded_file)
-        st.dataframe(new_df.head(), width='stretch')
+        # Only the first rows are read for the preview
+        importer = CSVImporter(db)
+        st.dataframe(importer.preview(uploaded_file), width='stretch')
         
         if st.button("📥 Import Data"):
-            for _, row in new_df.iterrows():
-                db.insert_incident(
-                    str(row.get('date', '')),
-                    str(row.get('incident_type', '')),
-                    str(row.get('severity', '')),
-                    str(row.get('status', '')),
-                    str(row.get('description', ''))
-                )
-
-            st.success(f"✅ Added {len(new_df)} incidents")
+            # Stream the file in chunks: one batched insert and commit per chunk
+            progress_bar = st.progress(0.0, text="Importing...")
+            imported = importer.import_incidents(
+                uploaded_file,
+                progress=lambda rows, fraction: progress_bar.progress(fraction, text=f"Imported {rows:,} rows")
+            )
+            st.success(f"✅ Added {imported} incidents")
             st.rerun()
 
 # Tab 4: Analytics & Insights
 with tab4:
     st.subheader("🎯 High-Value Security Analysis")
+    approximate = st.toggle("⚡ Approximate mode", help="Estimate the breakdowns below from a sample "
+                            "of the incidents. Faster on very large tables; results marked ≈ are estimates.")
     
-    if len(df_incidents) > 0:
+    if summary["total"] > 0:
         # Analysis 1: Phishing Surge Detection
         st.markdown("### 🎣 Phishing Threat Analysis")
         
+        # Surges are flagged by triggers as incidents are written, so this is a small read
+        surge_alerts = db.get_surge_alerts("cyber_incidents")
+        for alert in surge_alerts.itertuples():
+            st.error(f"🚨 Surge: {alert.count} {alert.value} incidents on {alert.day} "
+                     f"(usually {alert.baseline_mean:.1f}/day, z = {alert.z_score})")
+        if len(surge_alerts) == 0:
+            st.success("✅ No incident surges detected")
+        
 
-        phishing_incidents = df_incidents[df_incidents['incident_type'].str.contains('Phishing', case=False, na=False)]
-        total_phishing = len(phishing_incidents)
-        total_incidents = len(df_incidents)
+        total_phishing = summary["phishing"]
+        total_incidents = summary["total"]
         phishing_percentage = (total_phishing / total_incidents * 100) if total_incidents > 0 else 0
         
         col1, col2, col3 = st.columns(3)
@@ -222,57 +219,73 @@ with tab4:
         with col2:
             st.metric("Phishing % of Total", f"{phishing_percentage:.1f}%")
         with col3:
-            unresolved_phishing = len(phishing_incidents[phishing_incidents['status'].isin(['Open', 'In Progress'])])
-            st.metric("Unresolved Phishing", unresolved_phishing, delta=None)
+            st.metric("Unresolved Phishing", summary["unresolved_phishing"], delta=None)
         
         if total_phishing > 0:
-            # Phishing trend over time
-            phishing_trend = phishing_incidents.copy()
-            phishing_trend['date'] = pd.to_datetime(phishing_trend['date'], errors='coerce')
-            phishing_trend = phishing_trend.dropna(subset=['date'])
-            if len(phishing_trend) > 0:
-                phishing_trend['date_only'] = phishing_trend['date'].dt.date
-                phishing_time_series = phishing_trend.groupby('date_only').size().reset_index(name='count')
-                phishing_time_series.columns = ['Date', 'Phishing Incidents']
-                phishing_time_series = phishing_time_series.sort_values('Date')
-                phishing_time_series = phishing_time_series.set_index('Date')
+            # Phishing trend over time (from the rollups), matching the same
+            # incident types as the KPIs above and the severity query below
+            phishing_time_series = db.get_time_series("cyber_incidents", "incident_type", contains="phishing")
+            if len(phishing_time_series) > 0:
+                phishing_time_series = phishing_time_series.rename(columns={'bucket': 'Date', 'count': 'Phishing Incidents'}).set_index('Date')
                 st.line_chart(phishing_time_series, color="#ef4444", height=250)
             
 
             # Phishing by severity
             st.markdown("**Phishing Incidents by Severity:**")
-            phishing_severity = phishing_incidents['severity'].value_counts().reset_index()
-            phishing_severity.columns = ['Severity', 'Count']
-            st.bar_chart(phishing_severity.set_index('Severity'), color="#f97316")
+            phishing_severity = db.run_query(
+                Query("cyber_incidents")
+                .where("incident_type", "contains", "Phishing")
+                .group_by("severity", alias="Severity")
+                .aggregate("Count", "count")
+                .order_by("Count", descending=True),
+                snapshot=True, approximate=approximate
+            )
+            if phishing_severity.attrs.get("approximate"):
+                st.caption(sample_caption(phishing_severity))
+            st.bar_chart(phishing_severity.set_index('Severity')['Count'], color="#f97316")
         
         st.markdown("---")
         
         # Analysis 2: Response Bottleneck Analysis
         st.markdown("### ⏱️ Resolution Time & Bottleneck Analysis")
         
-        # Calculate days open (simulated - would need resolved_date in real scenario)
-        df_with_status = df_incidents.copy()
-        df_with_status['days_open'] = 0  # Placeholder - would calculate from dates
-        
         # Status analysis - identify bottlenecks
-        status_analysis = df_incidents.groupby('status').agg({
-            'id': 'count',
-            'severity': lambda x: (x.isin(['Critical', 'High']).sum())
-        }).reset_index()
-        status_analysis.columns = ['Status', 'Total Count', 'High/Critical Count']
-        status_analysis = status_analysis.sort_values('Total Count', ascending=False)
+        status_analysis = db.run_query(
+            Query("cyber_incidents")
+            .group_by("status", alias="Status")
+            .aggregate("Total Count", "count")
+            .aggregate("High/Critical Count", "count", where=("severity_code", ">=", 3))
+            .order_by("Total Count", descending=True),
+            snapshot=True, approximate=approximate
+        )
         
         st.markdown("**Incident Distribution by Status (Bottleneck Identification):**")
+        if status_analysis.attrs.get("approximate"):
+            st.caption(sample_caption(status_analysis))
         st.dataframe(status_analysis, width='stretch', hide_index=True)
         
+        # MTTR and percentiles from the status-transition log
+        st.markdown("**Time to Resolve by Threat Category (hours):**")
+        resolution_by_type = db.get_resolution_stats("cyber_incidents", "incident_type")
+        if len(resolution_by_type) > 0:
+            st.dataframe(resolution_by_type, width='stretch', hide_index=True)
+            st.dataframe(db.get_resolution_stats("cyber_incidents", "severity"), width='stretch', hide_index=True)
+        else:
+            st.info("No incidents have been resolved since status history started.")
+        
         # Find which threat category has longest resolution (unresolved)
         st.markdown("**Threat Categories with Most Unresolved Cases:**")
-        unresolved_by_type = df_incidents[df_incidents['status'].isin(['Open', 'In Progress'])].groupby('incident_type').agg({
-            'id': 'count',
-            'severity': lambda x: (x.isin(['Critical', 'High']).sum())
-        }).reset_index()
-        unresolved_by_type.columns = ['Incident Type', 'Unresolved Count', 'High/Critical']
-        unresolved_by_type = unresolved_by_type.sort_values('Unresolved Count', ascending=False)
+        unresolved_by_type = db.run_query(
+            Query("cyber_incidents")
+            .where("status_code", "in", [1, 2])  # Open, In Progress
+            .group_by("incident_type", alias="Incident Type")
+            .aggregate("Unresolved Count", "count")
+            .aggregate("High/Critical", "count", where=("severity_code", ">=", 3))
+            .order_by("Unresolved Count", descending=True),
+            snapshot=True, approximate=approximate
+        )
+        if unresolved_by_type.attrs.get("approximate"):
+            st.caption(sample_caption(unresolved_by_type))
         st.dataframe(unresolved_by_type, width='stretch', hide_index=True)
         
         if len(unresolved_by_type) > 0:
@@ -283,47 +296,46 @@ with tab4:
 # Tab 5: AI Assistant
 with tab5:
     
-    # Build context from current data with full details
-    if incidents:
-        severity_counts = {}
-        status_counts = {}
-        type_counts = {}
-        for inc in incidents:
-            sev = inc.get_severity()
-            stat = inc.get_status()
-            typ = inc.get_incident_type()
-            severity_counts[sev] = severity_counts.get(sev, 0) + 1
-            status_counts[stat] = status_counts.get(stat, 0) + 1
-            type_counts[typ] = type_counts.get(typ, 0) + 1
-        
-        # Include ALL incidents with full details - no limits
-        # Build detailed incident list for all incidents
+    # Build context from the KPIs, the counters and the most recent incidents
+    # (cached until the data changes). Bounded, so the prompt stays the same
+    # size however many incidents there are.
+    def build_data_context():
+        if summary["total"] == 0:
+            return "\nCURRENT DASHBOARD DATA: No incidents recorded yet.\n"
+
+        def breakdown(dimension):
+            counts = db.get_counts("cyber_incidents", dimension)
+            return ", ".join(f"{value}: {count}" for value, count in counts.itertuples(index=False))
+
+        # One page of the newest incidents with full details
+        recent, _ = db.get_incidents_page()
         detailed_list = "\n".join([
             f"""
-Incident ID: {inc.get_id()}
-Date: {inc.get_date()}
-Type: {inc.get_incident_type()}
-Severity: {inc.get_severity()}
-Status: {inc.get_status()}
-Description: {inc.get_description()}
+Incident ID: {inc_id}
+Date: {date}
+Type: {incident_type}
+Severity: {severity}
+Status: {status}
+Description: {description}
 ---"""
-            for inc in incidents
+            for inc_id, date, incident_type, severity, status, description in recent
         ])
-        
-        DATA_CONTEXT = f"""
+    
+        return f"""
 CURRENT DASHBOARD DATA:
-- Total Incidents: {len(incidents)}
-- By Severity: {severity_counts}
-- By Status: {status_counts}
-- By Type: {type_counts}
+- Total Incidents: {summary["total"]}
+- By Severity: {breakdown("severity")}
+- By Status: {breakdown("status")}
+- By Type: {breakdown("incident_type")}
+- Phishing: {summary["phishing"]} ({summary["unresolved_phishing"]} unresolved)
 
-DETAILED INCIDENT INFORMATION (with full descriptions and status):
+{len(recent)} MOST RECENT INCIDENTS (with full descriptions and status):
 {detailed_list}
 
-Note: You have access to complete details including incident IDs, dates, types, severity levels, current status, and full descriptions. Use this information to answer questions about specific incidents, their current state, and provide detailed analysis.
+Note: The totals and breakdowns above cover every incident; full details are included for the {len(recent)} most recent ones only. Use them to answer questions about specific incidents, and say so when an incident asked about is not in the list.
 """
-    else:
-        DATA_CONTEXT = "\nCURRENT DASHBOARD DATA: No incidents recorded yet.\n"
+
+    DATA_CONTEXT = db.cached("incidents_ai_context", build_data_context)
     
     # System prompt for AI
     SYSTEM_PROMPT = f"""You are a friendly cybersecurity expert assistant with access to detailed incident information.
@@ -337,7 +349,7 @@ Responsibilities:
 - Give actionable remediation recommendations based on incident details
 - When asked about a specific incident, provide its full details including status and description
 
-IMPORTANT: You have access to complete incident information including:
+IMPORTANT: For the most recent incidents you have:
 - Incident IDs (use these to reference specific incidents)
 - Current status (Open, In Progress, Resolved, Closed)
 - Full descriptions (use these to understand what happened)
@@ -8,7 +8,9 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from services.database_manager import DatabaseManager
 from services.ai_assistant import AIAssistant
-from models.dataset import Dataset
+from services.csv_importer import CSVImporter
+from services.paged_table import PagedTable
+from app.data.query_builder import Query
 
 # Page setup
 st.set_page_config(
@@ -71,35 +73,18 @@ if "logged_in" not in st.session_state or not st.session_state.logged_in:
 st.title("📊 Data Science Hub")
 st.caption("Centralized dataset management and analytics platform")
 
-# Load datasets using DatabaseManager and convert to Dataset objects
-rows = db.get_all_datasets()
-datasets = []
-for row in rows:
-    dataset = Dataset(
-        dataset_id=row[0],
-        name=row[1],
-        category=row[2],
-        source=row[3],
-        last_updated=row[4],
-        record_count=row[5] or 0,
-        file_size_mb=row[6] or 0.0
-    )
-    datasets.append(dataset)
-
-# Convert to DataFrame for display
-df_datasets = pd.DataFrame([ds.to_dict() for ds in datasets]) if datasets else pd.DataFrame()
-
-# Calculate metrics using objects
-total_records = sum(ds.get_record_count() for ds in datasets)
-total_size = sum(ds.get_file_size_mb() for ds in datasets)
-avg_size = total_size / len(datasets) if datasets else 0
-categories = set(ds.get_category() for ds in datasets)
+# Headline metrics from one aggregate query. The page never loads the whole
+# table: charts read the trigger-maintained counters, the table is paged
+summary = db.cached("dataset_summary", db.get_dataset_summary)
+total_records = summary["total_records"]
+total_size = summary["total_size_mb"]
+avg_size = summary["avg_size_mb"]
 
 # Display metrics in columns
 col1, col2, col3, col4 = st.columns(4)
 
 with col1:
-    st.metric("📁 Total Datasets", len(datasets))
+    st.metric("📁 Total Datasets", summary["total_datasets"])
 
 with col2:
     st.metric("📊 Total Records", f"{total_records:,}")
@@ -108,35 +93,26 @@ with col3:
     st.metric("💾 Storage Used", f"{total_size:.1f} MB")
 
 with col4:
-    st.metric("🏷️ Categories", len(categories))
+    st.metric("🏷️ Categories", summary["category_count"])
 
 # Create tabs for different sections
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["📋 View Data", "➕ Add Dataset", "📤 Upload CSV", "📊 Analytics & Insights", "🤖 AI Assistant"])
 
 # Tab 1: View Data
 with tab1:
-    if len(df_datasets) > 0:
+    if summary["total_datasets"] > 0:
         # Time-series chart: Dataset uploads over time
         st.subheader("📈 Dataset Registrations Over Time")
         
         # Prepare time-series data
-        df_datasets_copy = df_datasets.copy()
-        if "last_updated" in df_datasets_copy.columns:
-            df_datasets_copy['last_updated'] = pd.to_datetime(df_datasets_copy['last_updated'], errors='coerce')
-            df_datasets_copy = df_datasets_copy.dropna(subset=['last_updated'])
+        # Counts per day/week/month from the trigger-maintained rollups
+        time_series = db.get_time_series("datasets_metadata")
+        
+        if len(time_series) > 0:
+            time_series = time_series.rename(columns={'bucket': 'Date', 'count': 'Datasets'}).set_index('Date')
             
-            if len(df_datasets_copy) > 0:
-                # Group by date and count datasets
-                df_datasets_copy['date_only'] = df_datasets_copy['last_updated'].dt.date
-                time_series = df_datasets_copy.groupby('date_only').size().reset_index(name='count')
-                time_series.columns = ['Date', 'Datasets']
-                time_series = time_series.sort_values('Date')
-                time_series = time_series.set_index('Date')
-                
-                # Display line chart
-                st.line_chart(time_series, color="#3b82f6", height=300)
-            else:
-                st.info("⚠️ Date information unavailable for time-series analysis")
+            # Display line chart
+            st.line_chart(time_series, color="#3b82f6", height=300)
         else:
             st.info("⚠️ Date information unavailable for time-series analysis")
         
@@ -147,22 +123,27 @@ with tab1:
         
         with chart_col1:
             st.subheader("📊 Datasets by Category")
-            if "category" in df_datasets.columns:
-                cat_counts = df_datasets["category"].value_counts().reset_index()
-                cat_counts.columns = ["category", "count"]
-                st.bar_chart(cat_counts.set_index("category"), color="#3b82f6", height=250)
+            cat_counts = db.get_counts("datasets_metadata", "category")
+            st.bar_chart(cat_counts.set_index("category"), color="#3b82f6", height=250)
         
         with chart_col2:
             st.subheader("💾 Storage by Dataset (MB)")
-            if "file_size_mb" in df_datasets.columns and "dataset_name" in df_datasets.columns:
-                size_data = df_datasets[["dataset_name", "file_size_mb"]].sort_values("file_size_mb", ascending=False).head(8)
-                st.bar_chart(size_data.set_index("dataset_name"), color="#8b5cf6", height=250)
+            size_data = db.run_query(
+                Query("datasets_metadata")
+                .select("dataset_name", "file_size_mb")
+                .order_by("file_size_mb", descending=True)
+                .limit(8)
+            )
+            st.bar_chart(size_data.set_index("dataset_name"), color="#8b5cf6", height=250)
         
         st.markdown("---")
         
         # Data table
         st.subheader("📋 Dataset Inventory")
-        st.dataframe(df_datasets, width='stretch', height=300)
+        PagedTable(
+            "datasets_table", db.get_datasets_page,
+            ["id", "dataset_name", "category", "source", "last_updated", "record_count", "file_size_mb"]
+        ).render(height=300)
     else:
         st.info("🔍 No datasets registered yet. Add your first dataset!")
 
@@ -200,33 +181,30 @@ with tab3:
     
     uploaded_file = st.file_uploader("Choose CSV file", type="csv", key="dataset_upload")
     if uploaded_file:
-        new_df = pd.read_csv(uploaded_file)
-        st.dataframe(new_df.head(), width='stretch')
+        # Only the first rows are read for the preview
+        importer = CSVImporter(db)
+        st.dataframe(importer.preview(uploaded_file), width='stretch')
         
         if st.button("📥 Import Data"):
-            for _, row in new_df.iterrows():
-                db.insert_dataset(
-                    str(row.get('dataset_name', '')),
-                    str(row.get('category', '')),
-                    str(row.get('source', '')),
-                    str(row.get('last_updated', '')),
-                    int(row.get('record_count', 0)),
-                    float(row.get('file_size_mb', 0.0))
-                )
-            st.success(f"✅ Added {len(new_df)} datasets")
+            # Stream the file in chunks: one batched insert and commit per chunk
+            progress_bar = st.progress(0.0, text="Importing...")
+            imported = importer.import_datasets(
+                uploaded_file,
+                progress=lambda rows, fraction: progress_bar.progress(fraction, text=f"Imported {rows:,} rows")
+            )
+            st.success(f"✅ Added {imported} datasets")
             st.rerun()
 
 # Tab 4: Analytics & Insights
 with tab4:
     st.subheader("🎯 High-Value Data Governance Analysis")
     
-    if len(df_datasets) > 0:
+    if summary["total_datasets"] > 0:
         # Analysis 1: Resource Consumption Analysis
         st.markdown("### 💾 Storage Resource Consumption Analysis")
         
-        total_storage = sum(ds.get_file_size_mb() for ds in datasets)
-        total_records = sum(ds.get_record_count() for ds in datasets)
-        avg_storage = total_storage / len(datasets) if datasets else 0
+        total_storage = total_size
+        avg_storage = avg_size
         
         col1, col2, col3 = st.columns(3)
         with col1:
@@ -238,18 +216,19 @@ with tab4:
         
         # Storage by source (data source dependency)
         st.markdown("**Storage Consumption by Data Source:**")
-        if "source" in df_datasets.columns:
-            source_storage = df_datasets.groupby('source').agg({
-                'file_size_mb': 'sum',
-                'dataset_name': 'count'
-            }).reset_index()
-            source_storage.columns = ['Data Source', 'Total Storage (MB)', 'Dataset Count']
-            source_storage = source_storage.sort_values('Total Storage (MB)', ascending=False)
-            st.dataframe(source_storage, width='stretch', hide_index=True)
+        source_storage = db.run_query(
+            Query("datasets_metadata")
+            .group_by("source", alias="Data Source")
+            .aggregate("Total Storage (MB)", "sum", "file_size_mb")
+            .aggregate("Dataset Count", "count", "dataset_name")
+            .order_by("Total Storage (MB)", descending=True),
+            snapshot=True
+        )
+        st.dataframe(source_storage, width='stretch', hide_index=True)
             
-            # Visualise storage by source
-            if len(source_storage) > 0:
-                st.bar_chart(source_storage.set_index('Data Source')['Total Storage (MB)'], color="#3b82f6", height=300)
+        # Visualise storage by source
+        if len(source_storage) > 0:
+            st.bar_chart(source_storage.set_index('Data Source')['Total Storage (MB)'], color="#3b82f6", height=300)
         
         st.markdown("---")
         
@@ -257,72 +236,78 @@ with tab4:
         st.markdown("### 🔗 Data Source Dependency Analysis")
         
 
-        if "source" in df_datasets.columns:
-            source_dependency = df_datasets.groupby('source').agg({
-                'dataset_name': 'count',
-                'file_size_mb': 'sum',
-                'record_count': 'sum'
-            }).reset_index()
-            source_dependency.columns = ['Source', 'Datasets', 'Total Size (MB)', 'Total Records']
-            source_dependency = source_dependency.sort_values('Datasets', ascending=False)
+        source_dependency = db.run_query(
+            Query("datasets_metadata")
+            .group_by("source", alias="Source")
+            .aggregate("Datasets", "count", "dataset_name")
+            .aggregate("Total Size (MB)", "sum", "file_size_mb")
+            .aggregate("Total Records", "sum", "record_count")
+            .order_by("Datasets", descending=True),
+            snapshot=True
+        )
             
-            st.markdown("**Dependency Score = Number of datasets × Storage size × Record count**")
-            source_dependency['Dependency Score'] = (
-                source_dependency['Datasets'] * 
-                source_dependency['Total Size (MB)'] * 
-                (source_dependency['Total Records'] / 1000)  # Normalize
-            )
-            source_dependency = source_dependency.sort_values('Dependency Score', ascending=False)
-            st.dataframe(source_dependency, width='stretch', hide_index=True)
+        st.markdown("**Dependency Score = Number of datasets × Storage size × Record count**")
+        source_dependency['Dependency Score'] = (
+            source_dependency['Datasets'] * 
+            source_dependency['Total Size (MB)'] * 
+            (source_dependency['Total Records'] / 1000)  # Normalize
+        )
+        source_dependency = source_dependency.sort_values('Dependency Score', ascending=False)
+        st.dataframe(source_dependency, width='stretch', hide_index=True)
             
-            # Identify critical dependencies
-            critical_sources = source_dependency[source_dependency['Dependency Score'] > source_dependency['Dependency Score'].quantile(0.75)]
-            if len(critical_sources) > 0:
-                st.markdown("**⚠️ Critical Dependencies (Top 25% by dependency score):**")
-                for _, row in critical_sources.iterrows():
-                    st.markdown(f"- **{row['Source']}**: {int(row['Datasets'])} datasets, {row['Total Size (MB)']:.1f} MB")
+        # Identify critical dependencies
+        critical_sources = source_dependency[source_dependency['Dependency Score'] > source_dependency['Dependency Score'].quantile(0.75)]
+        if len(critical_sources) > 0:
+            st.markdown("**⚠️ Critical Dependencies (Top 25% by dependency score):**")
+            for _, row in critical_sources.iterrows():
+                st.markdown(f"- **{row['Source']}**: {int(row['Datasets'])} datasets, {row['Total Size (MB)']:.1f} MB")
     else:
         st.info("🔍 No datasets registered yet. Add datasets to see analytics insights.")
 
 # Tab 5: AI Assistant
 with tab5:
 
-    # Build context from current data with full details
-    if datasets:
-        category_counts = {}
-        for ds in datasets:
-            cat = ds.get_category()
-            category_counts[cat] = category_counts.get(cat, 0) + 1
-        
-        # Create detailed dataset information
+    # Build context from the KPIs, the counters and the most recent datasets
+    # (cached until the data changes). Bounded, so the prompt stays the same
+    # size however many datasets there are.
+    def build_data_context():
+        if summary["total_datasets"] == 0:
+            return "\nCURRENT DASHBOARD DATA: No datasets registered yet.\n"
+
+        category_counts = ", ".join(
+            f"{category}: {count}"
+            for category, count in db.get_counts("datasets_metadata", "category").itertuples(index=False)
+        )
+    
+        # One page of the newest datasets with full details
+        recent, _ = db.get_datasets_page()
         detailed_datasets = "\n".join([
             f"""
-Dataset ID: {ds.get_id()}
-Name: {ds.get_name()}
-Category: {ds.get_category()}
-Source: {ds.get_source()}
-Last Updated: {ds.get_last_updated()}
-Record Count: {ds.get_record_count():,}
-File Size: {ds.get_file_size_mb():.2f} MB
+Dataset ID: {ds_id}
+Name: {name}
+Category: {category}
+Source: {source}
+Last Updated: {last_updated}
+Record Count: {record_count:,}
+File Size: {file_size_mb:.2f} MB
 ---"""
-            for ds in datasets
+            for ds_id, name, category, source, last_updated, record_count, file_size_mb in recent
         ])
-        
-        DATA_CONTEXT = f"""
+    
+        return f"""
 CURRENT DASHBOARD DATA:
-- Total Datasets: {len(datasets)}
+- Total Datasets: {summary["total_datasets"]}
 - Total Records: {total_records:,}
 - Total Storage: {total_size:.1f} MB
 - By Category: {category_counts}
 
-DETAILED DATASET INFORMATION (with full details):
+{len(recent)} MOST RECENT DATASETS (with full details):
 {detailed_datasets}
 
-Note: You have access to complete dataset details including IDs, names, categories, sources, update dates, record counts, and file sizes. Use this information to answer questions about specific datasets and provide detailed analysis.
+Note: The totals and breakdowns above cover every dataset; full details are included for the {len(recent)} most recent ones only. Use them to answer questions about specific datasets, and say so when a dataset asked about is not in the list.
 """
-        
-    else:
-        DATA_CONTEXT = "\nCURRENT DASHBOARD DATA: No datasets registered yet.\n"
+
+    DATA_CONTEXT = db.cached("datasets_ai_context", build_data_context)
     
     # System prompt for AI
     SYSTEM_PROMPT = f"""You are a friendly data science expert assistant with access to detailed dataset information.
@@ -336,7 +321,7 @@ Responsibilities:
 - Explain data science concepts
 - When asked about a specific dataset, provide its full details including source, category, and size
 
-IMPORTANT: You have access to complete dataset information including:
+IMPORTANT: For the most recent datasets you have:
 - Dataset IDs (use these to reference specific datasets)
 - Names, categories, and sources
 - Last updated dates
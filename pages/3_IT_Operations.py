@@ -8,7 +8,10 @@ sys.path.insert(0, str(Path(__file__).parent.parent))
 
 from services.database_manager import DatabaseManager
 from services.ai_assistant import AIAssistant
-from models.it_ticket import ITTicket
+from services.csv_importer import CSVImporter
+from services.paged_table import PagedTable
+from app.data.query_builder import Query
+from app.data.sampling import proportion_interval, sample_caption
 
 # Page setup
 st.set_page_config(
@@ -75,28 +78,12 @@ st.title("💻 IT Operations Centre")
 st.caption("Streamlined ticket management and support tracking")
 
 
-# Load tickets using DatabaseManager and convert to ITTicket objects
-rows = db.get_all_tickets()
-tickets = []
-for row in rows:
-    ticket = ITTicket(
-        ticket_id=row[0],
-        date=row[1],
-        category=row[2],
-        priority=row[3],
-        status=row[4],
-        description=row[5],
-        assigned_to=row[6] or ""
-    )
-    tickets.append(ticket)
-
-# Convert to DataFrame for display
-df_tickets = pd.DataFrame([tkt.to_dict() for tkt in tickets]) if tickets else pd.DataFrame()
-
-# Calculate metrics using objects
-critical_count = sum(1 for tkt in tickets if tkt.get_priority().lower() == "critical")
-open_count = sum(1 for tkt in tickets if tkt.get_status().lower() == "open")
-resolved_count = sum(1 for tkt in tickets if tkt.get_status().lower() == "resolved")
+# Headline metrics from one aggregate query. The page never loads the whole
+# table: charts read the trigger-maintained counters, the table is paged
+summary = db.cached("ticket_summary", db.get_ticket_summary)
+critical_count = summary["critical"]
+open_count = summary["open"]
+resolved_count = summary["resolved"]
 
 
 # Display metrics in columns
@@ -112,7 +99,7 @@ with col3:
     st.metric("✅ Resolved", resolved_count)
 
 with col4:
-    st.metric("📊 Total Tickets", len(tickets))
+    st.metric("📊 Total Tickets", summary["total"])
 
 # Create tabs for different sections
 tab1, tab2, tab3, tab4, tab5 = st.tabs(["📋 View Data", "➕ Create Ticket", "📤 Upload CSV", "📊 Analytics & Insights", "🤖 AI Assistant"])
@@ -120,28 +107,19 @@ tab1, tab2, tab3, tab4, tab5 = st.tabs(["📋 View Data", "➕ Create Ticket", "
 
 # Tab 1: View Data
 with tab1:
-    if len(df_tickets) > 0:
+    if summary["total"] > 0:
         # Time-series chart: Tickets over time
         st.subheader("📈 Tickets Created Over Time")
         
         # Prepare time-series data
-        df_tickets_copy = df_tickets.copy()
-        if "date" in df_tickets_copy.columns:
-            df_tickets_copy['date'] = pd.to_datetime(df_tickets_copy['date'], errors='coerce')
-            df_tickets_copy = df_tickets_copy.dropna(subset=['date'])
+        # Counts per day/week/month from the trigger-maintained rollups
+        time_series = db.get_time_series("it_tickets")
+        
+        if len(time_series) > 0:
+            time_series = time_series.rename(columns={'bucket': 'Date', 'count': 'Tickets'}).set_index('Date')
             
-            if len(df_tickets_copy) > 0:
-                # Group by date and count tickets
-                df_tickets_copy['date_only'] = df_tickets_copy['date'].dt.date
-                time_series = df_tickets_copy.groupby('date_only').size().reset_index(name='count')
-                time_series.columns = ['Date', 'Tickets']
-                time_series = time_series.sort_values('Date')
-                time_series = time_series.set_index('Date')
-                
-                # Display line chart
-                st.line_chart(time_series, color="#10b981", height=300)
-            else:
-                st.info("⚠️ Date information unavailable for time-series analysis")
+            # Display line chart
+            st.line_chart(time_series, color="#10b981", height=300)
         else:
             st.info("⚠️ Date information unavailable for time-series analysis")
         
@@ -149,15 +127,25 @@ with tab1:
         
         # Bar chart: Tickets by Status
         st.subheader("📊 Tickets by Status")
-        status_counts = df_tickets["status"].value_counts().reset_index()
-        status_counts.columns = ["status", "count"]
+        # From aggregate_counts, in workflow order
+        status_counts = db.get_counts("it_tickets", "status")
         st.bar_chart(status_counts.set_index("status"), color="#10b981")
         
         st.markdown("---")
         
-        # Show data table
+        # Show data table, or full-text search results (best matches first)
         st.subheader("📋 All Tickets")
-        st.dataframe(df_tickets, width='stretch', height=350)
+        search_text = st.text_input("🔎 Search subjects and descriptions", key="ticket_search",
+                                    placeholder="e.g. printer offline")
+        if search_text:
+            results = db.search("it_tickets", search_text)
+            st.caption(f"{len(results)} best matches for '{search_text}'")
+            st.dataframe(results, width='stretch', hide_index=True, height=350)
+        else:
+            PagedTable(
+                "tickets_table", db.get_tickets_page,
+                ["id", "date", "category", "priority", "status", "description", "assigned_to"]
+            ).render(height=350)
     else:
         st.info("🔍 No tickets found. Create your first ticket!")
 
@@ -194,67 +182,92 @@ with tab3:
     
     uploaded_file = st.file_uploader("Choose CSV file", type="csv", key="ticket_upload")
     if uploaded_file:
-        new_df = pd.read_csv(uploaded_file)
-        st.dataframe(new_df.head(), width='stretch')
+        # Only the first rows are read for the preview
+        importer = CSVImporter(db)
+        st.dataframe(importer.preview(uploaded_file), width='stretch')
         
         if st.button("📥 Import Data"):
-            for _, row in new_df.iterrows():
-                db.insert_ticket(
-                    str(row.get('date', '')),
-                    str(row.get('category', '')),
-                    str(row.get('priority', '')),
-                    str(row.get('status', '')),
-                    str(row.get('description', '')),
-                    str(row.get('assigned_to', ''))
-                )
-            st.success(f"✅ Added {len(new_df)} tickets")
+            # Stream the file in chunks: one batched insert and commit per chunk
+            progress_bar = st.progress(0.0, text="Importing...")
+            imported = importer.import_tickets(
+                uploaded_file,
+                progress=lambda rows, fraction: progress_bar.progress(fraction, text=f"Imported {rows:,} rows")
+            )
+            st.success(f"✅ Added {imported} tickets")
             st.rerun()
 
 # Tab 4: Analytics & Insights
 with tab4:
     st.subheader("🎯 High-Value IT Operations Analysis")
+    approximate = st.toggle("⚡ Approximate mode", help="Estimate the breakdowns below from a sample "
+                            "of the tickets. Faster on very large tables; results marked ≈ are estimates.")
     
-    if len(df_tickets) > 0:
+    if summary["total"] > 0:
+        # Surges are flagged by triggers as tickets are written, so this is a small read
+        surge_alerts = db.get_surge_alerts("it_tickets")
+        for alert in surge_alerts.itertuples():
+            st.error(f"🚨 Surge: {alert.count} {alert.value} tickets on {alert.day} "
+                     f"(usually {alert.baseline_mean:.1f}/day, z = {alert.z_score})")
+        
         # Analysis 1: Staff Performance Analysis
         st.markdown("### 👥 Staff Performance & Workload Analysis")
         
-        if "assigned_to" in df_tickets.columns:
-            staff_analysis = df_tickets.groupby('assigned_to').agg({
-                'id': 'count',
-                'status': lambda x: (x.isin(['Open', 'In Progress']).sum())
-            }).reset_index()
-            staff_analysis.columns = ['Staff Member', 'Total Tickets', 'Open/In Progress']
-            staff_analysis = staff_analysis.sort_values('Total Tickets', ascending=False)
+        staff_analysis = db.run_query(
+            Query("it_tickets")
+            .group_by("assigned_to", alias="Staff Member")
+            .aggregate("Total Tickets", "count")
+            .aggregate("Open/In Progress", "count", where=("status_code", "in", [1, 2]))  # Open, In Progress
+            .order_by("Total Tickets", descending=True),
+            snapshot=True, approximate=approximate
+        )
             
-            # Calculate open ticket ratio
-            staff_analysis['Open Ratio %'] = (staff_analysis['Open/In Progress'] / staff_analysis['Total Tickets'] * 100).round(1)
-            staff_analysis = staff_analysis.sort_values('Open Ratio %', ascending=False)
+        # Calculate open ticket ratio
+        staff_analysis['Open Ratio %'] = (staff_analysis['Open/In Progress'] / staff_analysis['Total Tickets'] * 100).round(1)
+        if staff_analysis.attrs.get("approximate"):
+            fraction = staff_analysis.attrs['sample_fraction']
+            staff_analysis['Open Ratio % ±'] = proportion_interval(
+                staff_analysis['Open/In Progress'], staff_analysis['Total Tickets'], fraction).round(1)
+        staff_analysis = staff_analysis.sort_values('Open Ratio %', ascending=False)
             
-            st.markdown("**Ticket Distribution by Staff Member:**")
-            st.dataframe(staff_analysis, width='stretch', hide_index=True)
+        st.markdown("**Ticket Distribution by Staff Member:**")
+        if staff_analysis.attrs.get("approximate"):
+            st.caption(sample_caption(staff_analysis))
+        st.dataframe(staff_analysis, width='stretch', hide_index=True)
             
-            # Visualise staff workload
-            if len(staff_analysis) > 0:
-                st.markdown("**Staff Workload (Total Tickets):**")
-                st.bar_chart(staff_analysis.set_index('Staff Member')['Total Tickets'], color="#10b981", height=250)
+        # Visualise staff workload
+        if len(staff_analysis) > 0:
+            st.markdown("**Staff Workload (Total Tickets):**")
+            st.bar_chart(staff_analysis.set_index('Staff Member')['Total Tickets'], color="#10b981", height=250)
                 
-                st.markdown("**Open Ticket Ratio by Staff (Higher = More Backlog):**")
-                st.bar_chart(staff_analysis.set_index('Staff Member')['Open Ratio %'], color="#f59e0b", height=250)
-        
+            st.markdown("**Open Ticket Ratio by Staff (Higher = More Backlog):**")
+            st.bar_chart(staff_analysis.set_index('Staff Member')['Open Ratio %'], color="#f59e0b", height=250)
+
+        # Percentiles from the latency sketches (within 1%, no scan of ticket history)
+        staff_latency = db.get_latency_quantiles("assigned_to").rename(columns={'assigned_to': 'Staff Member'})
+        if len(staff_latency) > 0:
+            st.markdown("**Resolution Time Percentiles by Staff Member (hours):**")
+            st.dataframe(staff_latency, width='stretch', hide_index=True)
+            st.bar_chart(staff_latency.set_index('Staff Member')[['p50_hours', 'p90_hours', 'p99_hours']],
+                         height=250, stack=False)
+
         st.markdown("---")
         
         # Analysis 2: Process Stage Bottleneck Analysis
         st.markdown("### ⏳ Process Bottleneck & Resolution Analysis")
         
         # Status analysis - identify bottlenecks
-        status_bottleneck = df_tickets.groupby('status').agg({
-            'id': 'count',
-            'priority': lambda x: (x.isin(['Critical', 'High']).sum())
-        }).reset_index()
-        status_bottleneck.columns = ['Status', 'Ticket Count', 'Critical/High Priority']
-        status_bottleneck = status_bottleneck.sort_values('Ticket Count', ascending=False)
+        status_bottleneck = db.run_query(
+            Query("it_tickets")
+            .group_by("status", alias="Status")
+            .aggregate("Ticket Count", "count")
+            .aggregate("Critical/High Priority", "count", where=("priority_code", ">=", 3))
+            .order_by("Ticket Count", descending=True),
+            snapshot=True, approximate=approximate
+        )
         
         st.markdown("**Ticket Distribution by Status (Bottleneck Identification):**")
+        if status_bottleneck.attrs.get("approximate"):
+            st.caption(sample_caption(status_bottleneck))
         st.dataframe(status_bottleneck, width='stretch', hide_index=True)
         
         # Visualise status distribution
@@ -267,18 +280,37 @@ with tab4:
             (status_bottleneck['Ticket Count'] > 3)
         ]
         
+        # Time in status and resolution times from the status-transition log
+        st.markdown("**Average Time Spent in Each Status:**")
+        st.dataframe(db.get_time_in_status("it_tickets"), width='stretch', hide_index=True)
+        
+        st.markdown("**Resolution Time by Staff Member (hours):**")
+        resolution_by_staff = db.get_resolution_stats("it_tickets", "assigned_to")
+        if len(resolution_by_staff) > 0:
+            st.dataframe(resolution_by_staff, width='stretch', hide_index=True)
+        else:
+            st.info("No tickets have been resolved since status history started.")
+        
         st.markdown("---")
         
         # Analysis 3: Priority vs Resolution Analysis
         st.markdown("### 🎯 Priority Analysis")
         
-        priority_analysis = df_tickets.groupby('priority').agg({
-            'id': 'count',
-            'status': lambda x: (x.isin(['Open', 'In Progress']).sum())
-        }).reset_index()
-        priority_analysis.columns = ['Priority', 'Total Tickets', 'Unresolved']
+        priority_analysis = db.run_query(
+            Query("it_tickets")
+            .group_by("priority", alias="Priority")
+            .aggregate("Total Tickets", "count")
+            .aggregate("Unresolved", "count", where=("status_code", "in", [1, 2]))  # Open, In Progress
+            .aggregate("Level", "max", "priority_code")
+            .order_by("Level", descending=True),
+            snapshot=True, approximate=approximate
+        ).drop(columns="Level")
         priority_analysis['Resolution Rate %'] = ((priority_analysis['Total Tickets'] - priority_analysis['Unresolved']) / priority_analysis['Total Tickets'] * 100).round(1)
-        priority_analysis = priority_analysis.sort_values('Total Tickets', ascending=False)
+        if priority_analysis.attrs.get("approximate"):
+            st.caption(sample_caption(priority_analysis))
+            priority_analysis['Resolution Rate % ±'] = proportion_interval(
+                priority_analysis['Unresolved'], priority_analysis['Total Tickets'],
+                priority_analysis.attrs['sample_fraction']).round(1)
         
         st.dataframe(priority_analysis, width='stretch', hide_index=True)
     else:
@@ -286,49 +318,54 @@ with tab4:
 
 # Tab 5: AI Assistant
 with tab5:
-    # Build context from current data with full details
-    if tickets:
-        priority_counts = {}
-        status_counts = {}
-        category_counts = {}
-        for tkt in tickets:
-            pri = tkt.get_priority()
-            stat = tkt.get_status()
-            cat = tkt.get_category()
-            priority_counts[pri] = priority_counts.get(pri, 0) + 1
-            status_counts[stat] = status_counts.get(stat, 0) + 1
-            category_counts[cat] = category_counts.get(cat, 0) + 1
-        
-        # Include ALL tickets with full details
-        # Create detailed ticket information with full descriptions and status
+    # Build context from the KPIs, the counters and the most recent tickets
+    # (cached until the data changes). Bounded, so the prompt stays the same
+    # size however many tickets there are.
+    def build_data_context():
+        if summary["total"] == 0:
+            return "\nCURRENT DASHBOARD DATA: No tickets found yet.\n"
+
+        def breakdown(counts):
+            return ", ".join(f"{value}: {count}" for value, count in counts.itertuples(index=False))
+
+        category_counts = db.run_query(
+            Query("it_tickets")
+            .group_by("category")
+            .aggregate("count", "count")
+            .order_by("count", descending=True)
+        )
+    
+        # One page of the newest tickets with full details
+        recent, _ = db.get_tickets_page()
         detailed_tickets = "\n".join([
             f"""
-Ticket ID: {tkt.get_id()}
-Date: {tkt.get_date()}
-Category: {tkt.get_category()}
-Priority: {tkt.get_priority()}
-Status: {tkt.get_status()}
-Assigned To: {tkt.get_assigned_to() if tkt.get_assigned_to() else 'Unassigned'}
-Description: {tkt.get_description()}
+Ticket ID: {ticket_id}
+Date: {created_date}
+Category: {category}
+Priority: {priority}
+Status: {status}
+Assigned To: {assigned_to if assigned_to else 'Unassigned'}
+Description: {description}
 ---"""
-            for tkt in tickets
+            for ticket_id, created_date, category, priority, status, description, assigned_to in recent
         ])
-        
-        DATA_CONTEXT = f"""
+    
+        return f"""
 CURRENT DASHBOARD DATA:
-- Total Tickets: {len(tickets)}
+- Total Tickets: {summary["total"]}
 - Open Tickets: {open_count}
-- By Priority: {priority_counts}
-- By Status: {status_counts}
-- By Category: {category_counts}
+- Unassigned: {summary["unassigned"]}
+- By Priority: {breakdown(db.get_counts("it_tickets", "priority"))}
+- By Status: {breakdown(db.get_counts("it_tickets", "status"))}
+- By Category: {breakdown(category_counts)}
 
-DETAILED TICKET INFORMATION (with full descriptions and status):
+{len(recent)} MOST RECENT TICKETS (with full descriptions and status):
 {detailed_tickets}
 
-Note: You have access to complete ticket details including ticket IDs, dates, categories, priorities, current status, assignments, and full descriptions. Use this information to answer questions about specific tickets, their current state, and provide detailed troubleshooting assistance.
+Note: The totals and breakdowns above cover every ticket; full details are included for the {len(recent)} most recent ones only. Use them to answer questions about specific tickets, and say so when a ticket asked about is not in the list.
 """
-    else:
-        DATA_CONTEXT = "\nCURRENT DASHBOARD DATA: No tickets found yet.\n"
+
+    DATA_CONTEXT = db.cached("tickets_ai_context", build_data_context)
     
     # System prompt for AI
     SYSTEM_PROMPT = f"""You are a friendly IT support expert assistant with access to detailed ticket information.
@@ -342,7 +379,7 @@ Responsibilities:
 - Provide step-by-step solutions tailored to the specific ticket details
 - When asked about a specific ticket, provide its full details including status, description, and assignment
 
-IMPORTANT: You have access to complete ticket information including:
+IMPORTANT: For the most recent tickets you have:
 - Ticket IDs (use these to reference specific tickets)
 - Current status (Open, In Progress, Resolved, Closed)
 - Full descriptions (use these to understand the technical issue)
@@ -55,9 +55,5 @@ class AuthManager:
 
     def get_user(self, username: str) -> Optional[User]:
         """Get User object by username."""
-        row = self._db.get_user(username)
-        if row is None:
-            return None
-        role = row[2] if len(row) >= 3 else "user"
-        return User(row[0], row[1], role)
+        return self._db.get_user(username, row_factory=User.from_row)
 
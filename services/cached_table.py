@@ -0,0 +1,48 @@
+# CachedTable service class
+import threading
+import pandas as pd
+from typing import Any, Callable, List, Optional, Tuple, Type
+from models.column_set import ColumnSet
+
+# fetch_delta(since) -> (rows, deleted_ids, mark); each row is (id, *set columns)
+DeltaFetcher = Callable[[Any], Tuple[List[Tuple], List[int], Any]]
+
+
+class CachedTable:
+    """
+    In-memory copy of one table as a column-backed set (IncidentSet, ...).
+    refresh() fetches only the rows inserted, updated or deleted since the
+    last refresh and patches the set, instead of reloading the whole table.
+    The set's DataFrame is indexed by the table's id column.
+    """
+
+    def __init__(self, set_class: Type[ColumnSet]):
+        self._set_class = set_class
+        self._lock = threading.Lock()
+        self.mark: Optional[Any] = None
+        self.records: ColumnSet = set_class()
+
+    def refresh(self, fetch_delta: DeltaFetcher) -> "CachedTable":
+        """Apply the changes since the last refresh (everything on the first call)."""
+        with self._lock:
+            rows, deleted_ids, mark = fetch_delta(self.mark)
+            if rows or deleted_ids:
+                self._patch(rows, deleted_ids)
+            self.mark = mark
+        return self
+
+    def _patch(self, rows: List[Tuple], deleted_ids: List[int]) -> None:
+        """Replace changed rows, append new ones and drop deleted ones."""
+        changed_ids = [row[0] for row in rows]
+        frame = self.records.to_dataframe()
+        updated = len(frame) > 0 and bool(frame.index.isin(changed_ids).any())
+
+        # A new set object, so a rerun still reading the old one is unaffected
+        frame = frame.drop(index=changed_ids + list(deleted_ids), errors="ignore")
+        if rows:
+            changed = self._set_class.from_rows([row[1:] for row in rows], index=changed_ids)
+            frame = pd.concat([frame, changed.to_dataframe()]) if len(frame) > 0 else changed.to_dataframe()
+            if updated:
+                frame = frame.sort_index()
+        # Rows from the delta may bring new categories, so dtypes are reapplied
+        self.records = self._set_class.from_frame(frame)
@@ -0,0 +1,94 @@
+# CSVImporter service class
+import pandas as pd
+from typing import IO, Callable, Dict, List, Optional, Union
+from services.database_manager import DatabaseManager
+
+# progress(rows_imported, fraction_of_file_read)
+ProgressCallback = Callable[[int, float], None]
+
+
+class CSVImporter:
+    """Streams an uploaded CSV into the database in fixed-size chunks."""
+
+    # Target columns for each domain (the order the insert_*_many methods expect)
+    INCIDENT_COLUMNS = ["date", "incident_type", "severity", "status", "description"]
+    TICKET_COLUMNS = ["date", "category", "priority", "status", "description", "assigned_to"]
+    DATASET_COLUMNS = ["dataset_name", "category", "source", "last_updated", "record_count", "file_size_mb"]
+
+    # Alternative header names accepted on upload (e.g. the files in DATA/)
+    INCIDENT_ALIASES = {"timestamp": "date", "category": "incident_type"}
+    TICKET_ALIASES = {"created_at": "date", "created_date": "date"}
+    DATASET_ALIASES = {"name": "dataset_name", "rows": "record_count",
+                       "uploaded_by": "source", "upload_date": "last_updated"}
+
+    def __init__(self, db: DatabaseManager, chunk_size: int = 50_000):
+        self._db = db
+        self._chunk_size = chunk_size
+
+    @staticmethod
+    def preview(source: IO, rows: int = 5) -> pd.DataFrame:
+        """Read the first few rows for display, then rewind the upload."""
+        df = pd.read_csv(source, nrows=rows)
+        source.seek(0)
+        return df
+
+    def import_incidents(self, source: Union[str, IO],
+                         progress: Optional[ProgressCallback] = None) -> int:
+        """Import an incidents CSV. Returns the number of rows inserted."""
+        return self._import(source, self.INCIDENT_COLUMNS, self.INCIDENT_ALIASES,
+                            self._db.insert_incidents_many, progress)
+
+    def import_tickets(self, source: Union[str, IO],
+                       progress: Optional[ProgressCallback] = None) -> int:
+        """Import a tickets CSV. Returns the number of rows inserted."""
+        return self._import(source, self.TICKET_COLUMNS, self.TICKET_ALIASES,
+                            self._db.insert_tickets_many, progress)
+
+    def import_datasets(self, source: Union[str, IO],
+                        progress: Optional[ProgressCallback] = None) -> int:
+        """Import a datasets CSV. Returns the number of rows inserted."""
+        return self._import(source, self.DATASET_COLUMNS, self.DATASET_ALIASES,
+                            self._db.insert_datasets_many, progress,
+                            numeric={"record_count": int, "file_size_mb": float})
+
+    def _import(self, source, columns: List[str], aliases: Dict[str, str],
+                insert_many: Callable[[pd.DataFrame], int],
+                progress: Optional[ProgressCallback],
+                numeric: Optional[Dict[str, type]] = None) -> int:
+        """Read, normalise and insert the file one chunk at a time."""
+        total_size = getattr(source, "size", None)
+        imported = 0
+
+        # dtype=str keeps pandas from guessing types chunk by chunk
+        for chunk in pd.read_csv(source, chunksize=self._chunk_size, dtype=str,
+                                 keep_default_na=False):
+            chunk = self._normalise(chunk, columns, aliases, numeric or {})
+
+            # One commit per chunk; the derived tables are updated once per chunk (app.data.bulk)
+            imported += insert_many(chunk)
+
+            if progress is not None:
+                fraction = min(source.tell() / total_size, 1.0) if total_size else 0.0
+                progress(imported, fraction)
+
+        if progress is not None:
+            progress(imported, 1.0)
+        return imported
+
+    @staticmethod
+    def _normalise(chunk: pd.DataFrame, columns: List[str], aliases: Dict[str, str],
+                   numeric: Dict[str, type]) -> pd.DataFrame:
+        """Map headers onto the target columns with whole-column operations."""
+        chunk.columns = chunk.columns.str.strip().str.lower()
+
+        # Only use an alias when the real column isn't there already
+        renames = {}
+        for old, new in aliases.items():
+            if old in chunk.columns and new not in chunk.columns and new not in renames.values():
+                renames[old] = new
+        chunk = chunk.rename(columns=renames).reindex(columns=columns, fill_value="")
+
+        for col, kind in numeric.items():
+            chunk[col] = pd.to_numeric(chunk[col], errors="coerce").fillna(0).astype(kind)
+
+        return chunk
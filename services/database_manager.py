@@ -1,20 +1,49 @@
 # DatabaseManager service class
 import sqlite3
+import pandas as pd
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Any, List, Tuple, Optional
+from typing import Any, Callable, Dict, Iterable, List, Tuple, Optional
+from app.data.db import apply_connection_profile, iter_param_rows
+from app.data.schema import migrate
+from app.data.incidents import get_incident_summary
+from app.data.tickets import get_ticket_summary
+from app.data.dataset import get_dataset_summary
+from app.data.summary import get_platform_summary
+from app.data.pagination import fetch_page, PAGE_SIZE
+from app.data.bulk import insert_batch
+from app.data.delta import fetch_delta
+from app.data.enums import ENUM_COLUMNS, categorical_dtype, normalize_label, normalize_rows
+from app.data.aggregates import read_counts
+from app.data.query_builder import Query
+from app.data.cache import get_cache
+from app.data.snapshots import snapshots_available, snapshot_dir_for, refresh_snapshot, read_snapshot
+from app.data.rollups import read_time_series
+from app.data.transitions import get_resolution_stats, get_time_in_status
+from app.data.sketches import get_latency_quantiles
+from app.data.sampling import run_sampled
+from app.data.search import search, SEARCH_LIMIT
+from app.data.surges import get_active_alerts
 
 class DatabaseManager:
     """Handles SQLite database connections and queries."""
 
-    def __init__(self, db_path: str = "DATA/intelligence_platform.db"):
+    def __init__(self, db_path: str = "DATA/intelligence_platform.db",
+                 read_only: bool = False, profile: Optional[Dict[str, Any]] = None):
         self._db_path = db_path
+        self._read_only = read_only
+        self._profile = profile
         self._connection: Optional[sqlite3.Connection] = None
+        self._transaction_depth = 0
 
     def connect(self) -> None:
-        """Establish database connection."""
+        """Establish database connection with the shared PRAGMA profile."""
         if self._connection is None:
             self._connection = sqlite3.connect(self._db_path, check_same_thread=False)
-            print(f"Connected to database at: {self._db_path}")
+            apply_connection_profile(self._connection, self._read_only, self._profile)
+            if not self._read_only:
+                # One PRAGMA read when the schema is already current
+                migrate(self._connection)
 
     def close(self) -> None:
         """Close database connection."""
@@ -22,51 +51,335 @@ class DatabaseManager:
             self._connection.close()
             self._connection = None
 
+    @contextmanager
+    def transaction(self):
+        """
+        Run a block of queries in one transaction on this connection.
+        Reads inside share one snapshot; writes are committed once at the end
+        (rolled back if the block raises). Nested blocks join the outer one.
+        """
+        if self._connection is None:
+            self.connect()
+        if self._transaction_depth == 0:
+            if self._connection.in_transaction:
+                self._connection.commit()
+            self._connection.execute("BEGIN")
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._connection.rollback()
+            raise
+        else:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self._connection.commit()
+
     def execute_query(self, sql: str, params: Tuple = ()) -> sqlite3.Cursor:
         """Execute a write query (INSERT, UPDATE, DELETE)."""
         if self._connection is None:
             self.connect()
         cur = self._connection.cursor()
         cur.execute(sql, params)
-        self._connection.commit()
+        # Inside transaction() the commit happens once at the end of the block
+        if self._transaction_depth == 0:
+            self._connection.commit()
         return cur
 
-    def fetch_one(self, sql: str, params: Tuple = ()) -> Optional[Tuple]:
-        """Fetch a single row from database."""
+    def execute_many(self, sql: str, rows: Iterable) -> int:
+        """Execute one write query for many parameter rows in one transaction."""
+        with self.transaction():
+            cur = self._connection.cursor()
+            cur.executemany(sql, rows)
+        return cur.rowcount
+
+    def insert_batch(self, table: str, columns: List[str], rows: Iterable) -> int:
+        """
+        Insert many parameter rows (in the order of columns) into table in one
+        transaction. Large batches update the trigger-maintained tables with
+        one grouped statement each afterwards instead of per row (see app.data.bulk).
+        """
+        with self.transaction():
+            return insert_batch(self._connection, table, columns, rows)
+
+    def fetch_one(self, sql: str, params: Tuple = (),
+                  row_factory: Optional[Callable] = None) -> Optional[Any]:
+        """
+        Fetch a single row from database.
+        row_factory(cursor, row) maps each row, e.g. SecurityIncident.from_row.
+        """
         if self._connection is None:
             self.connect()
         cur = self._connection.cursor()
+        if row_factory is not None:
+            cur.row_factory = row_factory
         cur.execute(sql, params)
         return cur.fetchone()
 
-    def fetch_all(self, sql: str, params: Tuple = ()) -> List[Tuple]:
-        """Fetch all rows from database."""
+    def fetch_all(self, sql: str, params: Tuple = (),
+                  row_factory: Optional[Callable] = None) -> List[Any]:
+        """
+        Fetch all rows from database.
+        row_factory(cursor, row) maps each row, e.g. SecurityIncident.from_row.
+        """
         if self._connection is None:
             self.connect()
         cur = self._connection.cursor()
+        if row_factory is not None:
+            cur.row_factory = row_factory
         cur.execute(sql, params)
         return cur.fetchall()
 
+    # Summary methods (one aggregate query per domain)
+    def _conn(self) -> sqlite3.Connection:
+        """Return the open connection, connecting first if needed."""
+        if self._connection is None:
+            self.connect()
+        return self._connection
+
+    def get_incident_summary(self) -> Dict[str, Any]:
+        """Get the incident KPIs (totals by severity/status, phishing counts)."""
+        return get_incident_summary(conn=self._conn())
+
+    def get_ticket_summary(self) -> Dict[str, Any]:
+        """Get the ticket KPIs (totals by priority/status, unassigned)."""
+        return get_ticket_summary(conn=self._conn())
+
+    def get_dataset_summary(self) -> Dict[str, Any]:
+        """Get the dataset KPIs (counts, records, storage, categories)."""
+        return get_dataset_summary(conn=self._conn())
+
+    def get_platform_summary(self) -> Dict[str, Dict[str, Any]]:
+        """Get the KPIs for all three domains from one snapshot."""
+        with self.transaction():
+            return get_platform_summary(conn=self._conn())
+
+    def run_query(self, query: Query, cache: bool = True, snapshot: bool = False,
+                  approximate: bool = False) -> pd.DataFrame:
+        """
+        Run a query-builder Query and return a DataFrame.
+        snapshot=True runs it on the table's Arrow snapshot instead of SQLite,
+        reading only the columns it uses (SQLite is used if pyarrow is missing).
+        approximate=True estimates it from a sample of a large table, with
+        confidence intervals (see app.data.sampling); df.attrs["approximate"]
+        says whether it was. It takes precedence over snapshot.
+        """
+        def run():
+            if approximate:
+                return run_sampled(query, self._conn())
+            if snapshot and snapshots_available():
+                return query.fetch_arrow(self.read_snapshot(query.table, query.columns_used()))
+            return query.fetch_df(conn=self._conn())
+
+        if not cache:
+            return run()
+        sql, params = query.to_sql()
+        return self.cached(("query", snapshot, approximate, sql, tuple(params)), run)
+
+    def read_snapshot(self, table: str, columns: Optional[List[str]] = None) -> Any:
+        """
+        Get a memory-mapped Arrow snapshot of a table (optionally only some columns).
+        The snapshot is refreshed with the changed rows first if the database changed.
+        Returns None when pyarrow isn't installed.
+        """
+        if not snapshots_available():
+            return None
+        # Each database file has its own snapshot folder
+        snapshot_dir = snapshot_dir_for(self._db_path)
+        self.cached(("snapshot", table),
+                    lambda: refresh_snapshot(table, conn=self._conn(), snapshot_dir=snapshot_dir))
+        snapshot = read_snapshot(table, columns, snapshot_dir, conn=self._conn())
+        if snapshot is None:
+            # Written from another database at this path (recreated or swapped): rebuild it
+            refresh_snapshot(table, conn=self._conn(), snapshot_dir=snapshot_dir)
+            snapshot = read_snapshot(table, columns, snapshot_dir, conn=self._conn())
+        return snapshot
+
+    def get_counts(self, table: str, dimension: str) -> pd.DataFrame:
+        """
+        Get the row count per value of a column from the trigger-maintained
+        aggregate_counts, as [dimension, 'count'] (see app.data.aggregates).
+        Enum columns (severity, priority, status) come in level order, others largest first.
+        """
+        def compute():
+            counts = read_counts(self._conn(), table, dimension)
+            domain = ENUM_COLUMNS.get(table, {}).get(dimension)
+            if domain is not None:
+                counts[dimension] = counts[dimension].astype(categorical_dtype(domain, counts[dimension]))
+                counts = counts.sort_values(dimension, ignore_index=True)
+            return counts
+
+        return self.cached(("counts", table, dimension), compute)
+
+    def get_time_series(self, table: str, dimension: str = "*", value: Optional[str] = None,
+                        start: Any = None, end: Any = None, grain: Optional[str] = None,
+                        contains: Optional[str] = None) -> pd.DataFrame:
+        """
+        Get row counts per day/week/month bucket from the time-series rollups.
+        Returns ['bucket', 'count'] with at most rollups.MAX_POINTS rows unless grain is given.
+        See app.data.rollups.read_time_series for the arguments.
+        """
+        return self.cached(
+            ("time_series", table, dimension, value, start, end, grain, contains),
+            lambda: read_time_series(self._conn(), table, dimension, value, start, end, grain,
+                                     contains=contains)
+        )
+
+    def get_resolution_stats(self, table: str, dimension: Optional[str] = None) -> pd.DataFrame:
+        """
+        Get MTTR and p50/p90 resolution hours from the status-transition log,
+        per value of dimension or overall (see app.data.transitions).
+        """
+        return self.cached(
+            ("resolution_stats", table, dimension),
+            lambda: get_resolution_stats(table, dimension, conn=self._conn())
+        )
+
+    def get_time_in_status(self, table: str) -> pd.DataFrame:
+        """Get the average and total hours spent in each status."""
+        return self.cached(("time_in_status", table), lambda: get_time_in_status(table, conn=self._conn()))
+
+    def get_latency_quantiles(self, dimension: Optional[str] = None, values: Optional[Iterable[str]] = None,
+                              merge: bool = False) -> pd.DataFrame:
+        """
+        Get p50/p90/p99 ticket resolution hours from the latency sketches,
+        per value of dimension or overall (see app.data.sketches).
+        """
+        values = tuple(values) if values is not None else None
+        return self.cached(
+            ("latency_quantiles", dimension, values, merge),
+            lambda: get_latency_quantiles("it_tickets", dimension, values, merge, conn=self._conn())
+        )
+
+    def search(self, table: str, text: str, limit: int = SEARCH_LIMIT) -> pd.DataFrame:
+        """
+        Full-text search of incident descriptions or ticket subjects/descriptions,
+        best matches first (see app.data.search).
+        """
+        return self.cached(("search", table, text, limit), lambda: search(table, text, limit, conn=self._conn()))
+
+    def get_surge_alerts(self, table: Optional[str] = None) -> pd.DataFrame:
+        """
+        Get the active surge alerts (incident types / ticket categories with
+        an unusual number of events on their latest days), strongest first.
+        Flagged by triggers as rows are written; see app.data.surges.
+        """
+        return self.cached(("surge_alerts", table), lambda: get_active_alerts(table, conn=self._conn()))
+
+    # Result cache (shared by every page, reused until the database changes)
+    def cached(self, key: Any, compute: Callable[[], Any],
+               update: Optional[Callable[[Any], Any]] = None) -> Any:
+        """
+        Return compute()'s result from the cache, recomputing after any write.
+        DataFrames are returned as copies, so callers may change them.
+        With update, a stale value is passed to update(old) instead of recomputing.
+        """
+        if self._transaction_depth:
+            # Uncommitted writes in this transaction aren't visible to the cache
+            return compute()
+        value = get_cache(self._db_path).get_or_compute(key, compute, update)
+        # Pages add columns to the frames they get; hand out a copy so the
+        # cached one stays as it was computed
+        return value.copy() if isinstance(value, pd.DataFrame) else value
+
+    def cache_stats(self) -> Dict[str, Any]:
+        """Get the cache hit/miss counters and hit ratio."""
+        return get_cache(self._db_path).stats()
+
     # Incident methods
-    def get_all_incidents(self) -> List[Tuple]:
-        """Get all security incidents."""
+    def get_all_incidents(self, row_factory: Optional[Callable] = None) -> List[Any]:
+        """Get all security incidents. Pass row_factory (e.g. the model's from_row) to get objects."""
         return self.fetch_all(
-            "SELECT id, date, incident_type, severity, status, description FROM cyber_incidents"
+            "SELECT id, date, incident_type, severity, status, description FROM cyber_incidents",
+            row_factory=row_factory
+        )
+
+    def get_incidents_page(self, cursor: Any = None, page_size: int = PAGE_SIZE,
+                           order_by_date: bool = False) -> Tuple[List[Tuple], Any]:
+        """
+        Get one page of incidents (same columns as get_all_incidents), newest first.
+        Returns (rows, next_cursor); pass next_cursor back for the next page.
+        """
+        return fetch_page(
+            self._conn(), "cyber_incidents",
+            ["id", "date", "incident_type", "severity", "status", "description"],
+            sort_column="date" if order_by_date else None,
+            cursor=cursor, page_size=page_size
+        )
+
+    def get_incidents_delta(self, since: Any = None) -> Tuple[List[Tuple], List[int], Any]:
+        """
+        Get the incidents inserted, updated or deleted since a high-water mark.
+        Rows are (id, *get_all_incidents columns, epoch timestamp). since=None returns every row.
+        Returns (rows, deleted_ids, mark); pass mark back in as since next time.
+        """
+        return fetch_delta(
+            self._conn(), "cyber_incidents",
+            ["id", "id", "date", "incident_type", "severity", "status", "description", "date_ts"],
+            since=since
         )
 
     def insert_incident(self, date: str, incident_type: str, severity: str, 
                        status: str, description: str) -> None:
         """Insert a new incident."""
+        severity = normalize_label("severity_levels", severity)
+        status = normalize_label("incident_statuses", status)
         self.execute_query(
             "INSERT INTO cyber_incidents (date, incident_type, severity, status, description) VALUES (?, ?, ?, ?, ?)",
             (date, incident_type, severity, status, description)
         )
 
+    def insert_incidents_many(self, rows: Iterable) -> int:
+        """
+        Insert many incidents in one transaction.
+        rows: DataFrame or iterable of dicts/tuples with
+        (date, incident_type, severity, status, description). Returns the row count.
+        """
+        columns = ["date", "incident_type", "severity", "status", "description"]
+        return self.insert_batch(
+            "cyber_incidents", columns,
+            normalize_rows(iter_param_rows(rows, columns), columns, "cyber_incidents")
+        )
+
+    def update_incident_status(self, incident_id: int, status: str) -> bool:
+        """Change an incident's status (logged in status_transitions). Returns False if not found."""
+        status = normalize_label("incident_statuses", status)
+        cur = self.execute_query("UPDATE cyber_incidents SET status = ? WHERE id = ?", (status, incident_id))
+        return cur.rowcount > 0
+
     # Dataset methods
-    def get_all_datasets(self) -> List[Tuple]:
-        """Get all datasets."""
+    def get_all_datasets(self, row_factory: Optional[Callable] = None) -> List[Any]:
+        """Get all datasets. Pass row_factory (e.g. the model's from_row) to get objects."""
         return self.fetch_all(
-            "SELECT id, dataset_name, category, source, last_updated, record_count, file_size_mb FROM datasets_metadata"
+            "SELECT id, dataset_name, category, source, last_updated, record_count, file_size_mb FROM datasets_metadata",
+            row_factory=row_factory
+        )
+
+    def get_datasets_page(self, cursor: Any = None,
+                          page_size: int = PAGE_SIZE) -> Tuple[List[Tuple], Any]:
+        """
+        Get one page of datasets (same columns as get_all_datasets), newest first.
+        Returns (rows, next_cursor); pass next_cursor back for the next page.
+        """
+        return fetch_page(
+            self._conn(), "datasets_metadata",
+            ["id", "dataset_name", "category", "source", "last_updated", "record_count", "file_size_mb"],
+            cursor=cursor, page_size=page_size
+        )
+
+    def get_datasets_delta(self, since: Any = None) -> Tuple[List[Tuple], List[int], Any]:
+        """
+        Get the datasets inserted, updated or deleted since a high-water mark.
+        Rows are (id, *get_all_datasets columns, epoch timestamp). since=None returns every row.
+        Returns (rows, deleted_ids, mark); pass mark back in as since next time.
+        """
+        return fetch_delta(
+            self._conn(), "datasets_metadata",
+            ["id", "id", "dataset_name", "category", "source", "last_updated", "record_count", "file_size_mb",
+             "last_updated_ts"],
+            since=since
         )
 
     def insert_dataset(self, name: str, category: str, source: str, 
@@ -77,11 +390,51 @@ class DatabaseManager:
             (name, category, source, last_updated, record_count, file_size_mb)
         )
 
+    def insert_datasets_many(self, rows: Iterable) -> int:
+        """
+        Insert many datasets in one transaction.
+        rows: DataFrame or iterable of dicts/tuples with
+        (dataset_name, category, source, last_updated, record_count, file_size_mb).
+        Returns the row count.
+        """
+        columns = ["dataset_name", "category", "source", "last_updated", "record_count", "file_size_mb"]
+        return self.insert_batch(
+            "datasets_metadata", columns,
+            iter_param_rows(rows, columns)
+        )
+
     # Ticket methods
-    def get_all_tickets(self) -> List[Tuple]:
-        """Get all IT tickets."""
+    def get_all_tickets(self, row_factory: Optional[Callable] = None) -> List[Any]:
+        """Get all IT tickets. Pass row_factory (e.g. the model's from_row) to get objects."""
         return self.fetch_all(
-            "SELECT ticket_id, created_date, category, priority, status, description, assigned_to FROM it_tickets"
+            "SELECT ticket_id, created_date, category, priority, status, description, assigned_to FROM it_tickets",
+            row_factory=row_factory
+        )
+
+    def get_tickets_page(self, cursor: Any = None, page_size: int = PAGE_SIZE,
+                         order_by_date: bool = False) -> Tuple[List[Tuple], Any]:
+        """
+        Get one page of tickets (same columns as get_all_tickets), newest first.
+        Returns (rows, next_cursor); pass next_cursor back for the next page.
+        """
+        return fetch_page(
+            self._conn(), "it_tickets",
+            ["ticket_id", "created_date", "category", "priority", "status", "description", "assigned_to"],
+            sort_column="created_date" if order_by_date else None,
+            cursor=cursor, page_size=page_size
+        )
+
+    def get_tickets_delta(self, since: Any = None) -> Tuple[List[Tuple], List[int], Any]:
+        """
+        Get the tickets inserted, updated or deleted since a high-water mark.
+        Rows are (id, *get_all_tickets columns, epoch timestamp). since=None returns every row.
+        Returns (rows, deleted_ids, mark); pass mark back in as since next time.
+        """
+        return fetch_delta(
+            self._conn(), "it_tickets",
+            ["id", "ticket_id", "created_date", "category", "priority", "status", "description", "assigned_to",
+             "created_ts"],
+            since=since
         )
 
     def insert_ticket(self, date: str, category: str, priority: str, 
@@ -90,17 +443,49 @@ class DatabaseManager:
         # Generate a unique ticket_id if needed
         import uuid
         ticket_id = f"TICKET-{uuid.uuid4().hex[:8].upper()}"
+        priority = normalize_label("priority_levels", priority)
+        status = normalize_label("ticket_statuses", status)
         self.execute_query(
             "INSERT INTO it_tickets (ticket_id, created_date, category, priority, status, subject, description, assigned_to) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
             (ticket_id, date, category, priority, status, description[:100] if description else "", description, assigned_to)
         )
 
+    def insert_tickets_many(self, rows: Iterable) -> int:
+        """
+        Insert many tickets in one transaction.
+        rows: DataFrame or iterable of dicts/tuples with
+        (date, category, priority, status, description, assigned_to).
+        Ticket IDs and subjects are generated the same way as insert_ticket.
+        Returns the row count.
+        """
+        import uuid
+        columns = ["date", "category", "priority", "status", "description", "assigned_to"]
+
+        def with_ids():
+            params = normalize_rows(iter_param_rows(rows, columns), columns, "it_tickets")
+            for date, category, priority, status, description, assigned_to in params:
+                ticket_id = f"TICKET-{uuid.uuid4().hex[:8].upper()}"
+                subject = description[:100] if description else ""
+                yield (ticket_id, date, category, priority, status, subject, description, assigned_to)
+
+        return self.insert_batch(
+            "it_tickets",
+            ["ticket_id", "created_date", "category", "priority", "status", "subject", "description", "assigned_to"],
+            with_ids()
+        )
+
+    def update_ticket_status(self, ticket_id: str, status: str) -> bool:
+        """Change a ticket's status (logged in status_transitions). Returns False if not found."""
+        status = normalize_label("ticket_statuses", status)
+        cur = self.execute_query("UPDATE it_tickets SET status = ? WHERE ticket_id = ?", (status, ticket_id))
+        return cur.rowcount > 0
+
     # User methods
-    def get_user(self, username: str) -> Optional[Tuple]:
-        """Get user by username. Returns (username, password_hash, role)."""
+    def get_user(self, username: str, row_factory: Optional[Callable] = None) -> Optional[Any]:
+        """Get user by username. Returns (username, password_hash, role), or row_factory's object."""
         return self.fetch_one(
             "SELECT username, password_hash, role FROM users WHERE username = ?",
-            (username,)
+            (username,), row_factory=row_factory
         )
 
     def insert_user(self, username: str, password_hash: str) -> None:
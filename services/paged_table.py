@@ -0,0 +1,48 @@
+# PagedTable UI helper
+import streamlit as st
+import pandas as pd
+from typing import Any, Callable, List, Tuple
+
+# fetch_page(cursor, page_size) -> (rows, next_cursor)
+PageFetcher = Callable[[Any, int], Tuple[List[Tuple], Any]]
+
+
+class PagedTable:
+    """Streamlit table that only fetches the rows on the visible page."""
+
+    PAGE_SIZES = [25, 50, 100, 250]
+
+    def __init__(self, key: str, fetch_page: PageFetcher, columns: List[str]):
+        self._key = key
+        self._fetch_page = fetch_page
+        self._columns = columns
+
+        # Cursors of the pages visited so far, so "Previous" needs no query maths
+        if f"{key}_cursors" not in st.session_state:
+            st.session_state[f"{key}_cursors"] = [None]
+
+    def reset(self) -> None:
+        """Go back to the first page."""
+        st.session_state[f"{self._key}_cursors"] = [None]
+
+    def render(self, height: int = 350) -> None:
+        """Draw the current page with page-size and navigation controls."""
+        cursors = st.session_state[f"{self._key}_cursors"]
+
+        page_size = st.selectbox("Rows per page", self.PAGE_SIZES, index=1,
+                                 key=f"{self._key}_page_size", on_change=self.reset)
+
+        rows, next_cursor = self._fetch_page(cursors[-1], page_size)
+        st.dataframe(pd.DataFrame(rows, columns=self._columns), width='stretch', height=height)
+
+        col_prev, col_page, col_next = st.columns([1, 2, 1])
+        with col_prev:
+            if st.button("⬅️ Previous", key=f"{self._key}_prev", disabled=len(cursors) == 1):
+                cursors.pop()
+                st.rerun()
+        with col_page:
+            st.caption(f"Page {len(cursors)}")
+        with col_next:
+            if st.button("Next ➡️", key=f"{self._key}_next", disabled=next_cursor is None):
+                cursors.append(next_cursor)
+                st.rerun()
@@ -0,0 +1,22 @@
+import pytest
+
+from app.data.db import DB_PATH, connect_database, get_pool
+from app.data.schema import create_all_tables
+
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    """
+    Fresh, fully migrated database for one test.
+    DB_PATH is relative, so running in tmp_path points every default
+    connection (conn=None) at the test database instead of the real one.
+    """
+    monkeypatch.chdir(tmp_path)
+    conn = connect_database()
+    create_all_tables(conn)
+    conn.close()
+
+    yield tmp_path / DB_PATH
+
+    for read_only in (False, True):
+        get_pool(DB_PATH, read_only).close_all()
@@ -0,0 +1,62 @@
+import sqlite3
+
+import pytest
+
+from app.data.aggregates import rebuild_aggregate_counts
+from app.data.bulk import BATCH_MIN_ROWS, batch_statements
+from app.data.db import connect_database
+from app.data.incidents import insert_incidents_many
+from app.data.rollups import rebuild_time_rollups
+from app.data.search import rebuild_search_indexes
+from app.data.surges import rebuild_surge_counts
+
+
+def incident_rows(count, start=0):
+    return [(f"2024-01-{1 + (i % 28):02d}", ["Phishing", "Malware"][i % 2], "High", "Open", f"incident {i}", None)
+            for i in range(start, start + count)]
+
+
+def trigger_names():
+    conn = connect_database(read_only=True)
+    try:
+        return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'trigger'")}
+    finally:
+        conn.close()
+
+
+def test_large_batch_keeps_derived_tables_exact(database):
+    before = trigger_names()
+    insert_incidents_many(incident_rows(BATCH_MIN_ROWS))
+    # A small batch afterwards goes through the re-created triggers
+    insert_incidents_many(incident_rows(3, start=BATCH_MIN_ROWS))
+
+    assert trigger_names() == before
+    assert rebuild_aggregate_counts() == {}
+    assert rebuild_time_rollups() == {}
+    assert rebuild_surge_counts() == {}
+    assert rebuild_search_indexes() == []
+
+    conn = connect_database(read_only=True)
+    try:
+        logged = conn.execute("SELECT COUNT(*) FROM status_transitions WHERE table_name = 'cyber_incidents'")
+        assert logged.fetchone()[0] == BATCH_MIN_ROWS + 3
+    finally:
+        conn.close()
+
+
+def test_failed_batch_rolls_back_with_its_triggers(database):
+    before = trigger_names()
+    rows = incident_rows(BATCH_MIN_ROWS)
+    rows[-1] = (None,) + rows[-1][1:]   # date is NOT NULL
+
+    with pytest.raises(sqlite3.IntegrityError):
+        insert_incidents_many(rows)
+
+    assert trigger_names() == before
+    assert rebuild_aggregate_counts() == {}
+
+
+def test_every_batch_statement_replaces_an_existing_trigger(database):
+    names = trigger_names()
+    for table in ("cyber_incidents", "it_tickets", "datasets_metadata"):
+        assert set(batch_statements(table)) <= names
@@ -0,0 +1,20 @@
+from app.data.incidents import insert_incidents_many
+from app.data.query_builder import Query
+from services.database_manager import DatabaseManager
+
+
+def test_cached_query_result_is_not_changed_by_callers(database):
+    insert_incidents_many([
+        ("2024-01-01", "Phishing", "High", "Open", "first", None),
+        ("2024-01-02", "Malware", "High", "Resolved", "second", None),
+    ])
+    db = DatabaseManager(str(database), read_only=True)
+    query = Query("cyber_incidents").group_by("severity").aggregate("Count", "count")
+
+    first = db.run_query(query)
+    first["Share %"] = first["Count"] * 100
+
+    again = db.run_query(query)
+    assert "Share %" not in again.columns
+    assert db.cache_stats()["hits"] == 1
+    db.close()
@@ -0,0 +1,66 @@
+import sqlite3
+
+import pytest
+
+from app.data import delta
+from app.data.db import connect_database
+from app.data.delta import fetch_delta
+from app.data.incidents import insert_incidents_many
+
+ROWS = [
+    ("2024-01-01", "Phishing", "High", "Open", "first", None),
+    ("2024-01-02", "Malware", "Low", "Resolved", "second", None),
+]
+
+
+@pytest.fixture
+def write_after_mark(database, monkeypatch):
+    """
+    Make another connection insert an incident right after fetch_delta has
+    read the mark, as a concurrent writer could.
+    """
+    read_mark = delta.get_high_water_mark
+    written = []
+
+    def mark_then_write(conn, table):
+        mark = read_mark(conn, table)
+        if not written:
+            writer = sqlite3.connect(database)
+            writer.execute("""
+                INSERT INTO cyber_incidents (date, incident_type, severity, status, description)
+                VALUES ('2024-01-03', 'Phishing', 'Medium', 'Open', 'concurrent')
+            """)
+            writer.commit()
+            writer.close()
+            written.append(True)
+        return mark
+
+    monkeypatch.setattr(delta, "get_high_water_mark", mark_then_write)
+
+
+def test_write_between_mark_and_rows_is_returned_once(database, write_after_mark):
+    insert_incidents_many(ROWS)
+    conn = connect_database(read_only=True)
+    try:
+        rows, _, mark = fetch_delta(conn, "cyber_incidents", ["id"])
+        later, _, _ = fetch_delta(conn, "cyber_incidents", ["id"], since=mark)
+    finally:
+        conn.close()
+
+    ids = [row[0] for row in rows + later]
+    assert sorted(ids) == [1, 2, 3]
+
+
+def test_snapshot_append_has_no_duplicates(database, write_after_mark):
+    pytest.importorskip("pyarrow")
+    from app.data.snapshots import read_snapshot, refresh_snapshot
+
+    snapshot_dir = database.parent / "snapshots"
+    insert_incidents_many(ROWS)
+    refresh_snapshot("cyber_incidents", snapshot_dir=snapshot_dir)
+    insert_incidents_many(ROWS)
+    refresh_snapshot("cyber_incidents", snapshot_dir=snapshot_dir)
+
+    ids = read_snapshot("cyber_incidents", ["id"], snapshot_dir=snapshot_dir)["id"].to_pylist()
+    assert sorted(ids) == sorted(set(ids))
+    assert len(ids) == 5
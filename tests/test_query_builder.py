@@ -0,0 +1,28 @@
+import pytest
+
+from app.data.incidents import insert_incidents_many
+from app.data.query_builder import Query
+from app.data.snapshots import snapshots_available
+from services.database_manager import DatabaseManager
+
+
+@pytest.mark.parametrize("snapshot", [False, True])
+def test_contains_matches_wildcards_literally(database, snapshot):
+    if snapshot and not snapshots_available():
+        pytest.skip("pyarrow is not installed")
+    insert_incidents_many([
+        ("2024-01-01", "Malware", "High", "Open", "disk 100% full", None),
+        ("2024-01-02", "Malware", "High", "Open", "disk 100 full", None),
+        ("2024-01-03", "Malware", "High", "Open", "bad_file.exe", None),
+        ("2024-01-04", "Malware", "High", "Open", "badXfile.exe", None),
+    ])
+    db = DatabaseManager(str(database), read_only=True)
+
+    def descriptions(op, text):
+        query = Query("cyber_incidents").select("description").where("description", op, text)
+        return sorted(db.run_query(query, snapshot=snapshot)["description"])
+
+    assert descriptions("contains", "100%") == ["disk 100% full"]
+    assert descriptions("contains", "_FILE") == ["bad_file.exe"]
+    assert descriptions("startswith", "bad_") == ["bad_file.exe"]
+    db.close()
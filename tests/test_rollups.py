@@ -0,0 +1,21 @@
+from app.data.db import connect_database
+from app.data.incidents import insert_incidents_many
+from app.data.rollups import MAX_POINTS, read_time_series
+
+
+def test_long_range_is_merged_to_max_points(database):
+    # One incident a month for 30 years: 360 month buckets
+    insert_incidents_many([(f"{1990 + i // 12}-{1 + i % 12:02d}-15", "Malware", "Low", "Open", f"incident {i}", None)
+                           for i in range(360)])
+    conn = connect_database(read_only=True)
+    try:
+        series = read_time_series(conn, "cyber_incidents")
+        monthly = read_time_series(conn, "cyber_incidents", grain="month")
+    finally:
+        conn.close()
+
+    assert len(series) <= MAX_POINTS
+    assert series.attrs["months_per_point"] == 4
+    assert series["count"].sum() == 360
+    assert series["bucket"].is_monotonic_increasing
+    assert len(monthly) == 360
@@ -0,0 +1,41 @@
+import pytest
+
+from app.data.db import connect_database, session
+from app.data.dataset import insert_dataset
+from app.data.incidents import insert_incident, update_incident_status
+from app.data.tickets import insert_ticket
+
+
+def count_rows(table):
+    conn = connect_database(read_only=True)
+    try:
+        return conn.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+    finally:
+        conn.close()
+
+
+def test_writer_commits_on_its_own(database):
+    insert_incident("2024-01-01", "Phishing", "High", "Open", "outside a session")
+
+    assert count_rows("cyber_incidents") == 1
+
+
+def test_error_in_session_rolls_back_conn_none_writes(database):
+    with pytest.raises(RuntimeError):
+        with session():
+            insert_incident("2024-01-01", "Phishing", "High", "Open", "inside a session")
+            insert_ticket("TICKET-1", "High", "Open", "Network", "subject", "description", "2024-01-01", "alice")
+            insert_dataset("customers", "Sales", "CRM", "2024-01-01", 10, 1.5)
+            raise RuntimeError("abort the session")
+
+    assert count_rows("cyber_incidents") == 0
+    assert count_rows("it_tickets") == 0
+    assert count_rows("datasets_metadata") == 0
+
+
+def test_session_commits_conn_none_writes_together(database):
+    with session():
+        incident_id = insert_incident("2024-01-01", "Phishing", "High", "Open", "inside a session")
+        update_incident_status(incident_id, "Resolved")
+
+    assert count_rows("cyber_incidents") == 1